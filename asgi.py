@@ -0,0 +1,180 @@
+# ============================================
+# asgi.py - Point d'entrée asynchrone (ASGI) de l'application
+# ============================================
+#
+# Sert les mêmes routes que `server:app`, mais derrière une boucle asyncio :
+#   uvicorn asgi:application --host 0.0.0.0 --port 5000
+#   gunicorn -k uvicorn.workers.UvicornWorker -w 2 -b 0.0.0.0:5000 asgi:application
+#
+# Chaque requête Flask s'exécute dans un pool de threads, et le corps de la
+# réponse est lu morceau par morceau dans ce même pool : un téléchargement lent
+# n'occupe un thread que le temps de lire un bloc sur le disque, l'attente du
+# client se fait dans la boucle d'événements. Un seul processus peut ainsi
+# servir des centaines de flux simultanés. Les flux SSE (/api/events, suivi des
+# fichiers texte) attendent de même entre deux sondages (server.stream_idle).
+
+import asyncio
+import contextvars
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from server import ASGI_IDLE_WAIT_KEY, IdleWait, app
+
+ASGI_THREADS = int(os.environ.get('FLASK_ASGI_THREADS', '32'))
+# Corps de requête gardé en mémoire jusqu'à cette taille, puis sur disque
+ASGI_BODY_SPOOL_SIZE = 1024 * 1024
+
+executor = ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix='asgi-worker')
+
+
+def _build_environ(scope, body):
+    """Construit l'environnement WSGI (PEP 3333) d'une requête ASGI."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    raw_path = scope.get('raw_path') or scope['path'].encode('utf-8')
+    root_path = scope.get('root_path', '').encode('utf-8')
+    if root_path and raw_path.startswith(root_path):
+        raw_path = raw_path[len(root_path):]
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.decode('latin-1'),
+        'PATH_INFO': raw_path.split(b'?', 1)[0].decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        ASGI_IDLE_WAIT_KEY: True,
+    }
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def _read_body(receive):
+    """Reçoit le corps de la requête dans un fichier temporaire (en mémoire s'il est petit)."""
+    body = tempfile.SpooledTemporaryFile(max_size=ASGI_BODY_SPOOL_SIZE)
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.close()
+            return None
+        chunk = message.get('body', b'')
+        if chunk:
+            body.write(chunk)
+        if not message.get('more_body', False):
+            break
+    body.seek(0)
+    return body
+
+
+async def _watch_disconnect(receive, disconnected):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            disconnected.set()
+            return
+
+
+async def _handle_http(scope, receive, send):
+    loop = asyncio.get_running_loop()
+    body = await _read_body(receive)
+    if body is None:
+        return
+
+    # Un contexte par requête : les appels successifs dans le pool (même sur des
+    # threads différents) voient le même contexte Flask (stream_with_context).
+    context = contextvars.copy_context()
+    response_start = {}
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and response_start.get('sent'):
+            raise exc_info[1].with_traceback(exc_info[2])
+        response_start['status'] = int(status.split(' ', 1)[0])
+        response_start['headers'] = [
+            (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+        ]
+        return lambda data: response_start.setdefault('pending', []).append(data)
+
+    def call_app():
+        iterable = app.wsgi_app(_build_environ(scope, body), start_response)
+        return iterable, iter(iterable)
+
+    def next_chunk(iterator):
+        for chunk in iterator:
+            if chunk or isinstance(chunk, IdleWait):
+                return chunk
+        return None
+
+    disconnected = asyncio.Event()
+    watcher = asyncio.ensure_future(_watch_disconnect(receive, disconnected))
+    iterable = None
+    try:
+        iterable, iterator = await loop.run_in_executor(executor, context.run, call_app)
+        first_chunk = await loop.run_in_executor(executor, context.run, next_chunk, iterator)
+
+        await send({
+            'type': 'http.response.start',
+            'status': response_start['status'],
+            'headers': response_start['headers'],
+        })
+        response_start['sent'] = True
+
+        for data in response_start.pop('pending', []):
+            await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+
+        chunk = first_chunk
+        while chunk is not None and not disconnected.is_set():
+            if isinstance(chunk, IdleWait):
+                # Flux en attente (SSE) : dans la boucle d'événements, sans occuper de thread du pool
+                try:
+                    await asyncio.wait_for(disconnected.wait(), chunk.seconds)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            chunk = await loop.run_in_executor(executor, context.run, next_chunk, iterator)
+
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        watcher.cancel()
+        if iterable is not None and hasattr(iterable, 'close'):
+            await loop.run_in_executor(executor, context.run, iterable.close)
+        body.close()
+
+
+async def application(scope, receive, send):
+    """Application ASGI : HTTP via l'application Flask, plus le protocole lifespan."""
+    if scope['type'] == 'http':
+        await _handle_http(scope, receive, send)
+    elif scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    else:
+        raise NotImplementedError(f"Type de connexion non géré : {scope['type']}")
@@ -0,0 +1,251 @@
+# ============================================
+# assets.py - Construction des ressources statiques (bundles empreintés)
+# ============================================
+#
+# Comme hasher.py et thumbnailer.py, module indépendant de Flask. Lancé à la
+# construction de l'image (`python assets.py`), il produit dans static/dist :
+#   - app.<empreinte>.js : les scripts classiques de static/js, dans l'ordre de chargement ;
+#   - viewer.<empreinte>.js : les modules de floatingWindows réunis en un seul module ;
+#   - app.<empreinte>.css : style.css ;
+#   - tailwind.<empreinte>.css : les seules classes Tailwind utilisées (CLI autonome tailwindcss) ;
+#   - fontawesome-<empreinte>/ : Font Awesome servi localement (paquet fontawesomefree) ;
+#   - manifest.json : nom logique -> fichier empreinté, lu par server.py.
+# Le nom d'un fichier change avec son contenu : le serveur le déclare immuable.
+# Sans static/dist, server.py sert les fichiers séparés et les CDN (développement).
+
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+try:
+    import rjsmin
+except ImportError:  # Bundles JS concaténés sans minification
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:  # CSS copié sans minification
+    rcssmin = None
+
+try:
+    import fontawesomefree
+except ImportError:  # Icônes chargées depuis le CDN
+    fontawesomefree = None
+
+MANIFEST_NAME = 'manifest.json'
+
+# Scripts classiques, dans l'ordre de templates/index.html (chacun dépend des précédents)
+APP_SCRIPTS = (
+    'js/config.js',
+    'js/utils.js',
+    'js/ui.js',
+    'js/navigation.js',
+    'js/sorting.js',
+    'js/modal.js',
+    'js/notifications.js',
+    'js/jobs.js',
+    'js/selection.js',
+    'js/duplicates.js',
+    'js/liveUpdates.js',
+    'js/contextMenu.js',
+    'js/fileActions.js',
+    'js/textFiles.js',
+    'js/textEditor.js',
+    'js/folderActions.js',
+    'js/moveActions.js',
+    'js/upload.js',
+    'js/search.js',
+    'js/mobile.js',
+    'js/app.js',
+)
+
+# Modules de la visionneuse flottante, dépendances d'abord ; le dernier est le point d'entrée
+VIEWER_MODULES = (
+    'js/floatingWindows/windowCreators.js',
+    'js/floatingWindows/windowManagement.js',
+    'js/floatingWindows/tilingSystem.js',
+    'js/floatingWindows/editorSystem.js',
+    'js/floatingWindows/dragDropSystem.js',
+    'js/floatingWindows/autoSnapSystem.js',
+    'js/floatingWindows/layoutSystem.js',
+    'js/floatingWindows/floatingViewer.js',
+)
+VIEWER_GLOBAL = 'floatingViewer'  # Exposé sur window, comme le fait le module en ligne de index.html
+
+# Fichiers où chercher les classes Tailwind (server.py : HTML du lecteur média)
+TAILWIND_CONTENT = ('templates/**/*.html', 'static/js/**/*.js', 'server.py')
+TAILWIND_INPUT = "@tailwind base;\n@tailwind components;\n@tailwind utilities;\n"
+
+LOCAL_IMPORT = re.compile(r"^\s*import\s+\{[^}]*\}\s+from\s+'\./[^']+\.js';?[ \t]*$", re.M)
+EXPORT_DEFAULT = re.compile(r"^\s*export\s+default\s+\w+;?[ \t]*$", re.M)
+EXPORT_DECLARATION = re.compile(r"^export\s+(?=(?:const|let|var|function|class)\b)", re.M)
+REMAINING_MODULE_SYNTAX = re.compile(r"^\s*(?:import|export)\b", re.M)
+
+
+def fingerprint(*chunks):
+    digest = hashlib.blake2b(digest_size=6)
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def minify_js(source):
+    return rjsmin.jsmin(source) if rjsmin is not None else source
+
+
+def minify_css(source):
+    return rcssmin.cssmin(source) if rcssmin is not None else source
+
+
+def read_text(static_dir, relative_path):
+    with open(os.path.join(static_dir, relative_path), encoding='utf-8') as f:
+        return f.read()
+
+
+def bundle_scripts(static_dir, scripts):
+    # « ; » entre deux fichiers : un script sans point-virgule final ne se soude pas au suivant
+    return '\n;\n'.join(read_text(static_dir, script) for script in scripts)
+
+
+def bundle_modules(static_dir, modules, global_name):
+    """Réunit des modules ES en un seul : imports locaux retirés, exports ramenés à des déclarations.
+
+    Suffit pour ces modules (un objet exporté chacun, aucun nom partagé) ; toute
+    autre syntaxe de module fait échouer la construction plutôt que le navigateur.
+    """
+    parts = []
+    for module in modules:
+        source = LOCAL_IMPORT.sub('', read_text(static_dir, module))
+        source = EXPORT_DEFAULT.sub('', source)
+        source = EXPORT_DECLARATION.sub('', source)
+        unsupported = REMAINING_MODULE_SYNTAX.search(source)
+        if unsupported:
+            line = source.count('\n', 0, unsupported.start()) + 1
+            raise ValueError(f"{module}:{line}: import/export non pris en charge par le bundle")
+        parts.append(source)
+    parts.append(f"window.{global_name} = {global_name};\n")
+    return '\n'.join(parts)
+
+
+def build_tailwind(root_dir, cli):
+    """CSS des classes Tailwind présentes dans le code (base comprise, comme le CDN)."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = os.path.join(temp_dir, 'input.css')
+        output_path = os.path.join(temp_dir, 'tailwind.css')
+        with open(input_path, 'w') as f:
+            f.write(TAILWIND_INPUT)
+        subprocess.run([cli, '--input', input_path, '--output', output_path, '--minify',
+                        '--content', ','.join(TAILWIND_CONTENT)],
+                       cwd=root_dir, check=True, capture_output=True)
+        with open(output_path, 'rb') as f:
+            return f.read()
+
+
+def fontawesome_files():
+    """Feuille de style et polices de Font Awesome Free : [(chemin relatif, chemin source)]."""
+    base = os.path.join(os.path.dirname(fontawesomefree.__file__), 'static', 'fontawesomefree')
+    files = [('css/all.min.css', os.path.join(base, 'css', 'all.min.css'))]
+    for path in sorted(glob.glob(os.path.join(base, 'webfonts', '*'))):
+        files.append((f"webfonts/{os.path.basename(path)}", path))
+    return files
+
+
+def write_file(path, data):
+    """Écriture atomique : un worker ne sert jamais un fichier à moitié écrit."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_asset(out_dir, stem, extension, data):
+    filename = f"{stem}.{fingerprint(data)}.{extension}"
+    write_file(os.path.join(out_dir, filename), data)
+    return filename
+
+
+def build(root_dir, out_dir=None, tailwind_cli=None):
+    """Construit les ressources dans out_dir (static/dist) et retourne le manifeste."""
+    static_dir = os.path.join(root_dir, 'static')
+    out_dir = out_dir or os.path.join(static_dir, 'dist')
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+
+    app_js = minify_js(bundle_scripts(static_dir, APP_SCRIPTS))
+    manifest['app.js'] = write_asset(out_dir, 'app', 'js', app_js.encode('utf-8'))
+    viewer_js = minify_js(bundle_modules(static_dir, VIEWER_MODULES, VIEWER_GLOBAL))
+    manifest['viewer.js'] = write_asset(out_dir, 'viewer', 'js', viewer_js.encode('utf-8'))
+    app_css = minify_css(read_text(static_dir, 'css/style.css'))
+    manifest['app.css'] = write_asset(out_dir, 'app', 'css', app_css.encode('utf-8'))
+
+    if tailwind_cli:
+        manifest['tailwind.css'] = write_asset(out_dir, 'tailwind', 'css', build_tailwind(root_dir, tailwind_cli))
+
+    if fontawesomefree is not None:
+        # Un dossier par version : la feuille de style désigne ses polices en relatif (../webfonts)
+        files = fontawesome_files()
+        contents = {}
+        for relative_path, source in files:
+            with open(source, 'rb') as f:
+                contents[relative_path] = f.read()
+        folder = f"fontawesome-{fingerprint(*(contents[path] for path, _ in files))}"
+        for relative_path, data in contents.items():
+            write_file(os.path.join(out_dir, folder, relative_path), data)
+        manifest['fontawesome.css'] = f"{folder}/css/all.min.css"
+
+    write_file(os.path.join(out_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode('utf-8'))
+    remove_stale(out_dir, manifest)
+    return manifest
+
+
+def remove_stale(out_dir, manifest):
+    """Supprime les fichiers des constructions précédentes."""
+    keep = {MANIFEST_NAME} | {path.split('/')[0] for path in manifest.values()}
+    for name in os.listdir(out_dir):
+        if name in keep:
+            continue
+        path = os.path.join(out_dir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+
+
+def load_manifest(out_dir):
+    """Manifeste de la dernière construction ({} si les ressources n'ont pas été construites)."""
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+if __name__ == '__main__':
+    root = os.path.dirname(os.path.abspath(__file__))
+    cli = os.environ.get('TAILWIND_CLI') or shutil.which('tailwindcss')
+    if cli is None:
+        print("ATTENTION: CLI tailwindcss introuvable, la page chargera Tailwind depuis le CDN.")
+    if fontawesomefree is None:
+        print("ATTENTION: paquet fontawesomefree absent, les icônes seront chargées depuis le CDN.")
+    try:
+        result = build(root, tailwind_cli=cli)
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        print(f"ERREUR: construction des ressources impossible: {e}")
+        sys.exit(1)
+    for name, filename in result.items():
+        print(f"{name:16} -> static/dist/{filename}")
@@ -0,0 +1,170 @@
+# ============================================
+# concurrency.py - Débit sous charge concurrente : gunicorn sync vs ASGI
+# ============================================
+#
+# Lance successivement les deux modes de service sur une arborescence
+# synthétique, ouvre N flux de téléchargement lents simultanés (clients qui
+# lisent à débit limité, comme un lecteur vidéo) et mesure pendant ce temps
+# la latence de /api/list. Résultat en JSON sur la sortie standard.
+#
+#   python benchmarks/concurrency.py --clients 100 --duration 20
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'sync': ['gunicorn', '-w', '{workers}', '-b', '127.0.0.1:{port}', '--timeout', '960', 'server:app'],
+    'asgi': ['gunicorn', '-k', 'uvicorn.workers.UvicornWorker', '-w', '{workers}', '-b', '127.0.0.1:{port}', 'asgi:application'],
+}
+
+
+def make_tree(base_dir, file_size_mb, listing_files):
+    """Un gros fichier média et un dossier de `listing_files` petits fichiers."""
+    with open(os.path.join(base_dir, 'media.mkv'), 'wb') as f:
+        block = os.urandom(1024 * 1024)
+        for _ in range(file_size_mb):
+            f.write(block)
+    folder = os.path.join(base_dir, 'folder')
+    os.makedirs(folder)
+    for i in range(listing_files):
+        with open(os.path.join(folder, f'file_{i:05d}.txt'), 'w') as f:
+            f.write('x' * (i % 100))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/list?path=/')
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def slow_stream(port, stop, rate_kbps, stats):
+    """Télécharge le média en boucle à débit limité jusqu'à `stop`."""
+    block = 64 * 1024
+    delay = block / (rate_kbps * 1024)
+    while not stop.is_set():
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.request('GET', '/api/view?path=media.mkv')
+            response = conn.getresponse()
+            while not stop.is_set():
+                data = response.read(block)
+                if not data:
+                    break
+                with stats['lock']:
+                    stats['bytes'] += len(data)
+                time.sleep(delay)
+            conn.close()
+        except OSError:
+            with stats['lock']:
+                stats['stream_errors'] += 1
+            time.sleep(0.5)
+
+
+def probe_listing(port, stop, stats):
+    """Mesure la latence de /api/list pendant que les flux tournent."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/api/list?path=/folder')
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status == 200:
+                stats['list_latencies'].append(time.perf_counter() - started)
+            else:
+                stats['list_failures'] += 1
+        except OSError:
+            stats['list_failures'] += 1
+        time.sleep(0.1)
+
+
+def run_mode(mode, args, base_dir, state_dir):
+    port = free_port()
+    command = [part.format(port=port, workers=args.workers) for part in MODES[mode]]
+    env = dict(os.environ, FLASK_BASE_DIR=base_dir, FLASK_STATE_DIR=state_dir, FLASK_SEARCH_INDEX='0', FLASK_CONTENT_INDEX='0')
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(port):
+            return {"mode": mode, "error": "le serveur n'a pas démarré"}
+
+        stop = threading.Event()
+        stats = {'lock': threading.Lock(), 'bytes': 0, 'stream_errors': 0, 'list_latencies': [], 'list_failures': 0}
+        threads = [threading.Thread(target=slow_stream, args=(port, stop, args.rate_kbps, stats), daemon=True)
+                   for _ in range(args.clients)]
+        threads.append(threading.Thread(target=probe_listing, args=(port, stop, stats), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        latencies = sorted(stats['list_latencies'])
+        return {
+            "mode": mode,
+            "clients": args.clients,
+            "duration_s": args.duration,
+            "throughput_mb_s": round(stats['bytes'] / args.duration / 1024 / 1024, 2),
+            "stream_errors": stats['stream_errors'],
+            "list_requests_ok": len(latencies),
+            "list_failures": stats['list_failures'],
+            "list_p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+            "list_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1) if latencies else None,
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Débit sous charge concurrente : gunicorn sync vs ASGI')
+    parser.add_argument('--clients', type=int, default=50, help='flux de téléchargement simultanés')
+    parser.add_argument('--duration', type=int, default=15, help='durée de chaque mesure (s)')
+    parser.add_argument('--rate-kbps', type=int, default=2048, help='débit de lecture de chaque client (Kio/s)')
+    parser.add_argument('--workers', type=int, default=2, help='workers gunicorn (comme docker-compose)')
+    parser.add_argument('--file-size-mb', type=int, default=256)
+    parser.add_argument('--listing-files', type=int, default=2000)
+    parser.add_argument('--modes', default='sync,asgi')
+    args = parser.parse_args()
+
+    base_dir = tempfile.mkdtemp(prefix='bench_data_')
+    state_dir = tempfile.mkdtemp(prefix='bench_state_')
+    try:
+        make_tree(base_dir, args.file_size_mb, args.listing_files)
+        results = [run_mode(mode, args, base_dir, state_dir) for mode in args.modes.split(',')]
+        json.dump({"benchmark": "concurrency", "results": results}, sys.stdout, indent=2)
+        print()
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
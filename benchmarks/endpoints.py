@@ -0,0 +1,467 @@
+# ============================================
+# endpoints.py - Banc d'essai reproductible des routes principales
+# ============================================
+#
+# Génère une arborescence synthétique (large ou profonde, de 1k à 1M
+# fichiers, minuscules ou de taille « média »), puis mesure listing,
+# recherche, téléversement, téléchargement, lecture par plages (Range) et
+# archive ZIP, via le client de test Flask ou contre un gunicorn local.
+# Résultat en JSON (débit, latences p50/p99, pic de mémoire) pour comparer
+# deux versions de server.py.
+#
+#   python benchmarks/endpoints.py --files 100000 --shape wide > avant.json
+#   python benchmarks/endpoints.py --files 100000 --shape wide --compare avant.json
+#   python benchmarks/endpoints.py --backend gunicorn --workers 2 --concurrency 8
+#
+# Les gros fichiers sont creux (sparse) : 1M fichiers « média » ne consomment
+# presque rien sur le disque. --data-dir conserve l'arborescence entre deux
+# exécutions (sa génération domine le temps total pour 1M fichiers).
+
+import argparse
+import atexit
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+from concurrency import free_port, wait_ready
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SHAPES = {
+    # (profondeur, sous-dossiers par dossier)
+    'wide': (0, 0),   # tous les fichiers dans un seul dossier
+    'deep': (8, 2),
+    'mixed': (3, 10),
+}
+TINY_EXTENSIONS = ('txt', 'jpg', 'pdf', 'json', 'mp3')
+SCENARIOS = ('list', 'list_sorted', 'search', 'upload', 'download', 'view_range', 'download_folder')
+MARKER = '.bench_tree.json'
+READ_BLOCK = 1024 * 1024
+
+
+# --- Arborescence synthétique ---
+
+def tree_directories(root, depth, fanout):
+    """Dossiers de l'arbre, parcours en largeur (la racine d'abord)."""
+    directories = [root]
+    level = [root]
+    for _ in range(depth):
+        level = [os.path.join(parent, f'dir_{i:02d}') for parent in level for i in range(fanout)]
+        directories.extend(level)
+    return directories
+
+
+def write_file(path, size, sparse):
+    with open(path, 'wb') as f:
+        if sparse:
+            # Quelques octets réels en tête, le reste est un trou
+            f.write(b'\x1aE\xdf\xa3')
+            f.truncate(size)
+        else:
+            f.write(os.urandom(size))
+
+
+def make_tree(data_dir, args):
+    """Crée (ou réutilise) l'arborescence décrite par les arguments."""
+    config = {key: getattr(args, key) for key in ('files', 'shape', 'sizes', 'media_size_mb', 'zip_files', 'seed')}
+    marker = os.path.join(data_dir, MARKER)
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if json.load(f) == config:
+                return 0.0
+        raise SystemExit(f"{data_dir} contient une arborescence générée avec d'autres paramètres.")
+
+    started = time.perf_counter()
+    rng = random.Random(args.seed)
+    depth, fanout = SHAPES[args.shape]
+    directories = tree_directories(os.path.join(data_dir, 'tree'), depth, fanout)
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    media_size = args.media_size_mb * 1024 * 1024
+    for i in range(args.files):
+        directory = directories[i % len(directories)]
+        if args.sizes == 'media':
+            write_file(os.path.join(directory, f'file_{i:07d}.mkv'), media_size, sparse=True)
+        else:
+            extension = TINY_EXTENSIONS[i % len(TINY_EXTENSIONS)]
+            write_file(os.path.join(directory, f'file_{i:07d}.{extension}'), rng.randint(0, 4096), sparse=False)
+
+    # Cibles fixes du téléchargement, des plages et de l'archive
+    fixtures = os.path.join(data_dir, 'fixtures')
+    os.makedirs(os.path.join(fixtures, 'zip'), exist_ok=True)
+    write_file(os.path.join(fixtures, 'media.mkv'), media_size, sparse=True)
+    for i in range(args.zip_files):
+        write_file(os.path.join(fixtures, 'zip', f'part_{i:04d}.bin'), 64 * 1024, sparse=False)
+
+    with open(marker, 'w') as f:
+        json.dump(config, f)
+    return time.perf_counter() - started
+
+
+def largest_directory(data_dir):
+    """Dossier listé par les scénarios « list » : celui qui contient le plus d'entrées."""
+    best, best_count = os.path.join(data_dir, 'tree'), -1
+    for root, dirs, files in os.walk(os.path.join(data_dir, 'tree')):
+        if len(dirs) + len(files) > best_count:
+            best, best_count = root, len(dirs) + len(files)
+    return os.path.relpath(best, data_dir).replace('\\', '/'), best_count
+
+
+# --- Clients ---
+
+class TestClientTransport:
+    """Requêtes via app.test_client(), dans le processus courant (un client par thread)."""
+
+    name = 'test-client'
+
+    def __init__(self, env):
+        # Pas de surveillance du disque : dans ce processus, seul le serveur écrit (et il notifie lui-même)
+        os.environ.update(env, FLASK_WATCH='0')
+        sys.path.insert(0, ROOT)
+        import server
+        self.server = server
+        self._local = threading.local()
+
+    def wait_index(self, timeout):
+        if self.server.search_index is not None:
+            self.server.search_index.sync(blocking=True)
+
+    def request(self, method, path, headers=None, body=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.server.app.test_client()
+        response = client.open(path, method=method, headers=headers or {}, data=body, buffered=False)
+        try:
+            size = sum(len(chunk) for chunk in response.iter_encoded())
+        finally:
+            response.close()
+        return response.status_code, size
+
+    def peak_rss_bytes(self):
+        # ru_maxrss : Kio sous Linux, octets sous macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    def close(self):
+        # Le répertoire d'état est supprimé avant la sortie du processus
+        atexit.unregister(self.server.metrics.flush)
+
+
+class GunicornTransport:
+    """Requêtes HTTP vers un gunicorn local lancé pour l'occasion."""
+
+    name = 'gunicorn'
+
+    def __init__(self, env, args):
+        self.port = free_port()
+        self.state_dir = env['FLASK_STATE_DIR']
+        command = ['gunicorn', '-w', str(args.workers), '--threads', str(args.threads),
+                   '-b', f'127.0.0.1:{self.port}', '--timeout', '960', 'server:app']
+        self.process = subprocess.Popen(command, cwd=ROOT, env=dict(os.environ, **env),
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if not wait_ready(self.port, timeout=60):
+            self.close()
+            raise SystemExit("Le serveur gunicorn n'a pas démarré.")
+
+    def wait_index(self, timeout):
+        import sqlite3
+        deadline = time.time() + timeout
+        db_path = os.path.join(self.state_dir, 'search_index.sqlite3')
+        while time.time() < deadline:
+            try:
+                conn = sqlite3.connect(db_path, timeout=5)
+                try:
+                    if conn.execute("SELECT 1 FROM meta WHERE key = 'built_at'").fetchone():
+                        return
+                finally:
+                    conn.close()
+            except sqlite3.Error:
+                pass
+            time.sleep(0.5)
+        raise SystemExit("L'index de recherche n'a pas été construit à temps.")
+
+    def request(self, method, path, headers=None, body=None):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=300)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            size = 0
+            while True:
+                data = response.read(READ_BLOCK)
+                if not data:
+                    break
+                size += len(data)
+            return response.status, size
+        finally:
+            conn.close()
+
+    def peak_rss_bytes(self):
+        """Somme des pics de mémoire (VmHWM) du maître et de ses workers."""
+        total = 0
+        for pid in [self.process.pid] + child_pids(self.process.pid):
+            try:
+                with open(f'/proc/{pid}/status') as f:
+                    for line in f:
+                        if line.startswith('VmHWM:'):
+                            total += int(line.split()[1]) * 1024
+            except OSError:
+                continue
+        return total or None
+
+    def close(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def child_pids(parent):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # Le nom du processus (entre parenthèses) peut contenir des espaces
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent:
+            children.append(int(entry))
+    return children
+
+
+# --- Scénarios ---
+
+def multipart_body(destination, count, size, seed):
+    """Corps multipart/form-data d'un téléversement de `count` fichiers de `size` octets."""
+    rng = random.Random(seed)
+    boundary = f'bench{rng.getrandbits(64):016x}'
+    parts = [f'--{boundary}\r\nContent-Disposition: form-data; name="path"\r\n\r\n{destination}\r\n'.encode()]
+    for i in range(count):
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="files"; filename="upload_{i:04d}.bin"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode()
+        )
+        parts.append(rng.randbytes(size) + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def build_scenarios(args, list_path):
+    """Nom du scénario -> fonction (rng) retournant (méthode, chemin, en-têtes, corps)."""
+    media_size = args.media_size_mb * 1024 * 1024
+    upload_body, upload_type = multipart_body('/uploads', args.upload_files, args.upload_size_kb * 1024, args.seed)
+    encoded_list_path = quote(list_path)
+
+    def view_range(rng):
+        length = min(media_size, args.range_kb * 1024)
+        start = rng.randrange(0, media_size - length + 1)
+        return 'GET', '/api/view?path=fixtures/media.mkv', {'Range': f'bytes={start}-{start + length - 1}'}, None
+
+    return {
+        'list': lambda rng: ('GET', f'/api/list?path={encoded_list_path}', None, None),
+        # Tri par date + première page : force un stat de chaque entrée
+        'list_sorted': lambda rng: ('GET', f'/api/list?path={encoded_list_path}&sort=modified&order=desc&limit=100', None, None),
+        'search': lambda rng: ('GET', f'/api/search?query={quote(args.query)}', None, None),
+        'upload': lambda rng: ('POST', '/api/upload', {'Content-Type': upload_type}, upload_body),
+        'download': lambda rng: ('GET', '/api/download?path=fixtures/media.mkv', None, None),
+        'view_range': view_range,
+        'download_folder': lambda rng: ('GET', '/api/download_folder?path=fixtures/zip', None, None),
+    }
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(len(sorted_values) * fraction) - 1)
+    return sorted_values[index]
+
+
+def run_scenario(transport, name, make_request, args):
+    """Exécute un scénario pendant --duration secondes (ou --requests requêtes) avec --concurrency threads."""
+    # Requête d'échauffement : cache des listings, page cache, imports paresseux
+    method, path, headers, body = make_request(random.Random(args.seed))
+    transport.request(method, path, headers, body)
+
+    latencies = []
+    totals = {'bytes': 0, 'errors': 0, 'issued': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker(index):
+        rng = random.Random(args.seed + index)
+        while True:
+            with lock:
+                if args.requests and totals['issued'] >= args.requests:
+                    return
+                totals['issued'] += 1
+            if not args.requests and time.perf_counter() >= deadline:
+                return
+            method, path, headers, body = make_request(rng)
+            started = time.perf_counter()
+            try:
+                status, size = transport.request(method, path, headers, body)
+            except OSError:
+                status, size = 0, 0
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                totals['bytes'] += size
+                totals['errors'] += int(status == 0 or status >= 400)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    peak_rss = transport.peak_rss_bytes()
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": totals['errors'],
+        "wall_s": round(wall, 3),
+        "requests_per_s": round(len(latencies) / wall, 2) if wall else None,
+        "mb_per_s": round(totals['bytes'] / wall / 1024 / 1024, 2) if wall else None,
+        "bytes": totals['bytes'],
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+        # Cumulé depuis le démarrage du serveur : isoler un scénario avec --scenarios
+        "peak_rss_mb": round(peak_rss / 1024 / 1024, 1) if peak_rss else None,
+    }
+
+
+# --- Rapport ---
+
+def source_version():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--', 'server.py'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, report):
+    """Affiche sur stderr l'évolution de chaque scénario par rapport à un rapport précédent."""
+    previous = {result['scenario']: result for result in baseline.get('results', [])}
+    print(f"Comparaison avec {baseline.get('version')} :", file=sys.stderr)
+    for result in report['results']:
+        before = previous.get(result['scenario'])
+        if before is None:
+            continue
+        changes = []
+        for key in ('requests_per_s', 'p50_ms', 'p99_ms', 'peak_rss_mb'):
+            if before.get(key) and result.get(key) is not None:
+                changes.append(f"{key} {before[key]} -> {result[key]} ({(result[key] / before[key] - 1) * 100:+.1f} %)")
+        print(f"  {result['scenario']:<16} " + ', '.join(changes), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Banc d\'essai des routes listing, recherche, téléversement, téléchargement et ZIP')
+    parser.add_argument('--backend', choices=('test-client', 'gunicorn'), default='test-client')
+    parser.add_argument('--files', type=int, default=1000, help='nombre de fichiers de l\'arborescence (1k à 1M)')
+    parser.add_argument('--shape', choices=sorted(SHAPES), default='wide', help='wide : un seul dossier ; deep : arbre binaire profond')
+    parser.add_argument('--sizes', choices=('tiny', 'media'), default='tiny', help='fichiers de 0 à 4 Kio, ou creux de --media-size-mb')
+    parser.add_argument('--media-size-mb', type=int, default=256)
+    parser.add_argument('--zip-files', type=int, default=200, help='fichiers de 64 Kio du dossier archivé')
+    parser.add_argument('--upload-files', type=int, default=10, help='fichiers par requête de téléversement')
+    parser.add_argument('--upload-size-kb', type=int, default=256)
+    parser.add_argument('--range-kb', type=int, default=1024, help='taille des plages demandées à /api/view')
+    parser.add_argument('--query', default='42', help='terme recherché par /api/search')
+    parser.add_argument('--search-index', choices=('on', 'off'), default='on', help='off : recherche par parcours du disque')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--duration', type=float, default=10, help='durée de chaque scénario (s)')
+    parser.add_argument('--requests', type=int, default=0, help='nombre fixe de requêtes par scénario (remplace --duration)')
+    parser.add_argument('--concurrency', type=int, default=1, help='clients simultanés')
+    parser.add_argument('--workers', type=int, default=2, help='workers gunicorn')
+    parser.add_argument('--threads', type=int, default=16, help='threads par worker gunicorn (comme docker-compose)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--data-dir', help='arborescence conservée et réutilisée entre deux exécutions')
+    parser.add_argument('--output', help='fichier JSON de sortie (défaut : sortie standard)')
+    parser.add_argument('--compare', help='rapport JSON précédent à comparer')
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(',')
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"scénarios inconnus : {', '.join(sorted(unknown))}")
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='bench_data_')
+    os.makedirs(data_dir, exist_ok=True)
+    state_dir = tempfile.mkdtemp(prefix='bench_state_')
+    transport = None
+    try:
+        generation_s = make_tree(data_dir, args)
+        list_path, list_entries = largest_directory(data_dir)
+        env = {
+            'FLASK_BASE_DIR': data_dir,
+            'FLASK_STATE_DIR': state_dir,
+            'FLASK_SEARCH_INDEX': '1' if args.search_index == 'on' else '0',
+            # Aucun scénario n'interroge le contenu : son indexation fausserait les premières mesures
+            'FLASK_CONTENT_INDEX': '0',
+        }
+
+        started = time.perf_counter()
+        transport = TestClientTransport(env) if args.backend == 'test-client' else GunicornTransport(env, args)
+        if args.search_index == 'on':
+            transport.wait_index(timeout=3600)
+        startup_s = time.perf_counter() - started
+
+        makers = build_scenarios(args, list_path)
+        results = []
+        for name in scenarios:
+            results.append(run_scenario(transport, name, makers[name], args))
+            print(f"{name}: {results[-1]['requests']} requêtes, p50 {results[-1]['p50_ms']} ms", file=sys.stderr)
+            if name == 'upload':
+                shutil.rmtree(os.path.join(data_dir, 'uploads'), ignore_errors=True)
+
+        report = {
+            "benchmark": "endpoints",
+            "version": source_version(),
+            "backend": transport.name,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'data_dir')},
+            "tree": {"list_path": list_path, "list_entries": list_entries, "generation_s": round(generation_s, 2)},
+            "startup_s": round(startup_s, 2),
+            "results": results,
+        }
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+                f.write('\n')
+        else:
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        if args.compare:
+            with open(args.compare) as f:
+                compare(json.load(f), report)
+    finally:
+        if transport is not None:
+            transport.close()
+        shutil.rmtree(state_dir, ignore_errors=True)
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# ============================================
+# hasher.py - Empreintes de contenu (exécutées dans des processus séparés)
+# ============================================
+#
+# Comme thumbnailer.py, module indépendant de Flask : server.py l'appelle via
+# un pool de processus (contexte « spawn ») qui ne démarrent aucun service du
+# serveur (voir start_background_services). Le hachage complet d'un film de
+# plusieurs Go occupe un cœur pendant des secondes, hors du GIL des workers.
+
+import hashlib
+import mmap
+import os
+
+PARTIAL_BLOCK_SIZE = 64 * 1024  # Octets lus au début et à la fin pour l'empreinte partielle
+MMAP_WINDOW = 64 * 1024 * 1024  # Fenêtre projetée à la fois : l'espace d'adressage reste borné
+
+
+def new_hash():
+    return hashlib.blake2b(digest_size=20)
+
+
+def partial_hash(path, size):
+    """Empreinte du premier et du dernier bloc : écarte à peu de frais les fichiers de même taille."""
+    digest = new_hash()
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        digest.update(os.pread(fd, PARTIAL_BLOCK_SIZE, 0))
+        if size > PARTIAL_BLOCK_SIZE:
+            digest.update(os.pread(fd, PARTIAL_BLOCK_SIZE, max(PARTIAL_BLOCK_SIZE, size - PARTIAL_BLOCK_SIZE)))
+    finally:
+        os.close(fd)
+    return digest.hexdigest()
+
+
+def full_hash(path):
+    """Empreinte de tout le contenu, lu par projections mmap successives. Retourne (empreinte, octets lus)."""
+    digest = new_hash()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        offset = 0
+        while offset < size:
+            length = min(MMAP_WINDOW, size - offset)
+            with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ, offset=offset) as view:
+                if hasattr(view, 'madvise'):
+                    view.madvise(mmap.MADV_SEQUENTIAL)
+                digest.update(view)
+            offset += length
+    return digest.hexdigest(), size
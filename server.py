@@ -1,13 +1,43 @@
 import os
 import sys
 import shutil
+import stat as stat_module
 import mimetypes
 import json
-from datetime import datetime
-from flask import Flask, request, jsonify, send_from_directory, render_template, send_file
+import atexit
+import bisect
+import errno
+import gzip
+import multiprocessing
+import select
+import struct
+import subprocess
+import hashlib
+import html
+import sqlite3
+import tempfile
+import unicodedata
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from urllib.parse import quote
+from flask import Flask, g, has_request_context, request, jsonify, render_template, send_file, url_for, Response, stream_with_context
 from flask_cors import CORS
+from werkzeug.http import dump_options_header, http_date
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
-from markupsafe import escape
+from werkzeug.wsgi import wrap_file
+from markupsafe import Markup, escape
+
+import assets
+import hasher
+import thumbnailer
 
 # --- CONFIGURATION ---
 
@@ -25,6 +55,14 @@ if not os.path.isdir(BASE_DIR):
 
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+# Répertoire d'état du serveur (index, caches...), hors de BASE_DIR
+STATE_DIR = os.path.abspath(os.environ.get('FLASK_STATE_DIR', os.path.join(tempfile.gettempdir(), 'filemanager_state')))
+os.makedirs(STATE_DIR, exist_ok=True)
+
+# Index de recherche persistant (0 pour désactiver la resynchronisation périodique)
+SEARCH_INDEX_ENABLED = os.environ.get('FLASK_SEARCH_INDEX', '1') != '0'
+SEARCH_INDEX_RESYNC_INTERVAL = int(os.environ.get('FLASK_SEARCH_RESYNC_INTERVAL', '300'))
+
 # Pas de restriction sur les extensions de fichiers
 ALLOWED_EXTENSIONS = None  # Toutes les extensions sont autorisées
 
@@ -38,10 +76,1162 @@ def secure_path_join(*paths):
         return None
     
     return full_path
+
+def to_relative_path(full_path):
+    """Convertit un chemin absolu sous BASE_DIR en chemin relatif ('' pour la racine)."""
+    relative = os.path.relpath(full_path, BASE_DIR).replace('\\', '/')
+    return '' if relative == '.' else relative
+
+# --- ÉTAT PARTAGÉ ENTRE WORKERS ---
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus
+    fcntl = None
+
+
+class StateDatabase:
+    """Base SQLite de STATE_DIR, avec une connexion par thread (mode WAL, partagée entre workers)."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+
+# --- MÉTRIQUES ET INSTRUMENTATION ---
+
+METRICS_FLUSH_INTERVAL = 5  # secondes entre deux recopies des compteurs du worker dans la base partagée
+# Journal des requêtes lentes avec le détail par phase (en ms, 0 pour désactiver)
+SLOW_REQUEST_MS = int(os.environ.get('FLASK_SLOW_REQUEST_MS', '0'))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Nom -> (type Prometheus, description)
+METRIC_FAMILIES = {
+    'http_requests_total': ('counter', "Requêtes /api traitées, par route, méthode et statut."),
+    'http_request_duration_seconds': ('histogram', "Durée des requêtes /api, par route et méthode."),
+    'http_requests_in_flight': ('gauge', "Requêtes /api en cours, par worker."),
+    'fs_operations_total': ('counter', "Accès au système de fichiers (scandir, entrées lues, stat, entrées de os.walk)."),
+    'fs_bytes_read_total': ('counter', "Octets lus dans les fichiers gérés, par opération."),
+    'fs_bytes_written_total': ('counter', "Octets écrits dans les fichiers gérés, par opération."),
+    'listing_cache_requests_total': ('counter', "Consultations du cache des listings (hit ou miss)."),
+    'search_streams_total': ('counter', "Recherches en flux terminées, par motif (done, limit, time, disconnected)."),
+    'remux_segments_total': ('counter', "Segments remuxés servis, par mode et provenance (cache ou ffmpeg)."),
+    'http_compression_bytes_total': ('counter', "Octets des réponses compressées, avant (in) et après (out) compression, par encodage."),
+    'transfer_wait_seconds_total': ('counter', "Attente imposée aux transferts par l'ordonnanceur de débit, par type."),
+    'transfer_rejected_total': ('counter', "Transferts refusés par l'ordonnanceur, par motif (heavy : trop d'opérations lourdes)."),
+}
+
+
+class Metrics:
+    """Compteurs, jauges et histogrammes du worker, agrégés entre les workers via STATE_DIR.
+
+    Les valeurs sont tenues en mémoire (un verrou, aucune E/S sur le chemin des
+    requêtes) et recopiées périodiquement dans une base SQLite partagée, une
+    ligne par échantillon et par processus ; /metrics en fait la somme. Les
+    compteurs d'un worker arrêté sont conservés (regroupés sous « archive »),
+    ses jauges sont ignorées.
+    """
+
+    def __init__(self, db_path, families, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.families = families
+        self.flush_interval = flush_interval
+        self._values = {}      # (nom, labels) -> valeur (compteurs et jauges)
+        self._histograms = {}  # (nom, labels) -> [effectifs par intervalle, somme, nombre]
+        self._worker = None
+        self._running = False  # Thread d'écriture lancé par start()
+        self._start_worker()
+        with self._db.connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS samples (
+                worker TEXT NOT NULL, pid INTEGER NOT NULL, family TEXT NOT NULL,
+                name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL,
+                PRIMARY KEY (worker, name, labels))""")
+        # Avec gunicorn --preload, le fork hérite des compteurs du maître mais pas du thread d'écriture
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._start_worker)
+        atexit.register(self.flush)
+
+    def _start_worker(self):
+        # Après un fork : ni le verrou ni la connexion SQLite du parent ne sont réutilisables
+        self._lock = threading.Lock()
+        self._db = StateDatabase(self.db_path)
+        self._values.clear()
+        self._histograms.clear()
+        # Identifiant propre au processus : un pid réutilisé n'écrase pas les compteurs d'un ancien worker
+        self._worker = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        if self._running:
+            threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def start(self):
+        """Lance l'écriture périodique des valeurs en base."""
+        self._running = True
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Erreur lors de l'enregistrement des métriques: {e}")
+
+    # Enregistrement (appelé sur le chemin des requêtes)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS) if value <= bound), len(LATENCY_BUCKETS))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def count_fs(self, operation, count=1):
+        """Compte des accès disque, globalement et pour la requête en cours (journal des requêtes lentes)."""
+        if not count:
+            return
+        self.inc('fs_operations_total', count, operation=operation)
+        if has_request_context():
+            counts = g.get('metrics_fs')
+            if counts is not None:
+                counts[operation] = counts.get(operation, 0) + count
+
+    def count_bytes(self, direction, operation, count):
+        """Compte des octets lus (`direction` = 'read') ou écrits ('written') pour une opération."""
+        if not count:
+            return
+        self.inc(f'fs_bytes_{direction}_total', count, operation=operation)
+        if has_request_context():
+            counts = g.get('metrics_fs')
+            if counts is not None:
+                counts[f'bytes_{direction}'] = counts.get(f'bytes_{direction}', 0) + count
+
+    @contextmanager
+    def phase(self, name):
+        """Mesure une étape de la requête en cours, reportée dans le journal des requêtes lentes."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if has_request_context():
+                phases = g.get('metrics_phases')
+                if phases is not None:
+                    phases.append((name, time.perf_counter() - start))
+
+    # Agrégation entre workers
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            for (name, labels), value in self._values.items():
+                samples.append((name, name, labels, value))
+            for (name, labels), (counts, total, count) in self._histograms.items():
+                cumulative = 0
+                for bound, bucket_count in zip(LATENCY_BUCKETS + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    samples.append((name, f'{name}_bucket', labels + (('le', _format_bound(bound)),), cumulative))
+                samples.append((name, f'{name}_sum', labels, total))
+                samples.append((name, f'{name}_count', labels, count))
+        return [(family, sample, json.dumps(labels), value) for family, sample, labels, value in samples]
+
+    def flush(self):
+        """Recopie les valeurs du worker dans la base partagée."""
+        samples = self._samples()
+        conn = self._db.connect()
+        with conn:
+            conn.execute('DELETE FROM samples WHERE worker = ?', (self._worker,))
+            conn.executemany(
+                'INSERT INTO samples (worker, pid, family, name, labels, value) VALUES (?, ?, ?, ?, ?, ?)',
+                [(self._worker, os.getpid(), *sample) for sample in samples])
+
+    def _archive_dead_workers(self, conn):
+        gauges = [name for name, (kind, _) in self.families.items() if kind == 'gauge']
+        workers = conn.execute("SELECT DISTINCT worker, pid FROM samples WHERE worker != 'archive'").fetchall()
+        for worker, pid in workers:
+            if pid == os.getpid() or _pid_alive(pid):
+                continue
+            with conn:
+                conn.execute(f"DELETE FROM samples WHERE worker = ? AND family IN ({','.join('?' * len(gauges))})",
+                             (worker, *gauges))
+                conn.execute(
+                    "INSERT INTO samples (worker, pid, family, name, labels, value) "
+                    "SELECT 'archive', 0, family, name, labels, value FROM samples WHERE worker = ? AND 1 "
+                    "ON CONFLICT(worker, name, labels) DO UPDATE SET value = value + excluded.value",
+                    (worker,))
+                conn.execute('DELETE FROM samples WHERE worker = ?', (worker,))
+
+    def collect(self):
+        """Retourne les échantillons additionnés sur tous les workers : [(famille, nom, labels, valeur)]."""
+        self.flush()
+        conn = self._db.connect()
+        self._archive_dead_workers(conn)
+        rows = conn.execute('SELECT family, name, labels, SUM(value) FROM samples GROUP BY family, name, labels').fetchall()
+        return [(family, name, tuple(tuple(pair) for pair in json.loads(labels)), value)
+                for family, name, labels, value in rows]
+
+    def render(self):
+        """Exposition au format texte de Prometheus."""
+        by_family = {}
+        for family, name, labels, value in self.collect():
+            by_family.setdefault(family, []).append((name, labels, value))
+
+        lines = []
+        for family in sorted(by_family):
+            kind, description = self.families.get(family, ('untyped', ''))
+            lines.append(f'# HELP {family} {description}')
+            lines.append(f'# TYPE {family} {kind}')
+            for name, labels, value in sorted(by_family[family], key=_sample_order):
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else f'{bound:g}'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _sample_order(sample):
+    """Tri d'une famille : par série, puis les intervalles d'histogramme par borne croissante."""
+    name, labels, _ = sample
+    le = next((value for key, value in labels if key == 'le'), None)
+    series = tuple(pair for pair in labels if pair[0] != 'le')
+    return (series, name, float(le) if le is not None else 0.0)
+
+
+metrics = Metrics(os.path.join(STATE_DIR, 'metrics.sqlite3'), METRIC_FAMILIES)
+
+
+@app.before_request
+def metrics_request_started():
+    if not request.path.startswith('/api/'):
+        return
+    g.metrics_started = time.perf_counter()
+    g.metrics_phases = []
+    g.metrics_fs = {}
+    metrics.inc('http_requests_in_flight', 1, pid=str(os.getpid()))
+
+
+@app.after_request
+def metrics_response_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def metrics_request_finished(exc):
+    # Pour une réponse en flux (stream_with_context), appelé à la fin de l'envoi du corps
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    # Le modèle de route (/api/jobs/<job_id>) borne le nombre de séries
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'non_routee'
+    metrics.inc('http_requests_in_flight', -1, pid=str(os.getpid()))
+    metrics.inc('http_requests_total', endpoint=endpoint, method=request.method, status=str(g.get('metrics_status', 500)))
+    metrics.observe('http_request_duration_seconds', duration, endpoint=endpoint, method=request.method)
+
+    if SLOW_REQUEST_MS and duration * 1000 >= SLOW_REQUEST_MS:
+        phases = g.get('metrics_phases') or []
+        other = duration - sum(elapsed for _, elapsed in phases)
+        detail = ', '.join(f"{name}={elapsed * 1000:.0f} ms" for name, elapsed in phases + [('autre', other)])
+        counts = ', '.join(f"{name}={count}" for name, count in sorted((g.get('metrics_fs') or {}).items()))
+        print(f"Requête lente ({duration * 1000:.0f} ms): {request.method} {request.full_path.rstrip('?')} "
+              f"[{detail}] [disque: {counts or 'aucun accès'}]")
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Métriques de tous les workers au format texte de Prometheus."""
+    try:
+        body = metrics.render()
+    except sqlite3.Error as e:
+        print(f"Erreur lors de la lecture des métriques: {e}")
+        return Response(f"# Erreur: {e}\n", status=503, mimetype='text/plain')
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8', headers={"Cache-Control": "no-store"})
+
+
+# --- INDEX DE RECHERCHE PERSISTANT ---
+
+class SearchIndex:
+    """Index SQLite des noms de fichiers de BASE_DIR, partagé entre les workers.
+
+    La table `entries` contient une ligne par fichier/dossier, la table `dirs`
+    le st_mtime de chaque dossier au dernier scan : la resynchronisation ne
+    relit que les dossiers dont le mtime a changé. La table `dir_stats` agrège
+    pour chaque dossier la taille, le nombre de fichiers/dossiers et la date la
+    plus récente de toute sa sous-arborescence ; seuls les dossiers modifiés et
+    leurs ancêtres sont recalculés.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock_path = db_path + '.lock'
+        self._db = StateDatabase(db_path)
+        self._ready = False
+        self._has_fts = False
+        self._init_schema()
+
+    def _connect(self):
+        return self._db.connect()
+
+    def _init_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                path TEXT PRIMARY KEY, parent TEXT NOT NULL, name TEXT NOT NULL,
+                name_lower TEXT NOT NULL, is_folder INTEGER NOT NULL,
+                size INTEGER NOT NULL, mtime REAL NOT NULL)""")
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_parent ON entries(parent)')
+            conn.execute('CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime REAL NOT NULL)')
+            conn.execute("""CREATE TABLE IF NOT EXISTS dir_stats (
+                path TEXT PRIMARY KEY, bytes INTEGER NOT NULL, files INTEGER NOT NULL,
+                folders INTEGER NOT NULL, newest REAL NOT NULL)""")
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        try:
+            # Index trigramme : recherche par sous-chaîne sans parcourir toute la table
+            with conn:
+                conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+                    name_lower, content='entries', content_rowid='rowid', tokenize='trigram')""")
+                conn.execute("""CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+                    INSERT INTO entries_fts(rowid, name_lower) VALUES (new.rowid, new.name_lower); END""")
+                conn.execute("""CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+                    INSERT INTO entries_fts(entries_fts, rowid, name_lower) VALUES ('delete', old.rowid, old.name_lower); END""")
+                conn.execute("""CREATE TRIGGER IF NOT EXISTS entries_au AFTER UPDATE OF name_lower ON entries BEGIN
+                    INSERT INTO entries_fts(entries_fts, rowid, name_lower) VALUES ('delete', old.rowid, old.name_lower);
+                    INSERT INTO entries_fts(rowid, name_lower) VALUES (new.rowid, new.name_lower); END""")
+            self._has_fts = True
+        except sqlite3.OperationalError as e:
+            print(f"Index de recherche: FTS5/trigram indisponible, recherche par balayage de table ({e})")
+
+    def is_ready(self):
+        """Indique si un scan complet a déjà été effectué (par n'importe quel worker)."""
+        if not self._ready:
+            row = self._connect().execute("SELECT value FROM meta WHERE key = 'built_at'").fetchone()
+            self._ready = row is not None
+        return self._ready
+
+    # --- Lecture ---
+
+    def _search_query(self, query):
+        """Requête (sans ORDER BY ni LIMIT) des entrées dont le nom contient `query`, ses paramètres et sa clé de reprise."""
+        query_lower = query.lower()
+        columns = 'e.rowid, e.path, e.name, e.is_folder, e.size, e.mtime'
+        if self._has_fts and len(query_lower) >= 3:
+            return (f'SELECT {columns} FROM entries_fts JOIN entries e ON e.rowid = entries_fts.rowid '
+                    'WHERE entries_fts MATCH ?', ('"' + query_lower.replace('"', '""') + '"',), 'entries_fts.rowid')
+        return f'SELECT {columns} FROM entries e WHERE instr(e.name_lower, ?) > 0', (query_lower,), 'e.rowid'
+
+    def search(self, query):
+        """Retourne les entrées dont le nom contient `query` (insensible à la casse)."""
+        sql, params, _ = self._search_query(query)
+        return [row[1:] for row in self._connect().execute(sql, params)]
+
+    def iter_search(self, query, batch_size=200):
+        """Comme search(), par paquets lus au fur et à mesure.
+
+        Chaque paquet est une requête indépendante (reprise après le dernier rowid),
+        exécutée sur la connexion du thread courant : aucun curseur n'est gardé
+        entre deux paquets, le générateur peut être repris depuis un autre thread (asgi.py).
+        """
+        sql, params, key = self._search_query(query)
+        last_rowid = -1
+        while True:
+            rows = self._connect().execute(f'{sql} AND {key} > ? ORDER BY {key} LIMIT ?',
+                                           (*params, last_rowid, batch_size)).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [row[1:] for row in rows]
+
+    def folder_stats(self, relative_dir):
+        """Statistiques récursives des sous-dossiers directs : {nom: (octets, fichiers, dossiers, plus récent)}."""
+        rows = self._connect().execute(
+            'SELECT e.name, s.bytes, s.files, s.folders, s.newest FROM entries e '
+            'JOIN dir_stats s ON s.path = e.path WHERE e.parent = ? AND e.is_folder = 1',
+            (relative_dir,)).fetchall()
+        return {name: stats for name, *stats in rows}
+
+    def same_size_files(self, relative_dir, min_size):
+        """Fichiers de la sous-arborescence dont la taille est partagée avec un autre : [(chemin, taille)]."""
+        scope, params = '', ()
+        if relative_dir:
+            scope, params = ' AND path >= ? AND path < ?', (relative_dir + '/', relative_dir + '0')
+        return self._connect().execute(
+            f'SELECT path, size FROM entries WHERE is_folder = 0 AND size >= ?{scope} AND size IN '
+            f'(SELECT size FROM entries WHERE is_folder = 0 AND size >= ?{scope} GROUP BY size HAVING COUNT(*) > 1)',
+            (min_size, *params, min_size, *params)).fetchall()
+
+    def stats_for(self, relative_dir):
+        """Statistiques récursives d'un dossier (None s'il n'a pas encore été scanné)."""
+        return self._connect().execute(
+            'SELECT bytes, files, folders, newest FROM dir_stats WHERE path = ?', (relative_dir,)).fetchone()
+
+    # --- Mises à jour ciblées (appelées par les routes de modification) ---
+
+    def _row_for(self, full_path):
+        stat = os.stat(full_path)
+        name = os.path.basename(full_path)
+        relative = to_relative_path(full_path)
+        parent = relative.rpartition('/')[0]
+        is_folder = os.path.isdir(full_path)
+        return (relative, parent, name, name.lower(), int(is_folder), stat.st_size, stat.st_mtime)
+
+    def add(self, full_path):
+        """Ajoute (ou met à jour) un chemin et, pour un dossier, tout son contenu."""
+        conn = self._connect()
+        rows = [self._row_for(full_path)]
+        parent = os.path.dirname(full_path)
+        # Dossiers intermédiaires créés en même temps (upload d'une arborescence)
+        while parent != BASE_DIR and conn.execute('SELECT 1 FROM entries WHERE path = ?', (to_relative_path(parent),)).fetchone() is None:
+            rows.append(self._row_for(parent))
+            parent = os.path.dirname(parent)
+        with conn:
+            self._upsert(conn, rows)
+            if os.path.isdir(full_path) and not os.path.islink(full_path):
+                self._refresh_stats(conn, self._scan_tree(conn, full_path, force=True))
+            self._restat_dirs(conn, [rows[-1][1]])
+
+    def remove(self, relative_path):
+        """Supprime un chemin et tout ce qu'il contient de l'index."""
+        conn = self._connect()
+        with conn:
+            self._delete_subtree(conn, relative_path)
+            self._restat_dirs(conn, [relative_path.rpartition('/')[0]])
+
+    def rename(self, old_relative, new_full_path):
+        """Reporte un renommage/déplacement sur toute la sous-arborescence."""
+        new_relative = to_relative_path(new_full_path)
+        conn = self._connect()
+        prefix_low, prefix_high = old_relative + '/', old_relative + '0'
+        cut = len(old_relative) + 1
+        try:
+            row = self._row_for(new_full_path)
+        except OSError:
+            # Déjà redéplacé ou supprimé (lot d'opérations) : la modification suivante fera le reste
+            row = None
+        with conn:
+            if row is not None:
+                conn.execute('DELETE FROM entries WHERE path = ?', (old_relative,))
+                self._upsert(conn, [row])
+            else:
+                name = os.path.basename(new_full_path)
+                conn.execute('DELETE FROM entries WHERE path = ?', (new_relative,))
+                conn.execute('UPDATE entries SET path = ?, parent = ?, name = ?, name_lower = ? WHERE path = ?',
+                             (new_relative, new_relative.rpartition('/')[0], name, name.lower(), old_relative))
+            conn.execute(
+                'UPDATE entries SET path = ? || substr(path, ?), parent = ? || substr(parent, ?) '
+                'WHERE path >= ? AND path < ?',
+                (new_relative, cut, new_relative, cut, prefix_low, prefix_high))
+            for table in ('dirs', 'dir_stats'):
+                conn.execute(f'UPDATE {table} SET path = ? || substr(path, ?) WHERE path = ? OR (path >= ? AND path < ?)',
+                             (new_relative, cut, old_relative, prefix_low, prefix_high))
+            self._restat_dirs(conn, [old_relative.rpartition('/')[0], new_relative.rpartition('/')[0]])
+
+    def _restat_dirs(self, conn, relative_dirs):
+        """Met à jour la date des dossiers dont le contenu vient de changer, puis leurs agrégats."""
+        rows = []
+        for relative in relative_dirs:
+            if relative:
+                try:
+                    rows.append(self._row_for(os.path.join(BASE_DIR, relative)))
+                except OSError:
+                    pass
+        self._upsert(conn, rows)
+        self._refresh_stats(conn, relative_dirs)
+
+    # --- Scan ---
+
+    def _delete_subtree(self, conn, relative_path):
+        prefix_low, prefix_high = relative_path + '/', relative_path + '0'  # '0' suit '/' en ASCII
+        conn.execute('DELETE FROM entries WHERE path = ? OR (path >= ? AND path < ?)',
+                     (relative_path, prefix_low, prefix_high))
+        for table in ('dirs', 'dir_stats'):
+            conn.execute(f'DELETE FROM {table} WHERE path = ? OR (path >= ? AND path < ?)',
+                         (relative_path, prefix_low, prefix_high))
+
+    def _upsert(self, conn, rows):
+        conn.executemany(
+            'INSERT INTO entries (path, parent, name, name_lower, is_folder, size, mtime) VALUES (?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(path) DO UPDATE SET name = excluded.name, name_lower = excluded.name_lower, '
+            'is_folder = excluded.is_folder, size = excluded.size, mtime = excluded.mtime',
+            rows)
+
+    def _rescan_dir(self, conn, dir_path, relative_dir):
+        """Relit le contenu direct d'un dossier et retourne ses sous-dossiers (hors liens)."""
+        rows = []
+        subdirs = []
+        with os.scandir(dir_path) as it:
+            metrics.count_fs('scandir')
+            for entry in it:
+                try:
+                    stat = entry.stat()
+                    is_folder = entry.is_dir()
+                except OSError:
+                    continue
+                relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                rows.append((relative, relative_dir, entry.name, entry.name.lower(), int(is_folder), stat.st_size, stat.st_mtime))
+                if is_folder and not entry.is_symlink():
+                    subdirs.append((entry.path, relative, stat.st_mtime))
+        metrics.count_fs('entries', len(rows))
+        metrics.count_fs('stat', len(rows))
+
+        known = {name for (name,) in conn.execute('SELECT name FROM entries WHERE parent = ?', (relative_dir,))}
+        present = {row[2] for row in rows}
+        for name in known - present:
+            self._delete_subtree(conn, f"{relative_dir}/{name}" if relative_dir else name)
+        self._upsert(conn, rows)
+        return subdirs
+
+    def _scan_tree(self, conn, root_path, force=False):
+        """Parcourt l'arborescence en ne relisant que les dossiers modifiés. Retourne les dossiers relus."""
+        root_relative = to_relative_path(root_path)
+        stack = [(root_path, root_relative, os.stat(root_path).st_mtime)]
+        rescanned = []
+        while stack:
+            dir_path, relative_dir, mtime = stack.pop()
+            row = conn.execute('SELECT mtime FROM dirs WHERE path = ?', (relative_dir,)).fetchone()
+            if force or row is None or row[0] != mtime:
+                try:
+                    subdirs = self._rescan_dir(conn, dir_path, relative_dir)
+                except OSError:
+                    continue
+                conn.execute('INSERT OR REPLACE INTO dirs (path, mtime) VALUES (?, ?)', (relative_dir, mtime))
+                rescanned.append(relative_dir)
+                if len(rescanned) % 500 == 0:
+                    conn.commit()  # Ne pas bloquer les autres workers pendant un long scan
+            else:
+                subdirs = []
+                for (name,) in conn.execute('SELECT name FROM entries WHERE parent = ? AND is_folder = 1', (relative_dir,)).fetchall():
+                    sub_path = os.path.join(dir_path, name)
+                    metrics.count_fs('stat')
+                    try:
+                        sub_stat = os.lstat(sub_path)
+                    except OSError:
+                        continue
+                    if stat_module.S_ISDIR(sub_stat.st_mode):
+                        subdirs.append((sub_path, f"{relative_dir}/{name}" if relative_dir else name, sub_stat.st_mtime))
+            stack.extend(subdirs)
+        return rescanned
+
+    def _refresh_stats(self, conn, relative_dirs):
+        """Recalcule les agrégats des dossiers donnés et de tous leurs ancêtres, du plus profond à la racine."""
+        pending = set()
+        for relative in relative_dirs:
+            while relative not in pending:
+                pending.add(relative)
+                if not relative:
+                    break
+                relative = relative.rpartition('/')[0]
+
+        depth = lambda relative: relative.count('/') + 1 if relative else 0
+        for count, relative in enumerate(sorted(pending, key=depth, reverse=True), 1):
+            self._compute_stats(conn, relative)
+            if count % 2000 == 0:
+                conn.commit()
+
+    def _compute_stats(self, conn, relative_dir):
+        """Agrège un dossier à partir de ses fichiers directs et des agrégats de ses sous-dossiers."""
+        own_mtime = None
+        if relative_dir:
+            row = conn.execute('SELECT mtime FROM entries WHERE path = ? AND is_folder = 1', (relative_dir,)).fetchone()
+            if row is None:
+                conn.execute('DELETE FROM dir_stats WHERE path = ?', (relative_dir,))
+                return
+            own_mtime = row[0]
+        files_bytes, files, files_newest = conn.execute(
+            'SELECT COALESCE(SUM(size), 0), COUNT(*), MAX(mtime) FROM entries WHERE parent = ? AND is_folder = 0',
+            (relative_dir,)).fetchone()
+        # Les liens vers des dossiers n'ont pas d'agrégat : leur cible n'est pas comptée deux fois
+        sub_bytes, sub_files, sub_folders, sub_newest, folders, folders_newest = conn.execute(
+            'SELECT COALESCE(SUM(s.bytes), 0), COALESCE(SUM(s.files), 0), COALESCE(SUM(s.folders), 0), MAX(s.newest), '
+            'COUNT(*), MAX(e.mtime) FROM entries e JOIN dir_stats s ON s.path = e.path '
+            'WHERE e.parent = ? AND e.is_folder = 1',
+            (relative_dir,)).fetchone()
+        newest = max((t for t in (own_mtime, files_newest, sub_newest, folders_newest) if t is not None), default=0)
+        conn.execute('INSERT OR REPLACE INTO dir_stats (path, bytes, files, folders, newest) VALUES (?, ?, ?, ?, ?)',
+                     (relative_dir, files_bytes + sub_bytes, files + sub_files, folders + sub_folders, newest))
+
+    def sync(self, full=False, blocking=False):
+        """Resynchronise l'index avec le disque. Un seul worker scanne à la fois."""
+        lock_file = open(self.lock_path, 'w')
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    return False
+            started = time.time()
+            conn = self._connect()
+            with conn:
+                rescanned = self._scan_tree(conn, BASE_DIR, force=full)
+                if conn.execute("SELECT 1 FROM meta WHERE key = 'stats_built'").fetchone() is None:
+                    # Premier calcul des agrégats (index construit par une version antérieure)
+                    rescanned = [path for (path,) in conn.execute('SELECT path FROM dirs')]
+                self._refresh_stats(conn, rescanned)
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('built_at', ?)", (str(time.time()),))
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('stats_built', '1')")
+            self._ready = True
+            if rescanned:
+                # Modifications faites hors du serveur : listings, tailles et clients à rafraîchir
+                # (au-delà de 1000 dossiers, un seul événement « tout relire » suffit)
+                change_log.append([('rescanned', path) for path in rescanned] if len(rescanned) <= 1000 else [('overflow', '')])
+                print(f"Index de recherche: {len(rescanned)} dossier(s) relu(s) en {time.time() - started:.1f}s")
+            return True
+        finally:
+            lock_file.close()
+
+    def start_background_sync(self, interval):
+        """Lance le scan initial puis la resynchronisation périodique dans un thread démon."""
+        def worker():
+            while True:
+                try:
+                    self.sync()
+                except Exception as e:
+                    print(f"Erreur lors de la synchronisation de l'index de recherche: {e}")
+                if interval <= 0:
+                    return
+                time.sleep(interval)
+
+        threading.Thread(target=worker, name='search-index-sync', daemon=True).start()
+
+
+search_index = SearchIndex(os.path.join(STATE_DIR, 'search_index.sqlite3')) if SEARCH_INDEX_ENABLED else None
+
+
+# --- JOURNAL DES MODIFICATIONS ---
+
+CHANGE_LOG_RETENTION = 3600  # Modifications conservées 1h (reprise des flux SSE, workers en retard)
+
+
+class ChangeLog:
+    """Journal SQLite des modifications du système de fichiers, partagé entre les workers.
+
+    Alimenté par les routes de modification et par la surveillance du disque ;
+    lu par le cache des listings (invalidation ciblée) et par le flux /api/events.
+    Chaque entrée désigne le dossier dont le listing a changé.
+    """
+
+    def __init__(self, db_path):
+        self._db = StateDatabase(db_path)
+        self._last_prune = 0.0
+        with self._db.connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, time REAL NOT NULL,
+                action TEXT NOT NULL, path TEXT NOT NULL, dir TEXT NOT NULL)""")
+
+    def append(self, changes):
+        """Enregistre des modifications (action, chemin relatif).
+
+        Actions : 'created', 'deleted', 'modified' (le listing du parent change),
+        'rescanned' (le contenu du dossier lui-même a été relu) et 'overflow'
+        (événements perdus : tout doit être relu).
+        """
+        now = time.time()
+        rows = [(now, action, path, path if action in ('rescanned', 'overflow') else path.rpartition('/')[0])
+                for action, path in changes]
+        if not rows:
+            return
+        with self._db.connect() as conn:
+            conn.executemany('INSERT INTO changes (time, action, path, dir) VALUES (?, ?, ?, ?)', rows)
+            if now - self._last_prune > 60:
+                self._last_prune = now
+                conn.execute('DELETE FROM changes WHERE time < ?', (now - CHANGE_LOG_RETENTION,))
+
+    def last_id(self):
+        return self._db.connect().execute('SELECT COALESCE(MAX(id), 0) FROM changes').fetchone()[0]
+
+    def first_id(self):
+        return self._db.connect().execute('SELECT COALESCE(MIN(id), 0) FROM changes').fetchone()[0]
+
+    def since(self, last_id):
+        """Modifications postérieures à `last_id` : [(id, action, chemin, dossier)]."""
+        return self._db.connect().execute(
+            'SELECT id, action, path, dir FROM changes WHERE id > ? ORDER BY id', (last_id,)).fetchall()
+
+
+change_log = ChangeLog(os.path.join(STATE_DIR, 'changes.sqlite3'))
+
+
+# --- CACHE DES LISTINGS DE DOSSIERS ---
+
+LIST_CACHE_MAX_ENTRIES = int(os.environ.get('FLASK_LIST_CACHE_MAX_ENTRIES', '200000'))
+
+
+class ListingCache:
+    """Cache LRU des contenus de dossiers, limité en nombre total d'entrées.
+
+    Une entrée reste valide tant que l'inode et le st_mtime du dossier n'ont
+    pas changé et qu'aucune modification le concernant n'apparaît dans le
+    journal partagé. Le journal couvre ce que le mtime du dossier ne voit pas
+    (fichier écrasé, taille d'un sous-dossier) et les écritures faites par les
+    autres workers ou par d'autres programmes.
+    """
+
+    def __init__(self, max_entries, changes):
+        self.max_entries = max_entries
+        self.changes = changes
+        self._lock = threading.Lock()
+        self._items = OrderedDict()  # chemin -> (validateur, entrées)
+        self._size = 0
+        # Version de chaque dossier = dernière modification le concernant dans le journal ;
+        # les dossiers absents ont la version de base (journal au démarrage ou dernier débordement)
+        self._last_change = changes.last_id()
+        self._base_version = self._last_change
+        self._versions = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _apply_changes(self):
+        rows = self.changes.since(self._last_change)
+        if not rows:
+            return
+        with self._lock:
+            for change_id, action, path, relative_dir in rows:
+                if action == 'overflow' or len(self._versions) > self.max_entries:
+                    self._items.clear()
+                    self._size = 0
+                    self._versions.clear()
+                    self._base_version = change_id
+                    continue
+                self._drop(os.path.join(BASE_DIR, path) if path else BASE_DIR)
+                # Dossier modifié et ses ancêtres (dont la taille récursive change)
+                dir_path = os.path.join(BASE_DIR, relative_dir) if relative_dir else BASE_DIR
+                self._drop(dir_path)
+                while True:
+                    self._versions[dir_path] = change_id
+                    if dir_path == BASE_DIR:
+                        break
+                    dir_path = os.path.dirname(dir_path)
+            self._last_change = rows[-1][0]
+
+    def _drop(self, dir_path):
+        previous = self._items.pop(dir_path, None)
+        if previous is not None:
+            self._size -= len(previous[1])
+
+    def validator(self, dir_path):
+        """Identifiant de version du dossier : (inode, mtime en ns, version dans le journal)."""
+        self._apply_changes()
+        stat = os.stat(dir_path)
+        metrics.count_fs('stat')
+        return (stat.st_ino, stat.st_mtime_ns, self._versions.get(dir_path, self._base_version))
+
+    def get(self, dir_path, validator, loader):
+        """Retourne les entrées du dossier, en les relisant via `loader` si besoin."""
+        with self._lock:
+            cached = self._items.get(dir_path)
+            if cached is not None and cached[0] == validator:
+                self._items.move_to_end(dir_path)
+                self.hits += 1
+                metrics.inc('listing_cache_requests_total', result='hit')
+                return cached[1]
+            self.misses += 1
+        metrics.inc('listing_cache_requests_total', result='miss')
+
+        entries = loader(dir_path)
+
+        with self._lock:
+            self._drop(dir_path)
+            if len(entries) <= self.max_entries:
+                self._items[dir_path] = (validator, entries)
+                self._size += len(entries)
+                while self._size > self.max_entries:
+                    _, (_, evicted) = self._items.popitem(last=False)
+                    self._size -= len(evicted)
+        return entries
+
+
+listing_cache = ListingCache(LIST_CACHE_MAX_ENTRIES, change_log)
+
+
+def notify_fs_change(action, full_path, new_full_path=None):
+    """Répercute une modification faite par le serveur ('created', 'deleted', 'moved') sur les index et caches."""
+    notify_fs_changes([(action, full_path, new_full_path)])
+
+
+def notify_fs_changes(changes):
+    """Comme notify_fs_change pour plusieurs modifications [(action, chemin, nouveau chemin)] : une seule écriture du journal."""
+    logged = []
+    for action, full_path, new_full_path in changes:
+        try:
+            if search_index is not None:
+                if action == 'created':
+                    search_index.add(full_path)
+                elif action == 'deleted':
+                    search_index.remove(to_relative_path(full_path))
+                elif action == 'moved':
+                    search_index.rename(to_relative_path(full_path), new_full_path)
+        except Exception as e:
+            print(f"Erreur lors de la mise à jour de l'index ({action} {full_path}): {e}")
+
+        relative_path = to_relative_path(full_path)
+        if action == 'moved':
+            logged.extend([('deleted', relative_path), ('created', to_relative_path(new_full_path))])
+        else:
+            logged.append((action, relative_path))
+
+    # Journalisé après l'index : un listing qui voit la modification voit aussi les nouvelles tailles
+    change_log.append(logged)
+
+
+# --- SURVEILLANCE DU DISQUE ET ÉVÉNEMENTS EN DIRECT ---
+
+WATCH_MODE = os.environ.get('FLASK_WATCH', 'inotify')  # 'inotify' (avec repli), 'poll' ou '0'
+WATCH_POLL_INTERVAL = int(os.environ.get('FLASK_WATCH_POLL_INTERVAL', '30'))
+WATCH_COALESCE_DELAY = 0.5  # Attente d'autres événements avant de traiter un lot (s)
+WATCH_COALESCE_MAX = 3.0  # Durée maximale d'un lot (s)
+EVENTS_POLL_INTERVAL = 0.5
+EVENTS_HEARTBEAT = 15
+EVENTS_MAX_DURATION = int(os.environ.get('FLASK_EVENTS_MAX_DURATION', '300'))  # Puis le navigateur se reconnecte
+
+# Constantes de <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+INOTIFY_WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+                      IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class FileSystemWatcher:
+    """Surveille BASE_DIR pour les modifications faites hors du serveur (Jellyfin, autres conteneurs...).
+
+    Un seul worker surveille (verrou dans STATE_DIR) ; les autres prennent le
+    relais s'il s'arrête. Les événements inotify sont regroupés par lots, puis
+    répercutés sur l'index et le journal des modifications. Si inotify est
+    indisponible (autre OS, limite de watches atteinte), ou avec FLASK_WATCH=poll
+    pour les systèmes de fichiers réseau qu'inotify ne voit pas, l'index est
+    resynchronisé périodiquement à la place.
+    """
+
+    def __init__(self, root, lock_path):
+        self.root = root
+        self.lock_path = lock_path
+        self.mode = None  # 'inotify' ou 'polling' une fois démarré, dans le worker surveillant
+        self._fd = None
+        self._libc = None
+        self._watches = {}  # descripteur de watch -> chemin du dossier
+
+    def start(self):
+        threading.Thread(target=self._run, name='fs-watcher', daemon=True).start()
+
+    def _run(self):
+        # Verrou gardé pendant toute la vie du worker ; bloquant : attend la fin du surveillant actuel
+        self._lock_file = open(self.lock_path, 'w')
+        if fcntl is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+
+        if WATCH_MODE != 'poll':
+            try:
+                self._run_inotify()
+            except Exception as e:
+                print(f"Surveillance inotify indisponible ({e}) : resynchronisation toutes les {WATCH_POLL_INTERVAL}s.")
+            finally:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._watches.clear()
+        self._run_polling()
+
+    # --- inotify ---
+
+    def _init_inotify(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, "inotify n'existe que sous Linux")
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._libc.inotify_rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+        fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self._fd = fd
+        self._get_errno = ctypes.get_errno
+
+    def _add_watch(self, dir_path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dir_path), INOTIFY_WATCH_MASK)
+        if wd < 0:
+            error = self._get_errno()
+            if error == errno.ENOSPC:
+                raise OSError(error, "limite de watches atteinte (augmenter fs.inotify.max_user_watches)")
+            return  # Dossier supprimé entre-temps, ou illisible
+        self._watches[wd] = dir_path
+
+    def _add_tree(self, dir_path):
+        """Surveille un dossier et tous ses sous-dossiers (sans suivre les liens)."""
+        self._add_watch(dir_path)
+        for root, dirs, files in os.walk(dir_path):
+            for name in dirs:
+                sub_path = os.path.join(root, name)
+                if not os.path.islink(sub_path):
+                    self._add_watch(sub_path)
+
+    def _remove_tree(self, dir_path):
+        """Cesse de surveiller un dossier sorti de l'arborescence (ses watches suivraient l'inode)."""
+        prefix = dir_path + os.sep
+        for wd, path in list(self._watches.items()):
+            if path == dir_path or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+
+    def _read_events(self, timeout):
+        """Lit les événements disponibles : [(masque, chemin)], ou [] à l'expiration du délai."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        buffer = os.read(self._fd, 256 * 1024)
+        events = []
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, cookie, name_length = INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(buffer[offset:offset + name_length].rstrip(b'\0'))
+            offset += name_length
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            dir_path = self._watches.get(wd)
+            if mask & IN_Q_OVERFLOW:
+                events.append((mask, None))
+            elif dir_path is not None and name:
+                events.append((mask, os.path.join(dir_path, name)))
+        return events
+
+    def _run_inotify(self):
+        self._init_inotify()
+        started = time.time()
+        self._add_tree(self.root)
+        self.mode = 'inotify'
+        print(f"Surveillance inotify de {len(self._watches)} dossier(s) active ({time.time() - started:.1f}s).")
+
+        while True:
+            events = self._read_events(None)
+            # Regroupement : une copie de 1000 fichiers donne un seul lot
+            first = time.time()
+            while events:
+                more = self._read_events(min(WATCH_COALESCE_DELAY, max(0, first + WATCH_COALESCE_MAX - time.time())))
+                if not more:
+                    break
+                events.extend(more)
+            if events:
+                self._process(events)
+
+    def _process(self, events):
+        if any(path is None for mask, path in events):
+            # File d'événements du noyau débordée : resynchronisation et nouvelles watches
+            if search_index is not None:
+                search_index.sync(blocking=True)
+            self._add_tree(self.root)
+            change_log.append([('overflow', '')])
+            return
+
+        touched = {}
+        for mask, path in events:
+            touched[path] = mask | touched.get(path, 0)
+
+        changes = []
+        added_dirs = []
+        for path in sorted(touched):
+            mask = touched[path]
+            exists = os.path.lexists(path)
+            if mask & IN_ISDIR and mask & IN_MOVED_FROM:
+                self._remove_tree(path)
+            # Contenu d'un dossier arrivé dans ce lot : déjà indexé avec lui
+            covered = any(path.startswith(added + os.sep) for added in added_dirs)
+            if exists and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and not covered:
+                self._add_tree(path)
+                added_dirs.append(path)
+            elif covered:
+                continue
+            try:
+                if search_index is not None:
+                    if exists:
+                        search_index.add(path)
+                    else:
+                        search_index.remove(to_relative_path(path))
+            except Exception as e:
+                print(f"Erreur lors de la mise à jour de l'index pour {path}: {e}")
+            if exists:
+                changes.append(('created' if mask & (IN_CREATE | IN_MOVED_TO) else 'modified', to_relative_path(path)))
+            else:
+                changes.append(('deleted', to_relative_path(path)))
+        change_log.append(changes)
+
+    # --- Repli : resynchronisation périodique ---
+
+    def _run_polling(self):
+        if search_index is None:
+            return  # Sans index, le mtime des dossiers suffit au cache des listings
+        self.mode = 'polling'
+        while True:
+            time.sleep(WATCH_POLL_INTERVAL)
+            try:
+                search_index.sync(blocking=True)  # Journalise les dossiers relus
+            except Exception as e:
+                print(f"Erreur lors de la resynchronisation périodique: {e}")
+
+
+fs_watcher = FileSystemWatcher(BASE_DIR, os.path.join(STATE_DIR, 'watcher.lock')) if WATCH_MODE != '0' else None
+
+
+ASGI_IDLE_WAIT_KEY = 'filemanager.idle_wait'  # Posé par asgi.py : le serveur sait attendre sans occuper de thread
+
+
+class IdleWait(bytes):
+    """Morceau vide d'un flux demandant au serveur ASGI d'attendre `seconds` avant de reprendre le générateur."""
+
+    def __new__(cls, seconds):
+        wait = super().__new__(cls, b'')
+        wait.seconds = seconds
+        return wait
+
+
+def stream_idle(seconds):
+    """Attente entre deux sondages d'un flux (`yield from`) : rendue à asgi.py, sinon time.sleep().
+
+    Sous asgi.py, l'attente se fait dans la boucle d'événements et un flux
+    n'occupe un thread du pool que le temps d'un sondage.
+    """
+    if has_request_context() and request.environ.get(ASGI_IDLE_WAIT_KEY):
+        yield IdleWait(seconds)
+    else:
+        time.sleep(seconds)
+
+
+def iter_change_events(last_id):
+    """Flux SSE : les modifications du journal, regroupées par intervalle de sondage."""
+    yield "retry: 2000\n\n"
+    started = last_activity = time.time()
+    while time.time() - started < EVENTS_MAX_DURATION:
+        rows = change_log.since(last_id)
+        # Reprise après une trop longue absence : des modifications ont été purgées
+        overflow = bool(rows) and rows[0][0] > last_id + 1 and change_log.first_id() > last_id + 1
+        if rows:
+            last_id = rows[-1][0]
+            dirs = sorted({'/' + relative_dir for _, _, _, relative_dir in rows})
+            overflow = overflow or any(action == 'overflow' for _, action, _, _ in rows)
+            payload = json.dumps({"dirs": dirs, "rescan": overflow})
+            yield f"id: {last_id}\nevent: change\ndata: {payload}\n\n"
+            last_activity = time.time()
+        elif time.time() - last_activity >= EVENTS_HEARTBEAT:
+            yield ": ping\n\n"  # Maintient la connexion ouverte à travers les proxys
+            last_activity = time.time()
+        yield from stream_idle(EVENTS_POLL_INTERVAL)
+
+
+@app.route('/api/events', methods=['GET'])
+def api_events():
+    """Flux Server-Sent Events des modifications de fichiers (serveur et programmes externes).
+
+    Chaque événement `change` donne les dossiers dont le contenu a changé ;
+    `rescan` indique que des modifications ont pu être manquées (tout rafraîchir).
+    Le flux se ferme après FLASK_EVENTS_MAX_DURATION secondes et le navigateur
+    se reconnecte en envoyant Last-Event-ID. Sous gunicorn, chaque flux
+    occupe un thread (--threads) pendant toute sa durée ; sous asgi.py, il
+    n'en occupe un que le temps de chaque sondage (voir stream_idle).
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        last_id = int(last_event_id) if last_event_id else change_log.last_id()
+    except ValueError:
+        last_id = change_log.last_id()
+
+    return Response(
+        stream_with_context(iter_change_events(last_id)),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.route('/test')
 def test():
     """Page de test des modules JavaScript"""
     return render_template('test.html')
+# --- RESSOURCES STATIQUES (BUNDLES EMPREINTÉS, VOIR assets.py) ---
+
+ASSETS_ENABLED = os.environ.get('FLASK_ASSETS', '1') != '0'  # 0 : fichiers séparés de static/ (développement)
+ASSETS_DIR = os.path.join(app.static_folder, 'dist')
+ASSETS_MAX_AGE = 365 * 24 * 3600
+TAILWIND_CDN_URL = 'https://cdn.tailwindcss.com'
+FONTAWESOME_CDN_URL = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.2/css/all.min.css'
+
+# Lu une fois par worker : une nouvelle construction demande un redémarrage
+asset_manifest = assets.load_manifest(ASSETS_DIR) if ASSETS_ENABLED else {}
+if ASSETS_ENABLED and not asset_manifest:
+    print("Ressources non construites (python assets.py) : fichiers séparés et CDN utilisés.")
+
+
+def asset_url(name):
+    """URL du fichier empreinté d'une ressource (app.js, tailwind.css...), None si absente."""
+    filename = asset_manifest.get(name)
+    return url_for('static_asset', filename=filename) if filename else None
+
+
+def vendor_stylesheets():
+    """Balises de Tailwind et Font Awesome : fichiers locaux s'ils ont été construits, CDN sinon."""
+    tailwind = asset_url('tailwind.css')
+    fontawesome = asset_url('fontawesome.css')
+    return Markup('\n'.join((
+        f'<link rel="stylesheet" href="{tailwind}">' if tailwind else f'<script src="{TAILWIND_CDN_URL}"></script>',
+        f'<link rel="stylesheet" href="{fontawesome}">' if fontawesome else
+        f'<link rel="stylesheet" href="{FONTAWESOME_CDN_URL}" crossorigin="anonymous" referrerpolicy="no-referrer" />',
+    )))
+
+
+@app.context_processor
+def inject_assets():
+    return {"asset_url": asset_url, "vendor_stylesheets": vendor_stylesheets, "app_scripts": assets.APP_SCRIPTS}
+
+
+@app.route('/assets/<path:filename>')
+def static_asset(filename):
+    """Fichiers de static/dist : leur nom change avec leur contenu, le navigateur les garde sans revalider."""
+    full_path = safe_join(ASSETS_DIR, filename)
+    if full_path is None or filename == assets.MANIFEST_NAME or not os.path.isfile(full_path):
+        return "Ressource introuvable.", 404
+    response = send_file_compressed(full_path, mimetypes.guess_type(full_path)[0] or 'application/octet-stream')
+    response.headers["Cache-Control"] = f"public, max-age={ASSETS_MAX_AGE}, immutable"
+    return response
+
+
 # --- ROUTES PRINCIPALES ---
 
 @app.route('/')
@@ -51,9 +1241,162 @@ def index():
 
 # --- API DE GESTION DE FICHIERS ---
 
+LIST_SORT_KEYS = ('name', 'size', 'modified', 'type')
+LIST_FORMATS = ('full', 'compact')
+
+
+class _ListedEntry:
+    """Entrée d'un listing ; le stat n'est fait que si le tri, le filtre ou la page l'exigent."""
+
+    __slots__ = ('entry', 'name', 'is_folder', '_stat', '_mime_type')
+
+    def __init__(self, entry, is_folder):
+        self.entry = entry
+        self.name = entry.name
+        self.is_folder = is_folder
+        self._stat = None
+        self._mime_type = None
+
+    @property
+    def stat(self):
+        if self._stat is None:
+            metrics.count_fs('stat')
+            try:
+                self._stat = self.entry.stat()
+            except OSError:
+                # Lien symbolique cassé : on décrit le lien lui-même
+                self._stat = self.entry.stat(follow_symlinks=False)
+        return self._stat
+
+    @property
+    def mime_type(self):
+        if self._mime_type is None:
+            self._mime_type = mimetypes.guess_type(self.name)[0] or 'application/octet-stream'
+        return self._mime_type
+
+    def to_dict(self, relative_path, folder_stats=None):
+        item = {
+            "name": self.name,
+            "is_folder": self.is_folder,
+            "size": self.stat.st_size,
+            "modified": datetime.fromtimestamp(self.stat.st_mtime).isoformat(),
+            "mime_type": self.mime_type,
+            "full_relative_path": f"{relative_path}/{self.name}" if relative_path else self.name
+        }
+        if folder_stats is not None:
+            # Taille récursive du dossier (index), au lieu de la taille de l'inode
+            total_bytes, file_count, folder_count, newest = folder_stats
+            item.update(size=total_bytes, file_count=file_count, folder_count=folder_count,
+                        newest_modified=datetime.fromtimestamp(newest).isoformat() if newest else None)
+        return item
+
+
+def compact_listing(entries, relative_path, stats):
+    """Encodage compact d'une page de listing : une colonne par champ plutôt qu'un objet par entrée.
+
+    Le chemin du dossier n'apparaît qu'une fois (prefix), les dates sont en secondes
+    epoch et chaque type MIME est remplacé par sa position dans mime_types.
+    """
+    mime_types = {}
+    columns = {"name": [], "is_folder": [], "size": [], "modified": [], "mime_type": []}
+    folder_columns = {"file_count": [], "folder_count": [], "newest_modified": []}
+    for e in entries:
+        folder_stats = stats.get(e.name) if e.is_folder else None
+        columns["name"].append(e.name)
+        columns["is_folder"].append(1 if e.is_folder else 0)
+        columns["size"].append(folder_stats[0] if folder_stats else e.stat.st_size)
+        columns["modified"].append(int(e.stat.st_mtime))
+        columns["mime_type"].append(mime_types.setdefault(e.mime_type, len(mime_types)))
+        _, file_count, folder_count, newest = folder_stats or (None, None, None, None)
+        folder_columns["file_count"].append(file_count)
+        folder_columns["folder_count"].append(folder_count)
+        folder_columns["newest_modified"].append(int(newest) if newest else None)
+    # Colonnes des agrégats de dossiers omises si aucune entrée n'en a
+    if any(count is not None for count in folder_columns["file_count"]):
+        columns.update(folder_columns)
+    return {
+        "prefix": f"{relative_path}/" if relative_path else "",
+        "count": len(entries),
+        "columns": columns,
+        "mime_types": list(mime_types)
+    }
+
+
+def scan_directory(target_dir):
+    """Lit les entrées visibles d'un dossier (sans stat : DirEntry.is_dir() suffit)."""
+    entries = []
+    read = 0
+    with os.scandir(target_dir) as it:
+        for entry in it:
+            read += 1
+            if entry.name.startswith('.'):
+                continue
+            try:
+                is_folder = entry.is_dir()
+            except OSError:
+                is_folder = False
+            entries.append(_ListedEntry(entry, is_folder))
+    metrics.count_fs('scandir')
+    metrics.count_fs('entries', read)
+    return entries
+
+
+def list_directory(target_dir, relative_path, sort='name', descending=False, name_filter='', type_filter='', offset=0, limit=None, validator=None, compact=False):
+    """Liste un dossier (via le cache) : filtre, trie, puis ne sérialise que la page demandée.
+
+    Retourne (entrées de la page, nombre total d'entrées après filtrage) ; avec
+    compact, la page est encodée par compact_listing.
+    """
+    with metrics.phase('scan'):
+        entries = listing_cache.get(target_dir, validator or listing_cache.validator(target_dir), scan_directory)
+    with metrics.phase('index'):
+        # Agrégats des sous-dossiers : une seule requête SQLite, aucun parcours disque
+        stats = search_index.folder_stats(relative_path) if search_index is not None and search_index.is_ready() else {}
+
+    if name_filter:
+        name_filter = name_filter.lower()
+        entries = [e for e in entries if name_filter in e.name.lower()]
+
+    if type_filter == 'folder':
+        entries = [e for e in entries if e.is_folder]
+    elif type_filter == 'file':
+        entries = [e for e in entries if not e.is_folder]
+    elif type_filter:
+        # Préfixe MIME : 'image', 'video/', 'application/pdf'...
+        entries = [e for e in entries if not e.is_folder and e.mime_type.startswith(type_filter)]
+
+    if sort == 'size':
+        sort_key = lambda e: stats[e.name][0] if e.is_folder and e.name in stats else e.stat.st_size
+    elif sort == 'modified':
+        sort_key = lambda e: e.stat.st_mtime
+    elif sort == 'type':
+        sort_key = lambda e: (e.mime_type, e.name.lower())
+    else:
+        sort_key = lambda e: e.name.lower()
+
+    with metrics.phase('sort'):
+        # Dossiers toujours en premier, le sens du tri s'applique à l'intérieur de chaque groupe
+        folders = sorted((e for e in entries if e.is_folder), key=sort_key, reverse=descending)
+        files = sorted((e for e in entries if not e.is_folder), key=sort_key, reverse=descending)
+        ordered = folders + files
+
+    with metrics.phase('serialize'):
+        page = ordered[offset:] if limit is None else ordered[offset:offset + limit]
+        if compact:
+            return compact_listing(page, relative_path, stats), len(ordered)
+        return [e.to_dict(relative_path, stats.get(e.name) if e.is_folder else None) for e in page], len(ordered)
+
+
 @app.route('/api/list', methods=['GET'])
 def api_list():
-    """Liste les fichiers et dossiers du chemin spécifié."""
+    """Liste les fichiers et dossiers du chemin spécifié.
+
+    Paramètres optionnels : sort (name, size, modified, type), order (asc, desc),
+    filter (sous-chaîne du nom), type (folder, file ou préfixe MIME), offset et limit.
+    Sans limit, tout le dossier est renvoyé. thumbnails=<taille> lance en
+    arrière-plan la génération des miniatures du dossier. format=compact remplace
+    la liste d'objets files par les colonnes de compact_listing (clé listing).
+    """
     client_path = request.args.get('path', '/')
     relative_path = client_path.strip('/')
 
@@ -65,51 +1408,205 @@ def api_list():
     if not os.path.isdir(target_dir):
         return jsonify({"error": "Le chemin spécifié n'est pas un répertoire."}), 404
 
+    sort = request.args.get('sort', 'name')
+    if sort not in LIST_SORT_KEYS:
+        return jsonify({"error": f"Tri invalide (valeurs possibles : {', '.join(LIST_SORT_KEYS)})."}), 400
+
+    list_format = request.args.get('format', 'full')
+    if list_format not in LIST_FORMATS:
+        return jsonify({"error": f"Format invalide (valeurs possibles : {', '.join(LIST_FORMATS)})."}), 400
+
     try:
-        files = []
-        for name in os.listdir(target_dir):
-            if name.startswith('.'):
-                continue
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = request.args.get('limit')
+        limit = max(1, int(limit)) if limit else None
+    except ValueError:
+        return jsonify({"error": "Les paramètres offset et limit doivent être des entiers."}), 400
 
-            full_path = os.path.join(target_dir, name)
-            stat = os.stat(full_path)
+    # Pré-calcul des miniatures du dossier pendant que le client affiche la liste
+    if request.args.get('thumbnails'):
+        try:
+            thumbnail_service.prewarm_directory(target_dir, thumbnail_size(int(request.args['thumbnails'])))
+        except ValueError:
+            return jsonify({"error": "Le paramètre thumbnails doit être un entier."}), 400
 
-            is_folder = os.path.isdir(full_path)
-            mime_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
-            full_relative_path = os.path.join(relative_path, name).replace('\\', '/') if relative_path else name
-
-            files.append({
-                "name": name,
-                "is_folder": is_folder,
-                "size": stat.st_size,
-                "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                "mime_type": mime_type,
-                "full_relative_path": full_relative_path
-            })
+    try:
+        # ETag : version du dossier + paramètres de la requête
+        validator = listing_cache.validator(target_dir)
+        etag = hashlib.md5(repr((validator, sorted(request.args.items(multi=True)))).encode()).hexdigest()
+        # ETag faible : le corps varie selon l'encodage négocié (compression, format compact)
+        if request.if_none_match.contains_weak(etag):
+            return Response(status=304, headers={"ETag": f'W/"{etag}"', "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"})
 
-        files.sort(key=lambda f: (not f['is_folder'], f['name'].lower()))
+        files, total = list_directory(
+            target_dir,
+            relative_path,
+            sort=sort,
+            descending=request.args.get('order', 'asc') == 'desc',
+            name_filter=request.args.get('filter', '').strip(),
+            type_filter=request.args.get('type', '').strip(),
+            offset=offset,
+            limit=limit,
+            validator=validator,
+            compact=list_format == 'compact'
+        )
+        count = files["count"] if list_format == 'compact' else len(files)
+        next_offset = offset + count if offset + count < total else None
 
-        return jsonify({
+        payload = {
             "current_path": client_path,
-            "files": files,
-            "is_search_result": False
-        })
+            "is_search_result": False,
+            "total": total,
+            "offset": offset,
+            "next_offset": next_offset,
+            "thumbnail_kinds": thumbnail_service.available_kinds()
+        }
+        if list_format == 'compact':
+            payload.update(format='compact', listing=files)
+        else:
+            payload["files"] = files
+        response = jsonify(payload)
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
 
     except Exception as e:
         print(f"Erreur lors de la liste des fichiers: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/search', methods=['GET'])
-def api_search():
-    """Effectue une recherche récursive de fichiers et dossiers par nom."""
-    query = request.args.get('query', '').strip()
-    
-    if not query:
-        return jsonify({"files": [], "current_path": "/", "is_search_result": True}), 200
+TREE_MAX_DEPTH = 5
+TREE_MAX_FOLDERS = 5000  # au-delà, les niveaux suivants ne sont pas développés (has_children reste exact)
 
-    results = []
-    
-    for root, dirs, files in os.walk(BASE_DIR):
+
+def scan_subfolders(dir_path, first_only=False):
+    """Sous-dossiers visibles d'un dossier, sans stat (le type vient de scandir) : [(nom, chemin, est un lien)]."""
+    folders = []
+    with os.scandir(dir_path) as it:
+        metrics.count_fs('scandir')
+        for entry in it:
+            if entry.name.startswith('.'):
+                continue
+            try:
+                if not entry.is_dir():
+                    continue
+                is_link = entry.is_symlink()
+            except OSError:
+                continue
+            folders.append((entry.name, entry.path, is_link))
+            if first_only:
+                break
+    return folders
+
+
+def folder_tree(dir_path, relative_path, depth, budget):
+    """Arborescence des dossiers sur `depth` niveaux ; `budget` borne le nombre total de dossiers renvoyés."""
+    nodes = []
+    for name, full_path, is_link in sorted(scan_subfolders(dir_path), key=lambda folder: folder[0].lower()):
+        node = {"name": name, "path": f"{relative_path}/{name}" if relative_path else name}
+        try:
+            # Les liens symboliques ne sont pas parcourus (boucles possibles), seulement sondés
+            if depth > 1 and not is_link and budget[0] > 0:
+                node["children"] = folder_tree(full_path, node["path"], depth - 1, budget)
+                node["has_children"] = bool(node["children"])
+            else:
+                node["has_children"] = bool(scan_subfolders(full_path, first_only=True))
+        except OSError:
+            node["has_children"] = False
+        nodes.append(node)
+        budget[0] -= 1
+    return nodes
+
+
+@app.route('/api/tree', methods=['GET'])
+def api_tree():
+    """Arborescence des sous-dossiers de `path` sur `depth` niveaux (1 par défaut).
+
+    Seuls les dossiers sont renvoyés, avec un indicateur has_children ; les
+    nœuds développés contiennent `children`. Aucun stat ni type MIME : un
+    dossier de milliers de fichiers s'ouvre aussi vite qu'un dossier vide.
+    """
+    relative_path = request.args.get('path', '/').strip('/')
+    target_dir = secure_path_join(BASE_DIR, relative_path)
+
+    if target_dir is None:
+        return jsonify({"error": "Chemin d'accès invalide ou non autorisé."}), 400
+
+    if not os.path.isdir(target_dir):
+        return jsonify({"error": "Le chemin spécifié n'est pas un répertoire."}), 404
+
+    try:
+        depth = min(TREE_MAX_DEPTH, max(1, int(request.args.get('depth', 1))))
+    except ValueError:
+        return jsonify({"error": "Le paramètre depth doit être un entier."}), 400
+
+    try:
+        folders = folder_tree(target_dir, relative_path, depth, [TREE_MAX_FOLDERS])
+    except OSError as e:
+        print(f"Erreur lors de la lecture de l'arborescence: {e}")
+        return jsonify({"error": f"Erreur de permission ou de système: {e}"}), 500
+
+    response = jsonify({"path": '/' + relative_path, "depth": depth, "folders": folders})
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@app.route('/api/search', methods=['GET'])
+def api_search():
+    """Effectue une recherche récursive de fichiers et dossiers par nom."""
+    query = request.args.get('query', '').strip()
+    
+    if not query:
+        return jsonify({"files": [], "current_path": "/", "is_search_result": True}), 200
+
+    # L'index est utilisé dès qu'un premier scan complet existe, sinon parcours direct du disque
+    if search_index is not None and search_index.is_ready():
+        with metrics.phase('index'):
+            results = search_from_index(query)
+    else:
+        with metrics.phase('walk'):
+            results = search_by_walk(query)
+
+    results.sort(key=lambda f: (not f['is_folder'], f['full_relative_path'].lower()))
+
+    return jsonify({
+        "current_path": f"Recherche: '{query}'",
+        "files": results,
+        "is_search_result": True
+    })
+
+@app.route('/api/search/reindex', methods=['POST'])
+def api_search_reindex():
+    """Déclenche une reconstruction complète de l'index de recherche en arrière-plan."""
+    if search_index is None:
+        return jsonify({"error": "L'index de recherche est désactivé."}), 400
+
+    threading.Thread(target=search_index.sync, kwargs={'full': True, 'blocking': True}, daemon=True).start()
+    return jsonify({"message": "Reconstruction de l'index de recherche lancée."}), 202
+
+def search_from_index(query):
+    """Recherche dans l'index persistant (aucun accès disque hors SQLite)."""
+    return [index_search_result(row) for row in search_index.search(query)]
+
+def index_search_result(row):
+    path, name, is_folder, size, mtime = row
+    return {
+        "name": name,
+        "is_folder": bool(is_folder),
+        "size": size,
+        "modified": datetime.fromtimestamp(mtime).isoformat(),
+        "mime_type": "folder" if is_folder else (mimetypes.guess_type(name)[0] or 'application/octet-stream'),
+        "full_relative_path": path
+    }
+
+def search_by_walk(query):
+    """Recherche par parcours complet de BASE_DIR (utilisée tant que l'index n'est pas prêt)."""
+    return [result for results in iter_walk_matches(query) for result in results]
+
+def iter_walk_matches(query):
+    """Parcourt BASE_DIR et produit, dossier par dossier, la liste (parfois vide) de ses correspondances."""
+    for root, dirs, files in os.walk(BASE_DIR):
+        results = []
+        metrics.count_fs('walk_entries', len(dirs) + len(files))
         relative_root = os.path.relpath(root, BASE_DIR).replace('\\', '/')
         if relative_root == '.':
             relative_root = ''
@@ -118,6 +1615,7 @@ def api_search():
             if query.lower() in dir_name.lower():
                 full_path = os.path.join(root, dir_name)
                 stat = os.stat(full_path)
+                metrics.count_fs('stat')
                 full_relative_path = os.path.join(relative_root, dir_name).replace('\\', '/')
                 
                 results.append({
@@ -133,6 +1631,7 @@ def api_search():
             if query.lower() in file_name.lower():
                 full_path = os.path.join(root, file_name)
                 stat = os.stat(full_path)
+                metrics.count_fs('stat')
                 is_folder = os.path.isdir(full_path)
                 mime_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
                 full_relative_path = os.path.join(relative_root, file_name).replace('\\', '/')
@@ -145,14 +1644,648 @@ def api_search():
                     "mime_type": mime_type,
                     "full_relative_path": full_relative_path
                 })
-                
-    results.sort(key=lambda f: (not f['is_folder'], f['full_relative_path'].lower()))
+
+        yield results
+
+SEARCH_STREAM_DEFAULT_LIMIT = 1000
+SEARCH_STREAM_MAX_LIMIT = 20000
+SEARCH_STREAM_TIME_BUDGET = float(os.environ.get('FLASK_SEARCH_TIME_BUDGET', '30'))  # secondes
+SEARCH_STREAM_FLUSH_INTERVAL = 0.1  # Regroupement des résultats envoyés (s)
+SEARCH_STREAM_PROGRESS_INTERVAL = 1.0  # Sans résultat : progression envoyée, ce qui détecte aussi la déconnexion
+
+
+def iter_index_matches(query):
+    """Résultats de l'index par paquets, lus au fur et à mesure."""
+    for rows in search_index.iter_search(query):
+        yield [index_search_result(row) for row in rows]
+
+
+def iter_search_stream(query, limit, budget, sse):
+    """Flux de recherche : paquets `results` dès qu'ils sont trouvés, `progress` pendant le parcours, puis `end`.
+
+    S'arrête au bout de `limit` résultats ou `budget` secondes. Si le client se
+    déconnecte, l'écriture suivante échoue et le serveur ferme ce générateur :
+    le parcours du disque s'arrête avec lui.
+    """
+    def encode(event, payload):
+        if sse:
+            return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps({"type": event, **payload}) + "\n"
+
+    started = time.time()
+    use_index = search_index is not None and search_index.is_ready()
+    source = iter_index_matches(query) if use_index else iter_walk_matches(query)
+    pending = []
+    count = scanned = 0
+    last_sent = 0.0
+    reason = 'done'
+    try:
+        yield encode('start', {"query": query, "source": 'index' if use_index else 'walk', "limit": limit})
+        for results in source:
+            scanned += 1
+            pending.extend(results[:limit - count])
+            count += min(len(results), limit - count)
+            now = time.time()
+            if count >= limit:
+                reason = 'limit'
+                break
+            if now - started > budget:
+                reason = 'time'
+                break
+            if pending and now - last_sent >= SEARCH_STREAM_FLUSH_INTERVAL:
+                yield encode('results', {"files": pending, "count": count})
+                pending = []
+                last_sent = now
+            elif not pending and now - last_sent >= SEARCH_STREAM_PROGRESS_INTERVAL:
+                yield encode('progress', {"scanned": scanned, "count": count})
+                last_sent = now
+        if pending:
+            yield encode('results', {"files": pending, "count": count})
+        yield encode('end', {"count": count, "truncated": reason != 'done', "reason": reason,
+                             "elapsed_ms": round((time.time() - started) * 1000)})
+    except GeneratorExit:
+        reason = 'disconnected'
+        raise
+    finally:
+        source.close()
+        metrics.inc('search_streams_total', reason=reason)
+
+
+@app.route('/api/search/stream', methods=['GET'])
+def api_search_stream():
+    """Recherche par nom dont les résultats sont envoyés dès qu'ils sont trouvés (NDJSON, ou SSE avec format=sse).
+
+    Paramètres : `limit` (nombre maximal de résultats) et `budget` (durée
+    maximale en secondes). Les résultats ne sont pas triés.
+    """
+    query = request.args.get('query', '').strip()
+    if not query:
+        return jsonify({"error": "Le terme de recherche est vide."}), 400
+
+    try:
+        limit = min(SEARCH_STREAM_MAX_LIMIT, max(1, int(request.args.get('limit', SEARCH_STREAM_DEFAULT_LIMIT))))
+        budget = min(SEARCH_STREAM_TIME_BUDGET, max(0.1, float(request.args.get('budget', SEARCH_STREAM_TIME_BUDGET))))
+    except ValueError:
+        return jsonify({"error": "Les paramètres limit et budget doivent être des nombres."}), 400
+
+    sse = request.args.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+    return Response(
+        stream_with_context(iter_search_stream(query, limit, budget, sse)),
+        mimetype='text/event-stream' if sse else 'application/x-ndjson',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# --- RECHERCHE DANS LE CONTENU DES FICHIERS TEXTE ---
+
+CONTENT_INDEX_ENABLED = os.environ.get('FLASK_CONTENT_INDEX', '1') != '0'
+CONTENT_INDEX_MAX_FILE_SIZE = int(os.environ.get('FLASK_CONTENT_INDEX_MAX_KB', '1024')) * 1024
+CONTENT_INDEX_RESYNC_INTERVAL = int(os.environ.get('FLASK_CONTENT_INDEX_RESYNC_INTERVAL', '3600'))
+CONTENT_INDEX_POLL_INTERVAL = 2  # Lecture du journal des modifications (s)
+CONTENT_INDEX_MAX_LINE = 1000  # Caractères indexés par ligne (fichiers minifiés d'une seule ligne)
+CONTENT_SEARCH_MAX_FILES = 100
+CONTENT_SEARCH_MAX_MATCHES = 3  # Lignes renvoyées par fichier
+CONTENT_SNIPPET_LENGTH = 200
+TEXT_VIEW_EXTENSIONS = ('.py', '.js', '.html', '.css', '.log', '.xml', '.md', '.yml', '.yaml', '.sh', '.bat')
+MATCH_START, MATCH_END = '\x02', '\x03'  # Marqueurs de highlight() (absents des lignes indexées)
+
+
+def _is_hidden(relative_path):
+    return any(part.startswith('.') for part in relative_path.split('/'))
+
+
+def is_text_file(path):
+    """Fichiers affichés en texte brut par /api/view (et indexés pour la recherche dans le contenu)."""
+    mime_type = mimetypes.guess_type(path)[0] or ''
+    return mime_type.startswith('text/') or mime_type == 'application/json' or path.endswith(TEXT_VIEW_EXTENSIONS)
+
+
+class ContentIndex:
+    """Index inversé (FTS5) des lignes des fichiers texte de BASE_DIR.
+
+    Construit et tenu à jour en arrière-plan par un seul worker à la fois :
+    le journal des modifications désigne les chemins à revoir, et une
+    resynchronisation complète périodique rattrape le reste. Un fichier n'est
+    relu que si sa taille ou sa date de modification a changé ; les fichiers
+    trop gros ou binaires sont mémorisés comme tels sans être indexés. Les
+    recherches ne lisent que la base, jamais les fichiers.
+    """
+
+    def __init__(self, db_path):
+        self.lock_path = db_path + '.lock'
+        self._db = StateDatabase(db_path)
+        self.available = True
+        with self._db.connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS docs (
+                id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, size INTEGER NOT NULL,
+                mtime REAL NOT NULL, indexed INTEGER NOT NULL)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS lines (
+                id INTEGER PRIMARY KEY, doc INTEGER NOT NULL, line_no INTEGER NOT NULL, text TEXT NOT NULL)""")
+            conn.execute('CREATE INDEX IF NOT EXISTS lines_doc ON lines(doc)')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        try:
+            with self._db.connect() as conn:
+                conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5(
+                    text, content='lines', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""")
+                conn.execute("""CREATE TRIGGER IF NOT EXISTS lines_ai AFTER INSERT ON lines BEGIN
+                    INSERT INTO lines_fts(rowid, text) VALUES (new.id, new.text); END""")
+                conn.execute("""CREATE TRIGGER IF NOT EXISTS lines_ad AFTER DELETE ON lines BEGIN
+                    INSERT INTO lines_fts(lines_fts, rowid, text) VALUES ('delete', old.id, old.text); END""")
+        except sqlite3.OperationalError as e:
+            self.available = False
+            print(f"Recherche dans le contenu indisponible (FTS5 absent de SQLite: {e})")
+
+    def _meta(self, conn, key):
+        row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def is_ready(self):
+        return self._meta(self._db.connect(), 'built_at') is not None
+
+    # --- Lecture ---
+
+    def search(self, query):
+        """Fichiers dont une ligne contient les mots de `query` (le dernier en préfixe), avec les lignes trouvées."""
+        expression = '"' + query.replace('"', '""') + '" *'
+        rows = self._db.connect().execute(
+            f"SELECT d.path, d.size, d.mtime, l.line_no, highlight(lines_fts, 0, '{MATCH_START}', '{MATCH_END}') "
+            'FROM lines_fts JOIN lines l ON l.id = lines_fts.rowid JOIN docs d ON d.id = l.doc '
+            'WHERE lines_fts MATCH ? ORDER BY rank LIMIT ?',
+            (expression, CONTENT_SEARCH_MAX_FILES * CONTENT_SEARCH_MAX_MATCHES * 4)).fetchall()
+        files = {}
+        for path, size, mtime, line_no, marked in rows:
+            entry = files.get(path)
+            if entry is None:
+                if len(files) >= CONTENT_SEARCH_MAX_FILES:
+                    continue
+                entry = files[path] = (size, mtime, [])
+            if len(entry[2]) < CONTENT_SEARCH_MAX_MATCHES:
+                entry[2].append(content_snippet(line_no, marked))
+        for _, _, matches in files.values():
+            matches.sort(key=lambda match: match["line"])
+        return files
+
+    # --- Mise à jour ---
+
+    def _remove(self, conn, relative_path):
+        prefix_low, prefix_high = relative_path + '/', relative_path + '0'
+        scope = 'path = ? OR (path >= ? AND path < ?)' if relative_path else '1'
+        params = (relative_path, prefix_low, prefix_high) if relative_path else ()
+        conn.execute(f'DELETE FROM lines WHERE doc IN (SELECT id FROM docs WHERE {scope})', params)
+        conn.execute(f'DELETE FROM docs WHERE {scope}', params)
+
+    def _index_file(self, conn, full_path, relative_path, stat):
+        """(Ré)indexe un fichier ; retourne les octets lus."""
+        row = conn.execute('SELECT id, size, mtime FROM docs WHERE path = ?', (relative_path,)).fetchone()
+        if row is not None and row[1] == stat.st_size and row[2] == stat.st_mtime:
+            return 0
+        if row is not None:
+            conn.execute('DELETE FROM lines WHERE doc = ?', (row[0],))
+
+        lines = None
+        if stat.st_size <= CONTENT_INDEX_MAX_FILE_SIZE:
+            try:
+                with open(full_path, 'rb') as f:
+                    data = f.read(CONTENT_INDEX_MAX_FILE_SIZE + 1)
+            except OSError:
+                return 0
+            metrics.count_bytes('read', 'content_index', len(data))
+            # Octet nul : fichier binaire malgré son extension
+            if b'\0' not in data[:8192]:
+                try:
+                    text = data.decode('utf-8')
+                except UnicodeDecodeError:
+                    text = data.decode('latin-1')
+                lines = [(line_no, line[:CONTENT_INDEX_MAX_LINE].replace(MATCH_START, ' ').replace(MATCH_END, ' '))
+                         for line_no, line in enumerate(text.splitlines(), 1) if line.strip()]
+
+        conn.execute(
+            'INSERT INTO docs (path, size, mtime, indexed) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime = excluded.mtime, indexed = excluded.indexed',
+            (relative_path, stat.st_size, stat.st_mtime, int(lines is not None)))
+        if lines:
+            doc_id = conn.execute('SELECT id FROM docs WHERE path = ?', (relative_path,)).fetchone()[0]
+            conn.executemany('INSERT INTO lines (doc, line_no, text) VALUES (?, ?, ?)',
+                             [(doc_id, line_no, line) for line_no, line in lines])
+        return stat.st_size if lines is not None else 0
+
+    def _sync_tree(self, conn, root_path, recursive=True):
+        """Met à jour les fichiers texte visibles d'un dossier (et de ses sous-dossiers) ; retourne le nombre de fichiers relus."""
+        relative_root = to_relative_path(root_path)
+        seen = set()
+        reindexed = 0
+        for root, dirs, files in os.walk(root_path):
+            metrics.count_fs('walk_entries', len(dirs) + len(files))
+            dirs[:] = [name for name in dirs if not name.startswith('.')] if recursive else []
+            for name in files:
+                if name.startswith('.') or not is_text_file(name):
+                    continue
+                full_path = os.path.join(root, name)
+                try:
+                    stat = os.lstat(full_path)
+                except OSError:
+                    continue
+                metrics.count_fs('stat')
+                if not stat_module.S_ISREG(stat.st_mode):
+                    continue
+                relative = to_relative_path(full_path)
+                seen.add(relative)
+                if self._index_file(conn, full_path, relative, stat):
+                    reindexed += 1
+                    if reindexed % 200 == 0:
+                        conn.commit()  # Ne pas bloquer les recherches pendant une longue indexation
+
+        # Fichiers indexés qui ont disparu (ou sont devenus cachés)
+        prefix = relative_root + '/' if relative_root else ''
+        known = conn.execute('SELECT path FROM docs WHERE path >= ? AND path < ?',
+                             (prefix, relative_root + '0' if relative_root else '\U0010ffff')).fetchall()
+        for (relative,) in known:
+            if relative not in seen and (recursive or '/' not in relative[len(prefix):]):
+                self._remove(conn, relative)
+        return reindexed
+
+    def _sync_path(self, conn, relative_path, action):
+        """Répercute une entrée du journal des modifications."""
+        full_path = os.path.join(BASE_DIR, relative_path) if relative_path else BASE_DIR
+        if action == 'rescanned':
+            # Dossier relu par l'index des noms : son contenu direct a changé
+            if os.path.isdir(full_path):
+                self._sync_tree(conn, full_path, recursive=False)
+            return
+        if _is_hidden(relative_path):
+            return
+        if not os.path.lexists(full_path):
+            self._remove(conn, relative_path)
+        elif os.path.isdir(full_path) and not os.path.islink(full_path):
+            self._sync_tree(conn, full_path)
+        elif is_text_file(relative_path):
+            try:
+                stat = os.lstat(full_path)
+            except OSError:
+                return
+            if stat_module.S_ISREG(stat.st_mode):
+                self._index_file(conn, full_path, relative_path, stat)
+
+    def update(self):
+        """Traite le journal des modifications, ou resynchronise tout si besoin. Un seul worker à la fois."""
+        lock_file = open(self.lock_path, 'w')
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+            conn = self._db.connect()
+            last_id = int(self._meta(conn, 'change_id') or 0)
+            last_full = float(self._meta(conn, 'built_at') or 0)
+            rows = change_log.since(last_id)
+            # Entrées purgées avant d'avoir été lues, ou événements perdus : tout est revu
+            missed = last_id and change_log.first_id() > last_id + 1
+            full = (not last_full or missed or any(action == 'overflow' for _, action, _, _ in rows)
+                    or time.time() - last_full > CONTENT_INDEX_RESYNC_INTERVAL)
+            started = time.time()
+            with conn:
+                if full:
+                    last_id = change_log.last_id()
+                    reindexed = self._sync_tree(conn, BASE_DIR)
+                    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('built_at', ?)", (str(started),))
+                    print(f"Index du contenu: {reindexed} fichier(s) texte relu(s) en {time.time() - started:.1f}s")
+                else:
+                    for _, action, path, _ in rows:
+                        self._sync_path(conn, path, action)
+                if rows or full:
+                    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('change_id', ?)",
+                                 (str(rows[-1][0] if rows and not full else last_id),))
+            return True
+        finally:
+            lock_file.close()
+
+    def start_background_worker(self):
+        def worker():
+            while True:
+                try:
+                    self.update()
+                except Exception as e:
+                    print(f"Erreur lors de la mise à jour de l'index du contenu: {e}")
+                time.sleep(CONTENT_INDEX_POLL_INTERVAL)
+
+        threading.Thread(target=worker, name='content-index', daemon=True).start()
+
+
+def content_snippet(line_no, marked):
+    """Ligne trouvée sans ses marqueurs : {line, text, ranges [[début, fin]]}, recentrée sur la première occurrence."""
+    text = ''
+    ranges = []
+    for index, part in enumerate(marked.split(MATCH_START)):
+        if index:
+            matched, _, part = part.partition(MATCH_END)
+            ranges.append([len(text), len(text) + len(matched)])
+            text += matched
+        text += part
+    start = 0
+    if len(text) > CONTENT_SNIPPET_LENGTH and ranges:
+        start = max(0, min(ranges[0][0] - CONTENT_SNIPPET_LENGTH // 4, len(text) - CONTENT_SNIPPET_LENGTH))
+    text = text[start:start + CONTENT_SNIPPET_LENGTH]
+    ranges = [[begin - start, min(end - start, len(text))] for begin, end in ranges if start <= begin < start + len(text)]
+    return {"line": line_no, "text": text, "ranges": ranges}
+
+
+content_index = ContentIndex(os.path.join(STATE_DIR, 'content_index.sqlite3')) if CONTENT_INDEX_ENABLED else None
+
+
+@app.route('/api/search/content', methods=['GET'])
+def api_search_content():
+    """Recherche les fichiers texte dont une ligne contient les mots donnés (index du contenu uniquement)."""
+    query = request.args.get('query', '').strip()
+
+    if content_index is None or not content_index.available:
+        return jsonify({"error": "La recherche dans le contenu est désactivée."}), 400
+
+    results = []
+    if query:
+        try:
+            with metrics.phase('index'):
+                files = content_index.search(query)
+        except sqlite3.OperationalError as e:
+            return jsonify({"error": f"Requête de recherche invalide: {e}"}), 400
+
+        for path, (size, mtime, matches) in files.items():
+            results.append({
+                "name": path.rpartition('/')[2],
+                "is_folder": False,
+                "size": size,
+                "modified": datetime.fromtimestamp(mtime).isoformat(),
+                "mime_type": mimetypes.guess_type(path)[0] or 'text/plain',
+                "full_relative_path": path,
+                "matches": matches
+            })
 
     return jsonify({
         "current_path": f"Recherche: '{query}'",
         "files": results,
-        "is_search_result": True
+        "is_search_result": True,
+        "search_in_content": True,
+        # Premier scan pas encore terminé : résultats partiels
+        "indexing": not content_index.is_ready()
+    })
+
+
+# --- DOUBLONS (EMPREINTES DE CONTENU) ---
+
+HASH_WORKERS = int(os.environ.get('FLASK_HASH_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+HASH_CACHE_RETENTION = 30 * 24 * 3600  # Empreintes de fichiers disparus oubliées après 30 jours
+DUPLICATES_MIN_SIZE = 1024 * 1024  # Taille minimale par défaut : les petits fichiers libèrent peu de place
+DUPLICATES_MAX_GROUPS = 1000  # Groupes renvoyés au plus (les plus coûteux en place d'abord)
+
+
+class HashCache:
+    """Empreintes de contenu déjà calculées, partagées entre les workers.
+
+    Clé : (périphérique, inode). La taille et le st_mtime_ns enregistrés valident
+    l'entrée : un fichier modifié ou remplacé est simplement rehaché. Les liens
+    physiques partagent naturellement la même entrée.
+    """
+
+    def __init__(self, db_path):
+        self._db = StateDatabase(db_path)
+        with self._db.connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS hashes (
+                dev INTEGER NOT NULL, ino INTEGER NOT NULL, size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL, partial TEXT, full TEXT, seen REAL NOT NULL,
+                PRIMARY KEY (dev, ino))""")
+
+    def lookup(self, stats):
+        """Empreintes connues et encore valides : {(dev, ino): (partielle, complète)}."""
+        conn = self._db.connect()
+        known = {}
+        for stat in stats:
+            row = conn.execute('SELECT size, mtime_ns, partial, full FROM hashes WHERE dev = ? AND ino = ?',
+                               (stat.st_dev, stat.st_ino)).fetchone()
+            if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+                known[(stat.st_dev, stat.st_ino)] = (row[2], row[3])
+        return known
+
+    def store(self, entries):
+        """Enregistre des empreintes calculées : [(stat, partielle ou None, complète ou None)]."""
+        now = time.time()
+        with self._db.connect() as conn:
+            # Entrée périmée (taille ou date différente) : ses anciennes empreintes sont effacées
+            conn.executemany(
+                'INSERT INTO hashes (dev, ino, size, mtime_ns, partial, full, seen) VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(dev, ino) DO UPDATE SET '
+                'partial = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns THEN COALESCE(excluded.partial, partial) ELSE excluded.partial END, '
+                'full = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns THEN COALESCE(excluded.full, full) ELSE excluded.full END, '
+                'size = excluded.size, mtime_ns = excluded.mtime_ns, seen = excluded.seen',
+                [(stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns, partial, full, now)
+                 for stat, partial, full in entries])
+
+    def touch(self, stats):
+        """Marque les entrées comme encore utilisées, puis oublie celles qui ne le sont plus depuis longtemps."""
+        now = time.time()
+        with self._db.connect() as conn:
+            conn.executemany('UPDATE hashes SET seen = ? WHERE dev = ? AND ino = ?',
+                             [(now, stat.st_dev, stat.st_ino) for stat in stats])
+            conn.execute('DELETE FROM hashes WHERE seen < ?', (now - HASH_CACHE_RETENTION,))
+
+
+class ContentHasher:
+    """Calcul des empreintes complètes dans un pool de processus créé à la demande."""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        # Comme pour les miniatures : créé après le fork gunicorn, processus « spawn » sans les services du serveur
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def hash_files(self, full_paths, job):
+        """Empreinte complète de chaque fichier : {chemin: empreinte} (les fichiers illisibles sont omis)."""
+        pool = self._get_pool()
+        futures = {pool.submit(hasher.full_hash, path): path for path in full_paths}
+        digests = {}
+        try:
+            for future in as_completed(futures):
+                try:
+                    digest, size = future.result()
+                except BrokenProcessPool:
+                    with self._lock:
+                        self._pool = None
+                    raise
+                except OSError as e:
+                    print(f"Doublons: lecture impossible de {futures[future]}: {e}")
+                    continue
+                digests[futures[future]] = digest
+                metrics.count_bytes('read', 'hash', size)
+                job.advance(files=1, bytes=size)
+        finally:
+            # Annulation ou erreur : les fichiers pas encore commencés ne sont pas hachés
+            for future in futures:
+                future.cancel()
+        return digests
+
+
+hash_cache = HashCache(os.path.join(STATE_DIR, 'hashes.sqlite3'))
+content_hasher = ContentHasher(HASH_WORKERS)
+
+
+def duplicate_candidates(root_dir, min_size, job):
+    """Fichiers réguliers visibles dont la taille est partagée avec au moins un autre : {taille: [(chemin, stat)]}."""
+    relative_root = to_relative_path(root_dir)
+    by_size = {}
+    if search_index is not None and search_index.is_ready():
+        # Tailles connues par l'index : seuls les fichiers de taille commune sont relus sur le disque
+        for relative, size in search_index.same_size_files(relative_root, min_size):
+            if not _is_hidden(relative):
+                by_size.setdefault(size, []).append(os.path.join(BASE_DIR, relative))
+        paths = [path for group in by_size.values() if len(group) > 1 for path in group]
+    else:
+        paths = []
+        for root, dirs, files in os.walk(root_dir):
+            metrics.count_fs('walk_entries', len(dirs) + len(files))
+            dirs[:] = [name for name in dirs if not name.startswith('.')]
+            paths.extend(os.path.join(root, name) for name in files if not name.startswith('.'))
+            job.check_cancelled()
+
+    by_size = {}
+    metrics.count_fs('stat', len(paths))
+    for full_path in paths:
+        try:
+            stat = os.lstat(full_path)
+        except OSError:
+            continue
+        # Liens symboliques ignorés : supprimer la cible supprimerait aussi « l'autre copie »
+        if stat_module.S_ISREG(stat.st_mode) and stat.st_size >= min_size:
+            by_size.setdefault(stat.st_size, []).append((full_path, stat))
+        job.check_cancelled()
+    return {size: group for size, group in by_size.items() if len(group) > 1}
+
+
+def _group_by(items, key):
+    groups = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def find_duplicates(root_dir, min_size, job):
+    """Groupes de fichiers au contenu identique, triés par place récupérable décroissante.
+
+    Trois passes de plus en plus coûteuses : taille, puis empreinte du premier et
+    du dernier bloc, puis empreinte complète (pool de processus). Chaque passe ne
+    garde que les groupes d'au moins deux fichiers ; les empreintes valides du
+    cache ne sont jamais recalculées.
+    """
+    job.set_phase("Recherche des fichiers de même taille...")
+    candidates = [group for group in duplicate_candidates(root_dir, min_size, job).values()]
+    stats = [stat for group in candidates for _, stat in group]
+    known = hash_cache.lookup(stats)
+
+    job.set_phase("Comparaison du début et de la fin des fichiers...")
+    job.set_totals(len(stats), None)
+    partial = {}
+    computed = []
+    for group in candidates:
+        for full_path, stat in group:
+            key = (stat.st_dev, stat.st_ino)
+            digest = known.get(key, (None, None))[0] or partial.get(key)
+            if digest is None:
+                try:
+                    digest = hasher.partial_hash(full_path, stat.st_size)
+                except OSError:
+                    continue
+                metrics.count_bytes('read', 'hash', min(stat.st_size, 2 * hasher.PARTIAL_BLOCK_SIZE))
+                computed.append((stat, digest, None))
+            partial[key] = digest
+            job.advance(files=1)
+    hash_cache.store(computed)
+    candidates = [sub for group in candidates
+                  for sub in _group_by([item for item in group if (item[1].st_dev, item[1].st_ino) in partial],
+                                       lambda item: partial[(item[1].st_dev, item[1].st_ino)])]
+
+    # Liens physiques d'un même inode : un seul hachage, et aucune place à récupérer entre eux
+    full = {}
+    to_hash = {}
+    for group in candidates:
+        for full_path, stat in group:
+            key = (stat.st_dev, stat.st_ino)
+            if known.get(key, (None, None))[1]:
+                full[key] = known[key][1]
+            else:
+                to_hash.setdefault(key, (full_path, stat))
+
+    job.set_phase(f"Calcul des empreintes complètes ({len(to_hash)} fichier(s))...")
+    job.files_done = job.bytes_done = 0
+    job.set_totals(len(to_hash), sum(stat.st_size for _, stat in to_hash.values()))
+    digests = content_hasher.hash_files([full_path for full_path, _ in to_hash.values()], job)
+    for key, (full_path, stat) in to_hash.items():
+        if full_path in digests:
+            full[key] = digests[full_path]
+    hash_cache.store([(stat, None, digests[full_path]) for full_path, stat in to_hash.values() if full_path in digests])
+    hash_cache.touch(stats)
+
+    groups = []
+    for group in candidates:
+        for sub in _group_by([item for item in group if (item[1].st_dev, item[1].st_ino) in full],
+                             lambda item: full[(item[1].st_dev, item[1].st_ino)]):
+            size = sub[0][1].st_size
+            inodes = len({(stat.st_dev, stat.st_ino) for _, stat in sub})
+            if inodes < 2:
+                continue
+            groups.append({
+                "hash": full[(sub[0][1].st_dev, sub[0][1].st_ino)],
+                "size": size,
+                "wasted": size * (inodes - 1),
+                # Les plus anciens d'abord : l'original est en général le premier
+                "files": [{"path": to_relative_path(full_path),
+                           "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                           "inode": stat.st_ino}
+                          for full_path, stat in sorted(sub, key=lambda item: (item[1].st_mtime, item[0]))]
+            })
+    groups.sort(key=lambda group: group["wasted"], reverse=True)
+    return groups
+
+
+def run_duplicates_job(job, root_dir, min_size):
+    groups = find_duplicates(root_dir, min_size, job)
+    wasted = sum(group["wasted"] for group in groups)
+    job.set_result({
+        "path": '/' + to_relative_path(root_dir),
+        "min_size": min_size,
+        "groups": groups[:DUPLICATES_MAX_GROUPS],
+        "group_count": len(groups),
+        "wasted": wasted
     })
+    if not groups:
+        return "Aucun doublon trouvé."
+    return f"{len(groups)} groupe(s) de doublons, {wasted / (1024 * 1024):.1f} Mo récupérables."
+
+
+@app.route('/api/duplicates', methods=['POST'])
+def api_duplicates():
+    """Lance la recherche de fichiers en double sous `path` ; le résultat est joint à la tâche."""
+    data = request.get_json(silent=True) or {}
+    relative_path = (data.get('path') or '/').strip('/')
+    root_dir = secure_path_join(BASE_DIR, relative_path)
+
+    if root_dir is None:
+        return jsonify({"error": "Chemin d'accès invalide ou non autorisé."}), 400
+
+    if not os.path.isdir(root_dir):
+        return jsonify({"error": "Le chemin spécifié n'est pas un répertoire."}), 404
+
+    try:
+        min_size = max(1, int(data.get('min_size', DUPLICATES_MIN_SIZE)))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Le paramètre min_size doit être un entier."}), 400
+
+    job_id = job_manager.submit('duplicates', f"Recherche de doublons dans /{relative_path}", run_duplicates_job, root_dir, min_size)
+    return jsonify({"message": "Recherche de doublons lancée.", "job_id": job_id}), 202
 
 @app.route('/api/create_folder', methods=['POST'])
 def api_create_folder():
@@ -174,15 +2307,24 @@ def api_create_folder():
 
     try:
         os.makedirs(target_dir, exist_ok=False)
+        notify_fs_change('created', target_dir)
         return jsonify({"message": f"Dossier '{folder_name}' créé avec succès."}), 201
     except FileExistsError:
         return jsonify({"error": f"Le dossier '{folder_name}' existe déjà."}), 409
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Pool d'écriture partagé par les téléversements (borne le nombre d'écritures disque simultanées)
+UPLOAD_WRITER_THREADS = int(os.environ.get('FLASK_UPLOAD_WRITER_THREADS', '4'))
+upload_writer_pool = ThreadPoolExecutor(max_workers=UPLOAD_WRITER_THREADS, thread_name_prefix='upload-writer')
+
 @app.route('/api/upload', methods=['POST'])
 def api_upload():
-    """Gère le téléversement de fichiers et de dossiers complets."""
+    """Gère le téléversement de fichiers et de dossiers complets.
+
+    Les fichiers d'une requête sont écrits en parallèle ; la réponse contient
+    le statut de chaque fichier dans `results`.
+    """
     if 'files' not in request.files:
         return jsonify({"error": "Aucun fichier dans la requête."}), 400
 
@@ -201,8 +2343,12 @@ def api_upload():
 
     uploaded_count = 0
     errors = []
+    results = []
 
     try:
+        # 1) Résolution des chemins et création des dossiers : une seule fois par dossier
+        pending = []
+        known_dirs = set()
         for i, file in enumerate(files):
             if file.filename == '':
                 continue
@@ -211,184 +2357,2787 @@ def api_upload():
             if paths and i < len(paths) and paths[i]:
                 # Mode dossier : préserver la structure
                 relative_file_path = paths[i]
-                file_dir = os.path.dirname(relative_file_path)
-                filename = os.path.basename(relative_file_path)
-                
-                # Créer la structure de dossiers
-                full_dir = secure_path_join(target_dir, file_dir)
-                
-                if full_dir is None:
-                    errors.append(f"Chemin invalide pour {relative_file_path}")
-                    continue
-                
-                if not os.path.exists(full_dir):
-                    os.makedirs(full_dir)
-                
-                save_path = os.path.join(full_dir, secure_filename(filename))
             else:
                 # Mode fichiers simples : tout dans le même dossier
-                filename = secure_filename(file.filename)
-                
-                # Accepter tous les types de fichiers (pas de vérification d'extension)
-                
-                if not os.path.exists(target_dir):
-                    os.makedirs(target_dir)
-                
-                save_path = os.path.join(target_dir, filename)
-            
-            # Sauvegarder le fichier
+                relative_file_path = secure_filename(file.filename)
+
+            save_path = resolve_upload_target(destination_path, relative_file_path)
+
+            if save_path is None:
+                errors.append(f"Chemin invalide pour {relative_file_path}")
+                results.append({"path": relative_file_path, "status": "error", "error": "Chemin invalide."})
+                continue
+
+            full_dir = os.path.dirname(save_path)
+            if full_dir not in known_dirs:
+                try:
+                    os.makedirs(full_dir, exist_ok=True)
+                except OSError as e:
+                    errors.append(f"Erreur avec {relative_file_path}: {str(e)}")
+                    results.append({"path": relative_file_path, "status": "error", "error": str(e)})
+                    continue
+                known_dirs.add(full_dir)
+
+            pending.append((relative_file_path, file, save_path))
+
+        # 2) Écriture des fichiers en parallèle dans le pool borné
+        futures = [(relative_file_path, file, save_path, upload_writer_pool.submit(file.save, save_path))
+                   for relative_file_path, file, save_path in pending]
+
+        saved_paths = []
+        for relative_file_path, file, save_path, future in futures:
             try:
-                file.save(save_path)
+                future.result()
+                # Position du flux source après la copie = octets écrits, sans stat supplémentaire
+                metrics.count_bytes('written', 'upload', file.stream.tell())
                 uploaded_count += 1
+                saved_paths.append(save_path)
+                results.append({"path": relative_file_path, "status": "ok"})
             except Exception as e:
+                filename = os.path.basename(save_path)
                 errors.append(f"Erreur avec {filename}: {str(e)}")
+                results.append({"path": relative_file_path, "status": "error", "error": str(e)})
+
+        for save_path in saved_paths:
+            notify_fs_change('created', save_path)
 
         # Préparer le message de réponse
         if uploaded_count > 0:
             message = f"{uploaded_count} fichier(s) téléversé(s) avec succès"
             if errors:
                 message += f" ({len(errors)} erreur(s))"
-            return jsonify({"message": message, "errors": errors if errors else None}), 201
+            return jsonify({"message": message, "errors": errors if errors else None, "results": results}), 201
+        else:
+            return jsonify({"error": "Aucun fichier n'a pu être téléversé.", "errors": errors, "results": results}), 400
+
+    except Exception as e:
+        print(f"Erreur lors du téléversement: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# --- TÉLÉVERSEMENT PAR MORCEAUX (REPRENABLE) ---
+
+UPLOAD_SESSIONS_DIR = os.path.join(STATE_DIR, 'uploads')
+UPLOAD_CHUNK_SIZE = int(os.environ.get('FLASK_UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+UPLOAD_SESSION_MAX_AGE = 24 * 3600  # Sessions abandonnées supprimées après 24h
+UPLOAD_COPY_BUFFER = 1024 * 1024
+os.makedirs(UPLOAD_SESSIONS_DIR, exist_ok=True)
+
+
+def resolve_upload_target(destination_path, relative_file_path):
+    """Chemin absolu de destination d'un fichier téléversé, ou None s'il sort de BASE_DIR."""
+    target_dir = secure_path_join(BASE_DIR, destination_path.strip('/'))
+    if target_dir is None:
+        return None
+
+    file_dir = os.path.dirname(relative_file_path)
+    filename = secure_filename(os.path.basename(relative_file_path))
+    if not filename:
+        return None
+
+    full_dir = secure_path_join(target_dir, file_dir) if file_dir else target_dir
+    if full_dir is None:
+        return None
+    return os.path.join(full_dir, filename)
+
+
+class UploadSession:
+    """Session de téléversement persistée dans STATE_DIR (partagée entre les workers).
+
+    Les morceaux sont écrits directement dans un fichier caché pré-alloué à
+    côté de la destination, renommé à la finalisation. `offset` est le nombre
+    d'octets confirmés : après une coupure, le client reprend à cet offset.
+    """
+
+    def __init__(self, upload_id, data):
+        self.upload_id = upload_id
+        self.data = data
+
+    @staticmethod
+    def _meta_path(upload_id):
+        return os.path.join(UPLOAD_SESSIONS_DIR, f"{upload_id}.json")
+
+    @classmethod
+    def create(cls, save_path, size):
+        upload_id = uuid.uuid4().hex
+        part_path = os.path.join(os.path.dirname(save_path), f".{os.path.basename(save_path)}.{upload_id}.part")
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+
+        with open(part_path, 'wb') as f:
+            if size > 0:
+                try:
+                    os.posix_fallocate(f.fileno(), 0, size)
+                except (AttributeError, OSError):
+                    f.truncate(size)  # Système de fichiers sans fallocate : fichier creux
+
+        session = cls(upload_id, {
+            "save_path": save_path,
+            "part_path": part_path,
+            "size": size,
+            "offset": 0,
+            "created": time.time(),
+        })
+        session.save()
+        return session
+
+    @classmethod
+    def load(cls, upload_id):
+        if not upload_id or not all(c in '0123456789abcdef' for c in upload_id) or len(upload_id) != 32:
+            return None
+        try:
+            with open(cls._meta_path(upload_id)) as f:
+                return cls(upload_id, json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def save(self):
+        tmp_path = self._meta_path(self.upload_id) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self._meta_path(self.upload_id))
+
+    def lock(self):
+        """Verrou exclusif inter-processus sur la session (à utiliser avec `with`)."""
+        lock_file = open(self._meta_path(self.upload_id) + '.lock', 'w')
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def reload(self):
+        with open(self._meta_path(self.upload_id)) as f:
+            self.data = json.load(f)
+
+    def write_chunk(self, offset, stream, length):
+        """Copie `length` octets du flux à `offset` et retourne le nouvel offset confirmé."""
+        with open(self.data["part_path"], 'r+b') as f:
+            f.seek(offset)
+            remaining = length
+            while remaining > 0:
+                block = stream.read(min(UPLOAD_COPY_BUFFER, remaining))
+                if not block:
+                    break
+                f.write(block)
+                remaining -= len(block)
+        metrics.count_bytes('written', 'upload', length - remaining)
+        # Seuls les octets effectivement reçus sont confirmés
+        self.data["offset"] = offset + (length - remaining)
+        self.save()
+        return self.data["offset"]
+
+    def discard(self):
+        for path in (self.data.get("part_path"), self._meta_path(self.upload_id), self._meta_path(self.upload_id) + '.lock'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def to_dict(self):
+        return {
+            "upload_id": self.upload_id,
+            "offset": self.data["offset"],
+            "size": self.data["size"],
+            "chunk_size": UPLOAD_CHUNK_SIZE,
+        }
+
+
+def cleanup_upload_sessions():
+    """Supprime les sessions de téléversement abandonnées."""
+    limit = time.time() - UPLOAD_SESSION_MAX_AGE
+    for name in os.listdir(UPLOAD_SESSIONS_DIR):
+        if not name.endswith('.json'):
+            continue
+        session = UploadSession.load(name[:-5])
+        if session is not None and session.data.get("created", 0) < limit:
+            session.discard()
+
+
+@app.route('/api/upload/session', methods=['POST'])
+def api_upload_session_create():
+    """Ouvre une session de téléversement par morceaux pour un fichier."""
+    data = request.json or {}
+    destination_path = data.get('path', '/')
+    relative_file_path = data.get('relative_path') or data.get('filename')
+    size = data.get('size')
+
+    if not relative_file_path or not isinstance(size, int) or size < 0:
+        return jsonify({"error": "Nom de fichier ou taille manquant(e)."}), 400
+
+    save_path = resolve_upload_target(destination_path, relative_file_path)
+
+    if save_path is None:
+        return jsonify({"error": "Chemin de téléversement en dehors du répertoire géré."}), 400
+
+    if os.path.isdir(save_path):
+        return jsonify({"error": f"Un dossier nommé '{os.path.basename(save_path)}' existe déjà."}), 409
+
+    try:
+        cleanup_upload_sessions()
+        session = UploadSession.create(save_path, size)
+        return jsonify(session.to_dict()), 201
+    except OSError as e:
+        print(f"Erreur lors de la création de la session de téléversement: {e}")
+        return jsonify({"error": f"Erreur de permission ou de système: {e}"}), 500
+
+
+@app.route('/api/upload/session/<upload_id>', methods=['GET'])
+def api_upload_session_status(upload_id):
+    """Retourne l'offset confirmé d'une session (pour reprendre après une coupure)."""
+    session = UploadSession.load(upload_id)
+    if session is None:
+        return jsonify({"error": "Session de téléversement introuvable."}), 404
+    return jsonify(session.to_dict())
+
+
+@app.route('/api/upload/session/<upload_id>', methods=['PUT'])
+def api_upload_session_chunk(upload_id):
+    """Écrit un morceau. Le corps brut est copié à l'offset indiqué, sans mise en mémoire."""
+    session = UploadSession.load(upload_id)
+    if session is None:
+        return jsonify({"error": "Session de téléversement introuvable."}), 404
+
+    try:
+        offset = int(request.args.get('offset', ''))
+    except ValueError:
+        return jsonify({"error": "Offset manquant ou invalide."}), 400
+
+    length = request.content_length
+    if length is None:
+        return jsonify({"error": "En-tête Content-Length requis."}), 411
+
+    lock_file = session.lock()
+    try:
+        session.reload()
+        if offset != session.data["offset"]:
+            # Morceau déjà reçu ou en avance : le client se recale sur l'offset confirmé
+            return jsonify({"error": "Offset inattendu.", **session.to_dict()}), 409
+        if offset + length > session.data["size"]:
+            return jsonify({"error": "Le morceau dépasse la taille annoncée du fichier."}), 400
+
+        session.write_chunk(offset, request.stream, length)
+        return jsonify(session.to_dict())
+    except OSError as e:
+        print(f"Erreur lors de l'écriture d'un morceau: {e}")
+        return jsonify({"error": f"Erreur de permission ou de système: {e}"}), 500
+    finally:
+        lock_file.close()
+
+
+@app.route('/api/upload/session/<upload_id>/finalize', methods=['POST'])
+def api_upload_session_finalize(upload_id):
+    """Vérifie que tout est reçu et met le fichier en place."""
+    session = UploadSession.load(upload_id)
+    if session is None:
+        return jsonify({"error": "Session de téléversement introuvable."}), 404
+
+    lock_file = session.lock()
+    try:
+        session.reload()
+        if session.data["offset"] != session.data["size"]:
+            return jsonify({"error": "Téléversement incomplet.", **session.to_dict()}), 409
+
+        save_path = session.data["save_path"]
+        os.replace(session.data["part_path"], save_path)
+        session.discard()
+        notify_fs_change('created', save_path)
+        return jsonify({"message": f"Fichier '{os.path.basename(save_path)}' téléversé avec succès."}), 201
+    except OSError as e:
+        print(f"Erreur lors de la finalisation du téléversement: {e}")
+        return jsonify({"error": f"Erreur de permission ou de système: {e}"}), 500
+    finally:
+        lock_file.close()
+
+
+@app.route('/api/upload/session/<upload_id>', methods=['DELETE'])
+def api_upload_session_abort(upload_id):
+    """Abandonne une session et supprime le fichier partiel."""
+    session = UploadSession.load(upload_id)
+    if session is None:
+        return jsonify({"error": "Session de téléversement introuvable."}), 404
+
+    session.discard()
+    return jsonify({"message": "Téléversement annulé."}), 200
+
+
+# --- TÂCHES DE FOND (DÉPLACEMENT, SUPPRESSION, COPIE) ---
+
+JOB_WORKERS = int(os.environ.get('FLASK_JOB_WORKERS', '2'))
+JOB_RETENTION = 24 * 3600  # Tâches terminées conservées 24h
+JOB_PROGRESS_INTERVAL = 0.5  # Fréquence max d'écriture de la progression (s)
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class JobCancelled(Exception):
+    """Levée dans une tâche lorsque son annulation a été demandée."""
+
+
+class Job:
+    """Contexte passé à une tâche : compteurs de progression et détection d'annulation."""
+
+    def __init__(self, manager, job_id):
+        self.manager = manager
+        self.job_id = job_id
+        self.files_done = 0
+        self.bytes_done = 0
+        self._last_flush = 0.0
+
+    def set_totals(self, files_total, bytes_total):
+        self.manager._update(self.job_id, files_total=files_total, bytes_total=bytes_total)
+
+    def set_phase(self, message):
+        self.manager._update(self.job_id, message=message)
+
+    def set_result(self, result):
+        """Données détaillées renvoyées avec l'état de la tâche (résultat par élément d'un lot...)."""
+        self.manager._update(self.job_id, result=json.dumps(result))
+
+    def advance(self, files=0, bytes=0):
+        """Ajoute à la progression ; la base n'est écrite (et l'annulation vérifiée) que périodiquement."""
+        self.files_done += files
+        self.bytes_done += bytes
+        now = time.time()
+        if now - self._last_flush >= JOB_PROGRESS_INTERVAL:
+            self._last_flush = now
+            self.manager._update(self.job_id, files_done=self.files_done, bytes_done=self.bytes_done)
+            if self.manager._cancel_requested(self.job_id):
+                raise JobCancelled()
+
+    def check_cancelled(self):
+        self.advance()
+
+
+class JobManager:
+    """Exécute les opérations longues dans un pool borné ; l'état est partagé via SQLite.
+
+    Le suivi et l'annulation fonctionnent quel que soit le worker gunicorn
+    interrogé : la tâche relit régulièrement sa demande d'annulation en base.
+    """
+
+    def __init__(self, db_path, max_workers):
+        self._db = StateDatabase(db_path)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job-worker')
+        with self._db.connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, kind TEXT NOT NULL, description TEXT NOT NULL,
+                status TEXT NOT NULL, pid INTEGER NOT NULL, message TEXT, error TEXT,
+                files_total INTEGER, files_done INTEGER NOT NULL DEFAULT 0,
+                bytes_total INTEGER, bytes_done INTEGER NOT NULL DEFAULT 0,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL, updated REAL NOT NULL, result TEXT)""")
+            # Base créée avant l'ajout de la colonne
+            if 'result' not in {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}:
+                conn.execute('ALTER TABLE jobs ADD COLUMN result TEXT')
+
+    def _update(self, job_id, **fields):
+        fields['updated'] = time.time()
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self._db.connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _cancel_requested(self, job_id):
+        row = self._db.connect().execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def submit(self, kind, description, func, *args):
+        """Met une opération en file d'attente et retourne immédiatement son identifiant.
+
+        `func(job, *args)` retourne le message de fin ; elle peut lever JobCancelled.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._db.connect() as conn:
+            conn.execute('DELETE FROM jobs WHERE updated < ? AND status NOT IN (?, ?)', (now - JOB_RETENTION, 'queued', 'running'))
+            conn.execute('INSERT INTO jobs (id, kind, description, status, pid, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (job_id, kind, description, 'queued', os.getpid(), now, now))
+        self._pool.submit(self._run, job_id, func, args)
+        return job_id
+
+    def _run(self, job_id, func, args):
+        job = Job(self, job_id)
+        if self._cancel_requested(job_id):
+            self._update(job_id, status='cancelled', message="Tâche annulée avant son démarrage.")
+            return
+        self._update(job_id, status='running')
+        try:
+            message = func(job, *args)
+            self._update(job_id, status='done', message=message, files_done=job.files_done, bytes_done=job.bytes_done)
+        except JobCancelled:
+            self._update(job_id, status='cancelled', message="Tâche annulée.", files_done=job.files_done, bytes_done=job.bytes_done)
+        except Exception as e:
+            print(f"Erreur dans la tâche {job_id}: {e}")
+            self._update(job_id, status='error', error=str(e), files_done=job.files_done, bytes_done=job.bytes_done)
+
+    def _to_dict(self, row):
+        job = dict(zip(('id', 'kind', 'description', 'status', 'pid', 'message', 'error', 'files_total', 'files_done',
+                        'bytes_total', 'bytes_done', 'cancel_requested', 'created', 'updated', 'result'), row))
+        # Worker disparu (redémarrage gunicorn) : la tâche ne progressera plus
+        if job['status'] in ('queued', 'running') and not _pid_alive(job['pid']):
+            job['status'] = 'error'
+            job['error'] = "Tâche interrompue (le worker qui l'exécutait s'est arrêté)."
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        del job['pid']
+        return job
+
+    def get(self, job_id):
+        row = self._db.connect().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_recent(self, limit=50):
+        rows = self._db.connect().execute('SELECT * FROM jobs ORDER BY created DESC LIMIT ?', (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def request_cancel(self, job_id):
+        with self._db.connect() as conn:
+            cursor = conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN ('queued', 'running')", (job_id,))
+            return cursor.rowcount > 0
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+job_manager = JobManager(os.path.join(STATE_DIR, 'jobs.sqlite3'), JOB_WORKERS)
+
+
+def scan_tree_totals(path, job):
+    """Compte les fichiers et octets d'une arborescence (pour la progression)."""
+    if not os.path.isdir(path) or os.path.islink(path):
+        return 1, os.lstat(path).st_size
+    files_total = bytes_total = 0
+    for root, dirs, files in os.walk(path):
+        metrics.count_fs('walk_entries', len(dirs) + len(files))
+        metrics.count_fs('stat', len(files))
+        for name in files:
+            try:
+                bytes_total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+            files_total += 1
+        job.check_cancelled()
+    return files_total, bytes_total
+
+
+# ioctl Linux de clonage (reflink) : partage les extents sans copier les données (btrfs, xfs)
+FICLONE = 0x40049409
+# Taille maximale par appel copy_file_range/sendfile : garde la progression et l'annulation réactives
+COPY_KERNEL_CHUNK = 64 * 1024 * 1024
+# Erreurs signifiant « méthode non prise en charge ici » : on passe à la suivante
+COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTTY,
+                        errno.EBADF, errno.EPERM, getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP)}
+
+
+def _copy_reflink(fsrc, fdst, size, progress):
+    if fcntl is None or sys.platform != 'linux':
+        return False
+    try:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError as e:
+        if e.errno in COPY_FALLBACK_ERRNOS:
+            return False
+        raise
+    progress(size)
+    return True
+
+
+def _copy_kernel(fsrc, fdst, size, progress, copy_function):
+    """Copie via un appel noyau (copy_file_range ou sendfile), sans passer par l'espace utilisateur."""
+    offset = 0
+    while offset < size:
+        try:
+            copied = copy_function(fsrc.fileno(), fdst.fileno(), offset, min(COPY_KERNEL_CHUNK, size - offset))
+        except OSError as e:
+            # Refus dès le premier appel : méthode indisponible, rien n'a été écrit
+            if offset == 0 and e.errno in COPY_FALLBACK_ERRNOS:
+                return False
+            raise
+        if copied == 0:
+            # Certains systèmes de fichiers (procfs, FUSE...) répondent 0 au lieu d'une erreur
+            if offset == 0:
+                return False
+            break  # Fichier tronqué pendant la copie
+        offset += copied
+        progress(copied)
+    return True
+
+
+def _copy_file_range(in_fd, out_fd, offset, count):
+    return os.copy_file_range(in_fd, out_fd, count, offset, offset)
+
+
+def _sendfile(in_fd, out_fd, offset, count):
+    return os.sendfile(out_fd, in_fd, offset, count)
+
+
+def _copy_userspace(fsrc, fdst, size, progress):
+    while True:
+        block = fsrc.read(COPY_BUFFER_SIZE)
+        if not block:
+            break
+        fdst.write(block)
+        progress(len(block))
+    return True
+
+
+def fast_copy_file(src, dst, progress=lambda copied: None):
+    """Copie le contenu d'un fichier par le chemin le plus rapide disponible, puis conserve dates et droits.
+
+    Ordre d'essai : clone reflink (instantané), copy_file_range (copie côté
+    noyau, voire côté serveur sur NFS/SMB), sendfile, puis copie par blocs.
+    `progress(octets)` est appelé au fil de la copie et peut lever une exception
+    pour l'interrompre. Retourne le nom de la méthode utilisée.
+    """
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        methods = [('reflink', _copy_reflink)]
+        if hasattr(os, 'copy_file_range'):
+            methods.append(('copy_file_range', lambda *args: _copy_kernel(*args, _copy_file_range)))
+        if hasattr(os, 'sendfile') and sys.platform == 'linux':
+            methods.append(('sendfile', lambda *args: _copy_kernel(*args, _sendfile)))
+        methods.append(('userspace', _copy_userspace))
+
+        for method, copy in methods:
+            if size == 0 and method != 'userspace':
+                continue
+            if copy(fsrc, fdst, size, progress):
+                break
+    # Un clone reflink partage les blocs : aucun octet n'est réellement lu ni écrit
+    if method != 'reflink':
+        metrics.count_bytes('read', 'copy', size)
+        metrics.count_bytes('written', 'copy', size)
+    shutil.copystat(src, dst)
+    return method
+
+
+def copy_file_with_progress(src, dst, job):
+    """Copie un fichier en rapportant la progression, puis conserve les dates."""
+    fast_copy_file(src, dst, lambda copied: job.advance(bytes=copied))
+    job.advance(files=1)
+
+
+def copy_tree_with_progress(src, dst, job):
+    """Copie un fichier ou un dossier complet (les liens symboliques sont recréés tels quels)."""
+    if os.path.islink(src):
+        os.symlink(os.readlink(src), dst)
+        job.advance(files=1)
+    elif os.path.isdir(src):
+        os.makedirs(dst)
+        for entry in os.scandir(src):
+            copy_tree_with_progress(entry.path, os.path.join(dst, entry.name), job)
+        shutil.copystat(src, dst)
+    else:
+        copy_file_with_progress(src, dst, job)
+
+
+def delete_tree_with_progress(path, job):
+    """Supprime un fichier ou un dossier en rapportant la progression."""
+    if not os.path.isdir(path) or os.path.islink(path):
+        size = os.lstat(path).st_size
+        os.remove(path)
+        job.advance(files=1, bytes=size)
+        return
+    for root, dirs, files in os.walk(path, topdown=False):
+        for name in files:
+            file_path = os.path.join(root, name)
+            try:
+                size = os.lstat(file_path).st_size
+            except OSError:
+                size = 0
+            os.remove(file_path)
+            job.advance(files=1, bytes=size)
+        for name in dirs:
+            dir_path = os.path.join(root, name)
+            if os.path.islink(dir_path):
+                os.remove(dir_path)
+            else:
+                os.rmdir(dir_path)
+    os.rmdir(path)
+
+
+def refresh_fs_change(full_path):
+    """Resynchronise index et caches après une opération interrompue en cours de route."""
+    notify_fs_change('deleted', full_path)
+    if os.path.lexists(full_path):
+        notify_fs_change('created', full_path)
+
+
+def run_delete_job(job, full_path, relative_path):
+    item_type = "Dossier" if os.path.isdir(full_path) else "Fichier"
+    try:
+        job.set_phase("Analyse...")
+        job.set_totals(*scan_tree_totals(full_path, job))
+        job.set_phase("Suppression...")
+        delete_tree_with_progress(full_path, job)
+    finally:
+        refresh_fs_change(full_path)
+    return f"{item_type} '{relative_path}' supprimé avec succès."
+
+
+def run_move_job(job, full_source_path, full_destination_path):
+    item_type = "Dossier" if os.path.isdir(full_source_path) else "Fichier"
+    try:
+        # Même système de fichiers : simple renommage, instantané
+        os.rename(full_source_path, full_destination_path)
+        notify_fs_change('moved', full_source_path, full_destination_path)
+        return f"{item_type} déplacé avec succès."
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    # Systèmes de fichiers différents : copie puis suppression de la source
+    job.set_phase("Analyse...")
+    files_total, bytes_total = scan_tree_totals(full_source_path, job)
+    job.set_totals(files_total, bytes_total)
+    job.set_phase("Copie...")
+    try:
+        copy_tree_with_progress(full_source_path, full_destination_path, job)
+    except BaseException:
+        # Copie incomplète : on retire la destination, la source est intacte
+        remove_partial_copy(full_destination_path)
+        raise
+    finally:
+        refresh_fs_change(full_destination_path)
+
+    job.set_phase("Suppression de la source...")
+    if os.path.isdir(full_source_path) and not os.path.islink(full_source_path):
+        shutil.rmtree(full_source_path)
+    else:
+        os.remove(full_source_path)
+    notify_fs_change('deleted', full_source_path)
+    return f"{item_type} déplacé avec succès."
+
+
+def remove_partial_copy(full_path):
+    """Retire une destination laissée incomplète par une copie interrompue."""
+    if os.path.isdir(full_path) and not os.path.islink(full_path):
+        shutil.rmtree(full_path, ignore_errors=True)
+    elif os.path.lexists(full_path):
+        os.remove(full_path)
+
+
+def run_copy_job(job, full_source_path, full_destination_path):
+    item_type = "Dossier" if os.path.isdir(full_source_path) else "Fichier"
+    job.set_phase("Analyse...")
+    job.set_totals(*scan_tree_totals(full_source_path, job))
+    job.set_phase("Copie...")
+    try:
+        copy_tree_with_progress(full_source_path, full_destination_path, job)
+    except BaseException:
+        remove_partial_copy(full_destination_path)
+        raise
+    finally:
+        refresh_fs_change(full_destination_path)
+    return f"{item_type} copié avec succès."
+
+
+@app.route('/api/jobs', methods=['GET'])
+def api_jobs():
+    """Liste les tâches de fond récentes."""
+    return jsonify({"jobs": job_manager.list_recent()})
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job_status(job_id):
+    """État et progression d'une tâche de fond."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Tâche introuvable."}), 404
+    return jsonify(job)
+
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def api_job_cancel(job_id):
+    """Demande l'annulation d'une tâche en attente ou en cours."""
+    if job_manager.get(job_id) is None:
+        return jsonify({"error": "Tâche introuvable."}), 404
+    if not job_manager.request_cancel(job_id):
+        return jsonify({"error": "La tâche est déjà terminée."}), 409
+    return jsonify({"message": "Annulation demandée."}), 202
+
+
+@app.route('/api/delete', methods=['DELETE'])
+def api_delete():
+    """Supprime un fichier ou un dossier.
+
+    Avec "async": true, la suppression est confiée à une tâche de fond et la
+    réponse (202) contient son `job_id`.
+    """
+    data = request.json
+    relative_path = data.get('path')
+
+    if not relative_path:
+        return jsonify({"error": "Chemin de suppression manquant."}), 400
+
+    full_path_to_delete = secure_path_join(BASE_DIR, relative_path)
+
+    if full_path_to_delete is None:
+        return jsonify({"error": "Chemin de suppression en dehors du répertoire géré."}), 400
+
+    try:
+        if not os.path.exists(full_path_to_delete):
+            return jsonify({"error": "Fichier ou dossier non trouvé."}), 404
+
+        if data.get('async'):
+            job_id = job_manager.submit('delete', f"Suppression de '{relative_path}'", run_delete_job, full_path_to_delete, relative_path)
+            return jsonify({"message": "Suppression lancée.", "job_id": job_id}), 202
+
+        if os.path.isdir(full_path_to_delete):
+            shutil.rmtree(full_path_to_delete)
+            item_type = "Dossier"
+        else:
+            os.remove(full_path_to_delete)
+            item_type = "Fichier"
+
+        notify_fs_change('deleted', full_path_to_delete)
+            
+        return jsonify({"message": f"{item_type} '{relative_path}' supprimé avec succès."}), 200
+    except OSError as e:
+        print(f"Erreur d'OS lors de la suppression: {e}")
+        return jsonify({"error": f"Erreur de permission ou de système: {e}"}), 500
+    except Exception as e:
+        print(f"Erreur lors de la suppression: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/rename', methods=['POST'])
+def api_rename():
+    """Renomme un fichier ou un dossier."""
+    data = request.json
+    old_path = data.get('old_path')
+    new_name = data.get('new_name')
+
+    if not old_path or not new_name:
+        return jsonify({"error": "Chemin ou nouveau nom manquant."}), 400
+
+    new_name = secure_filename(new_name)
+    if not new_name:
+        return jsonify({"error": "Nouveau nom invalide."}), 400
+
+    full_old_path = secure_path_join(BASE_DIR, old_path)
+    
+    if full_old_path is None:
+        return jsonify({"error": "Chemin source en dehors du répertoire géré."}), 400
+
+    parent_dir = os.path.dirname(full_old_path)
+    full_new_path = os.path.join(parent_dir, new_name)
+
+    if not full_new_path.startswith(os.path.normpath(BASE_DIR)):
+        return jsonify({"error": "Nouveau chemin en dehors du répertoire géré."}), 400
+
+    try:
+        if not os.path.exists(full_old_path):
+            return jsonify({"error": "Fichier ou dossier non trouvé."}), 404
+
+        if os.path.exists(full_new_path):
+            return jsonify({"error": f"Un fichier ou dossier nommé '{new_name}' existe déjà."}), 409
+
+        os.rename(full_old_path, full_new_path)
+        notify_fs_change('moved', full_old_path, full_new_path)
+        
+        item_type = "Dossier" if os.path.isdir(full_new_path) else "Fichier"
+        return jsonify({"message": f"{item_type} renommé en '{new_name}' avec succès."}), 200
+        
+    except OSError as e:
+        print(f"Erreur d'OS lors du renommage: {e}")
+        return jsonify({"error": f"Erreur de permission ou de système: {e}"}), 500
+    except Exception as e:
+        print(f"Erreur lors du renommage: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/download', methods=['GET'])
+def api_download():
+    """Sert un fichier pour téléchargement (plages, reprise et débit réparti par l'ordonnanceur)."""
+    relative_path = request.args.get('path')
+
+    if not relative_path or relative_path.endswith('/'):
+        return jsonify({"error": "Requête de téléchargement invalide (le chemin doit être un fichier)."}), 400
+
+    full_path = secure_path_join(BASE_DIR, relative_path)
+
+    if full_path is None:
+        return jsonify({"error": "Chemin de téléchargement en dehors du répertoire géré."}), 400
+
+    if not os.path.isfile(full_path):
+        return jsonify({"error": "Fichier non trouvé."}), 404
+
+    try:
+        mime_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        # Nom d'origine, quoté par attachment_headers comme le faisait send_from_directory
+        return send_file_ranged(full_path, mime_type, as_attachment=True, download_name=os.path.basename(full_path),
+                                transfer_kind='download')
+    except FileNotFoundError:
+        return jsonify({"error": "Fichier non trouvé."}), 404
+    except Exception as e:
+        print(f"Erreur lors du téléchargement: {e}")
+        return jsonify({"error": str(e)}), 500
+
+# --- ORDONNANCEMENT DES TRANSFERTS (DÉBIT PAR CLIENT, PRIORITÉ À L'INTERACTIF) ---
+
+# Débits en Mbit/s (0 : illimité), convertis en octets/s. Le total est à régler un peu sous le
+# débit montant de la connexion : la file d'attente se forme alors ici, pas dans le routeur.
+TRANSFER_RATE_LIMIT = float(os.environ.get('FLASK_TRANSFER_RATE_MBIT', '0')) * 125000
+TRANSFER_CLIENT_RATE_LIMIT = float(os.environ.get('FLASK_TRANSFER_CLIENT_RATE_MBIT', '0')) * 125000
+# Part du débit total retirée aux transferts tant que des requêtes interactives arrivent
+TRANSFER_INTERACTIVE_SHARE = float(os.environ.get('FLASK_TRANSFER_INTERACTIVE_SHARE', '0.2'))
+TRANSFER_INTERACTIVE_HOLD = 5  # Réserve gardée après la dernière requête interactive (s)
+TRANSFER_MAX_HEAVY = int(os.environ.get('FLASK_TRANSFER_MAX_HEAVY', '2'))  # Archives simultanées, tous workers confondus (0 : sans limite)
+TRANSFER_HEAVY_KINDS = ('archive',)
+TRANSFER_HEAVY_WAIT = 30  # Attente max d'une place pour une opération lourde, puis 503 (s)
+TRANSFER_SLOT_WAIT = 0.2
+TRANSFER_TICK = 0.5  # Intervalle de recalcul des allocations (s)
+TRANSFER_STALE_AFTER = 10  # Flux non republié depuis (s) : son worker s'est arrêté
+TRANSFER_BURST = 0.25  # Secondes de débit qu'un flux peut accumuler...
+TRANSFER_BURST_MIN = 1024 * 1024  # ... et au moins un bloc lu (ZIP_CHUNK_SIZE) : un client lent n'attend jamais les jetons
+TRANSFER_MIN_RATE = 16 * 1024  # Demande minimale prêtée à un flux ralenti par son client (octets/s)
+TRANSFER_CLIENT_HEADER = os.environ.get('FLASK_TRANSFER_CLIENT_HEADER')  # Ex. X-Forwarded-For derrière un proxy
+# Routes dont le corps est un transfert ; les autres forment la file interactive,
+# sauf celles qui ne traduisent pas une action de l'utilisateur (supervision, flux ouverts en continu)
+TRANSFER_ENDPOINTS = ('api_download', 'api_view', 'api_download_folder', 'api_remux_segment')
+TRANSFER_PASSIVE_ENDPOINTS = ('prometheus_metrics', 'api_admin_transfers', 'api_transfer_stats', 'api_events')
+
+
+class TransferBusy(Exception):
+    """Toutes les places d'opération lourde sont occupées."""
+
+
+def transfer_client():
+    """Client de la requête en cours : adresse IP, ou TRANSFER_CLIENT_HEADER derrière un proxy."""
+    if TRANSFER_CLIENT_HEADER:
+        forwarded = request.headers.get(TRANSFER_CLIENT_HEADER, '').split(',')[0].strip()
+        if forwarded:
+            return forwarded
+    return request.remote_addr or 'inconnu'
+
+
+def _water_fill(capacity, demands):
+    """Partage max-min : chacun reçoit au plus sa demande, ce que les petits laissent va aux autres à parts égales."""
+    if capacity == float('inf'):
+        return dict(demands)
+    shares = {}
+    pending = sorted(demands.items(), key=lambda item: item[1])
+    remaining = capacity
+    while pending and pending[0][1] <= remaining / len(pending):
+        key, demand = pending.pop(0)
+        shares[key] = demand
+        remaining -= demand
+    for key, _ in pending:
+        shares[key] = remaining / len(pending)
+    return shares
+
+
+def allocate_bandwidth(streams, capacity, client_rate):
+    """Répartit `capacity` entre clients (au plus client_rate chacun), puis entre les flux de chaque client.
+
+    streams : [(id, client, demande)], demande en octets/s ou None si le flux
+    prendrait tout ce qu'on lui donne ; capacity et client_rate None si illimités.
+    Retourne {id: débit alloué en octets/s, ou None pour illimité}.
+    """
+    inf = float('inf')
+    by_client = {}
+    for stream_id, client, demand in streams:
+        by_client.setdefault(client, {})[stream_id] = inf if demand is None else demand
+    client_demands = {client: min(client_rate or inf, sum(demands.values())) for client, demands in by_client.items()}
+    client_shares = _water_fill(inf if capacity is None else capacity, client_demands)
+
+    allocations = {}
+    for client, demands in by_client.items():
+        for stream_id, share in _water_fill(client_shares[client], demands).items():
+            allocations[stream_id] = None if share == inf else share
+    return allocations
+
+
+class TransferStream:
+    """Corps de réponse en cours d'envoi, cadencé par un seau à jetons rempli à son débit alloué."""
+
+    def __init__(self, scheduler, kind, client, path, release_slot=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.client = client
+        self.path = path
+        self.started = time.time()
+        self.bytes_sent = 0
+        self.rate = None  # Débit alloué (octets/s), None : illimité
+        self.demand = None  # Débit que le flux prendrait (None : tout ce qu'on lui donne)
+        self.measured_rate = 0.0
+        self.paced = scheduler.limited  # Sinon, gunicorn peut envoyer le fichier avec sendfile()
+        self._scheduler = scheduler
+        self._release_slot = release_slot
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self._refilled = time.monotonic()
+        self._measured_bytes = 0
+        self._measured_at = self._refilled
+        self._waited = 0.0  # Attente des jetons depuis la dernière mesure
+        self._closed = False
+
+    def _refill(self, now):
+        if self.rate is None:
+            self._tokens = 0.0
+        else:
+            burst = max(self.rate * TRANSFER_BURST, TRANSFER_BURST_MIN)
+            self._tokens = min(burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())  # Jetons accumulés jusqu'ici à l'ancien débit
+            self.rate = None if rate is None else max(rate, 1.0)
+
+    def consume(self, count):
+        """Compte `count` octets envoyés et attend que le débit alloué les couvre."""
+        if not count:
+            return
+        with self._lock:
+            self.bytes_sent += count
+            self._tokens -= count
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.rate is None or self._tokens >= 0:
+                    break
+                # Par tranches : une nouvelle allocation est prise en compte en cours d'attente
+                delay = min(-self._tokens / self.rate, TRANSFER_TICK)
+                self._waited += delay
+            time.sleep(delay)
+            waited += delay
+        if waited:
+            metrics.inc('transfer_wait_seconds_total', waited, kind=self.kind)
+
+    def measure(self, now):
+        """Débit depuis la mesure précédente, et demande qu'on en déduit pour la prochaine allocation."""
+        with self._lock:
+            elapsed = now - self._measured_at
+            if elapsed < TRANSFER_TICK / 2:  # Tick anticipé (ouverture ou fin d'un flux) : mesure trop courte
+                return
+            # Moyenne glissante : un bloc lu toutes les quelques mesures ne fait pas osciller le débit
+            recent_rate = (self.bytes_sent - self._measured_bytes) / elapsed
+            self.measured_rate = self.measured_rate * 0.75 + recent_rate * 0.25 if self._measured_bytes else recent_rate
+            self._measured_bytes = self.bytes_sent
+            self._measured_at = now
+            throttled = self._waited > 0
+            self._waited = 0.0
+            # Freiné par l'ordonnanceur (ou trop récent pour le savoir) : il prendrait davantage.
+            # Sinon, c'est le client qui le ralentit (connexion lente, lecture en pause) : le reste est cédé.
+            young = time.time() - self.started < 2 * TRANSFER_TICK
+            if self.rate is None or young or throttled:
+                self.demand = None
+            else:
+                self.demand = max(self.measured_rate * 1.5, TRANSFER_MIN_RATE)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._release_slot is not None:
+            self._release_slot()
+        self._scheduler._closed(self)
+
+
+class _ScheduledBody:
+    """Corps en flux (archive, plages multiples) cadencé par son TransferStream."""
+
+    def __init__(self, iterable, stream):
+        self._iterable = iterable
+        self._stream = stream
+
+    def __iter__(self):
+        for chunk in self._iterable:
+            self._stream.consume(len(chunk))
+            yield chunk
+
+    def close(self):
+        try:
+            close = getattr(self._iterable, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self._stream.close()
+
+
+class TransferScheduler:
+    """Répartit le débit des transferts (téléchargements, lectures, archives) entre clients et flux.
+
+    Chaque worker publie ses flux actifs dans une base SQLite de STATE_DIR et
+    recalcule toutes les TRANSFER_TICK secondes le partage max-min de tous les
+    flux connus : le débit total est réparti équitablement entre clients (au
+    plus TRANSFER_CLIENT_RATE_LIMIT chacun), puis entre les flux de chaque
+    client ; un flux qui n'utilise pas sa part (client lent, vidéo en pause)
+    la cède aux autres. Les requêtes interactives (listings, recherches...) ne
+    sont jamais freinées et, tant qu'il en arrive, TRANSFER_INTERACTIVE_SHARE
+    du total est retiré aux transferts pour qu'elles passent devant. Les
+    opérations lourdes (archives) occupent l'une des TRANSFER_MAX_HEAVY places
+    partagées entre workers (verrous flock).
+    """
+
+    def __init__(self, db_path, slots_dir, total_rate, client_rate, max_heavy):
+        self.db_path = db_path
+        self.slots_dir = slots_dir
+        self.total_rate = total_rate or None
+        self.client_rate = client_rate or None
+        self.max_heavy = max_heavy
+        self.limited = self.total_rate is not None or self.client_rate is not None
+        os.makedirs(slots_dir, exist_ok=True)
+        self._running = False  # Thread de répartition lancé par start()
+        self._start_worker()
+        with self._db.connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS streams (
+                id TEXT PRIMARY KEY, worker TEXT NOT NULL, pid INTEGER NOT NULL, client TEXT NOT NULL,
+                kind TEXT NOT NULL, path TEXT NOT NULL, started REAL NOT NULL, updated REAL NOT NULL,
+                bytes_sent INTEGER NOT NULL, rate REAL NOT NULL, demand REAL, allocated REAL)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS interactive (
+                id INTEGER PRIMARY KEY CHECK (id = 0), last_request REAL NOT NULL, requests INTEGER NOT NULL)""")
+            conn.execute('INSERT OR IGNORE INTO interactive (id, last_request, requests) VALUES (0, 0, 0)')
+        # Comme Metrics : après un fork, ni le verrou, ni la connexion, ni le thread ne sont réutilisables
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._start_worker)
+
+    def _start_worker(self):
+        self._lock = threading.Lock()
+        self._db = StateDatabase(self.db_path)
+        self._semaphore = threading.BoundedSemaphore(max(1, self.max_heavy))
+        self._streams = {}
+        self._interactive_at = 0.0
+        self._interactive_requests = 0
+        self._published = False  # Des flux de ce worker sont en base
+        self._snapshot = ([], self.total_rate)  # Derniers flux connus et capacité : allocation des nouveaux flux
+        self._worker = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._wakeup = threading.Event()
+        if self._running:
+            threading.Thread(target=self._loop, name='transfer-scheduler', daemon=True).start()
+
+    def start(self):
+        """Lance la boucle qui répartit périodiquement le débit entre les flux."""
+        self._running = True
+        threading.Thread(target=self._loop, name='transfer-scheduler', daemon=True).start()
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(TRANSFER_TICK)
+            self._wakeup.clear()
+            try:
+                self.tick()
+            except sqlite3.Error as e:
+                print(f"Erreur de l'ordonnanceur de transferts: {e}")
+
+    # Chemin des requêtes
+
+    def mark_interactive(self):
+        with self._lock:
+            self._interactive_at = time.time()
+            self._interactive_requests += 1
+
+    def open(self, kind):
+        """Enregistre le transfert de la requête en cours. TransferBusy si aucune place lourde ne se libère."""
+        release_slot = self._acquire_heavy() if kind in TRANSFER_HEAVY_KINDS else None
+        stream = TransferStream(self, kind, transfer_client(), request.args.get('path', ''), release_slot)
+        with self._lock:
+            streams, capacity = self._snapshot
+            allocations = allocate_bandwidth(streams + [(stream.id, stream.client, None)], capacity, self.client_rate)
+            stream.set_rate(allocations[stream.id])
+            self._streams[stream.id] = stream
+        self._wakeup.set()  # Les autres flux cèdent sa part au nouveau dès maintenant
+        return stream
+
+    def _closed(self, stream):
+        with self._lock:
+            self._streams.pop(stream.id, None)
+        self._wakeup.set()
+
+    def _acquire_heavy(self):
+        """Une des places d'opération lourde ; retourne la fonction qui la libère."""
+        if not self.max_heavy:
+            return None
+        if fcntl is None:
+            if not self._semaphore.acquire(timeout=TRANSFER_HEAVY_WAIT):
+                raise self._heavy_busy()
+            return self._semaphore.release
+        deadline = time.monotonic() + TRANSFER_HEAVY_WAIT
+        while True:
+            for slot in range(self.max_heavy):
+                lock_file = open(os.path.join(self.slots_dir, f'.heavy-{slot}.lock'), 'w')
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    lock_file.close()
+                    continue
+                return lock_file.close
+            if time.monotonic() >= deadline:
+                raise self._heavy_busy()
+            time.sleep(TRANSFER_SLOT_WAIT)
+
+    def _heavy_busy(self):
+        metrics.inc('transfer_rejected_total', reason='heavy')
+        return TransferBusy(f"{self.max_heavy} archive(s) déjà en cours de création, réessayez dans un instant.")
+
+    # Allocation (thread de l'ordonnanceur)
+
+    def _bulk_capacity(self, last_interactive, now):
+        """Débit laissé aux transferts : le total, moins la réserve de la file interactive si elle sert."""
+        if self.total_rate is None:
+            return None
+        if last_interactive >= now - TRANSFER_INTERACTIVE_HOLD:
+            return self.total_rate * (1 - TRANSFER_INTERACTIVE_SHARE)
+        return self.total_rate
+
+    def tick(self):
+        """Publie les flux du worker et leur applique le partage calculé sur ceux de tous les workers."""
+        now = time.time()
+        with self._lock:
+            streams = list(self._streams.values())
+            interactive_at = self._interactive_at
+            interactive_requests = self._interactive_requests
+            self._interactive_requests = 0
+        if not streams and not self._published and not interactive_requests:
+            return
+
+        for stream in streams:
+            stream.measure(time.monotonic())
+        conn = self._db.connect()
+        with conn:
+            conn.execute('DELETE FROM streams WHERE worker = ? OR updated < ?', (self._worker, now - TRANSFER_STALE_AFTER))
+            conn.executemany(
+                'INSERT INTO streams (id, worker, pid, client, kind, path, started, updated, bytes_sent, rate, demand, allocated) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(s.id, self._worker, os.getpid(), s.client, s.kind, s.path, s.started, now, s.bytes_sent,
+                  s.measured_rate, s.demand, s.rate) for s in streams])
+            if interactive_requests:
+                conn.execute('UPDATE interactive SET last_request = MAX(last_request, ?), requests = requests + ? WHERE id = 0',
+                             (interactive_at, interactive_requests))
+        self._published = bool(streams)
+        if not streams:
+            return
+
+        rows = [(stream_id, client, demand) for stream_id, client, demand, pid in conn.execute(
+            'SELECT id, client, demand, pid FROM streams WHERE updated >= ?', (now - TRANSFER_STALE_AFTER,))
+            if pid == os.getpid() or _pid_alive(pid)]
+        last_interactive = conn.execute('SELECT last_request FROM interactive WHERE id = 0').fetchone()[0]
+        capacity = self._bulk_capacity(max(last_interactive, interactive_at), now)
+        allocations = allocate_bandwidth(rows, capacity, self.client_rate)
+        with self._lock:
+            self._snapshot = (rows, capacity)
+        for stream in streams:
+            if stream.id in allocations:
+                stream.set_rate(allocations[stream.id])
+
+    def report(self):
+        """Allocations courantes de tous les workers (à TRANSFER_TICK près)."""
+        now = time.time()
+        conn = self._db.connect()
+        rows = conn.execute(
+            'SELECT id, pid, client, kind, path, started, bytes_sent, rate, demand, allocated FROM streams '
+            'WHERE updated >= ? ORDER BY started', (now - TRANSFER_STALE_AFTER,)).fetchall()
+        last_request, requests = conn.execute('SELECT last_request, requests FROM interactive WHERE id = 0').fetchone()
+        last_request = max(last_request, self._interactive_at)
+
+        streams = []
+        clients = {}
+        for stream_id, pid, client, kind, path, started, bytes_sent, rate, demand, allocated in rows:
+            if pid != os.getpid() and not _pid_alive(pid):
+                continue
+            streams.append({
+                "id": stream_id,
+                "pid": pid,
+                "client": client,
+                "kind": kind,
+                "path": path,
+                "started": datetime.fromtimestamp(started).isoformat(),
+                "bytes_sent": bytes_sent,
+                "bytes_per_second": round(rate, 1),
+                "demand": None if demand is None else round(demand, 1),
+                "allocated": None if allocated is None else round(allocated, 1),
+            })
+            totals = clients.setdefault(client, {"client": client, "streams": 0, "bytes_per_second": 0.0, "allocated": 0.0})
+            totals["streams"] += 1
+            totals["bytes_per_second"] = round(totals["bytes_per_second"] + rate, 1)
+            totals["allocated"] = None if allocated is None or totals["allocated"] is None else round(totals["allocated"] + allocated, 1)
+
+        return {
+            "limits": {
+                "total_rate": self.total_rate,
+                "client_rate": self.client_rate,
+                "interactive_share": TRANSFER_INTERACTIVE_SHARE,
+                "max_heavy": self.max_heavy or None,
+            },
+            "bulk_capacity": self._bulk_capacity(last_request, now),
+            "interactive": {
+                "active": last_request >= now - TRANSFER_INTERACTIVE_HOLD,
+                "last_request": datetime.fromtimestamp(last_request).isoformat() if last_request else None,
+                "requests": requests,
+            },
+            "heavy_in_use": sum(1 for stream in streams if stream["kind"] in TRANSFER_HEAVY_KINDS),
+            "clients": sorted(clients.values(), key=lambda totals: -totals["bytes_per_second"]),
+            "streams": streams,
+        }
+
+
+transfer_scheduler = TransferScheduler(os.path.join(STATE_DIR, 'transfers.sqlite3'), os.path.join(STATE_DIR, 'transfers'),
+                                       TRANSFER_RATE_LIMIT, TRANSFER_CLIENT_RATE_LIMIT, TRANSFER_MAX_HEAVY)
+
+
+@app.before_request
+def transfer_priority_lane():
+    """Requêtes interactives : jamais freinées, elles réservent leur part du débit aux dépens des transferts."""
+    if request.endpoint is None or request.endpoint in TRANSFER_ENDPOINTS or request.endpoint in TRANSFER_PASSIVE_ENDPOINTS:
+        return
+    transfer_scheduler.mark_interactive()
+
+
+@app.route('/api/admin/transfers', methods=['GET'])
+def api_admin_transfers():
+    """Allocations de l'ordonnanceur : limites, capacité laissée aux transferts, débit par client et par flux."""
+    try:
+        return jsonify(transfer_scheduler.report())
+    except sqlite3.Error as e:
+        print(f"Erreur lors de la lecture des allocations: {e}")
+        return jsonify({"error": str(e)}), 503
+
+# --- DIFFUSION PAR PLAGES (HTTP RANGE) ---
+
+RANGE_CHUNK_SIZE = 256 * 1024
+THROUGHPUT_WINDOW = 60  # secondes prises en compte pour le débit instantané
+
+
+class TransferStats:
+    """Compteurs de débit du worker courant (octets envoyés, requêtes, flux actifs)."""
+
+    def __init__(self, window=THROUGHPUT_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._recent = []  # [(timestamp, octets)] sur la fenêtre glissante
+        self.bytes_sent = 0
+        self.requests = 0
+        self.range_requests = 0
+        self.not_modified = 0
+        self.active_streams = 0
+        self.started_at = time.time()
+
+    def count_request(self, is_range=False, not_modified=False):
+        with self._lock:
+            self.requests += 1
+            self.range_requests += int(is_range)
+            self.not_modified += int(not_modified)
+
+    def stream_opened(self):
+        with self._lock:
+            self.active_streams += 1
+
+    def stream_closed(self):
+        with self._lock:
+            self.active_streams -= 1
+
+    def add_bytes(self, count):
+        if not count:
+            return
+        metrics.count_bytes('read', 'download', count)
+        now = time.time()
+        with self._lock:
+            self.bytes_sent += count
+            self._recent.append((now, count))
+            limit = now - self.window
+            while self._recent and self._recent[0][0] < limit:
+                self._recent.pop(0)
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            recent = sum(count for ts, count in self._recent if ts >= now - self.window)
+            return {
+                "pid": os.getpid(),
+                "uptime_seconds": round(now - self.started_at, 1),
+                "bytes_sent": self.bytes_sent,
+                "bytes_per_second": round(recent / self.window, 1),
+                "requests": self.requests,
+                "range_requests": self.range_requests,
+                "not_modified": self.not_modified,
+                "active_streams": self.active_streams,
+            }
+
+
+transfer_stats = TransferStats()
+
+
+class _BoundedFile:
+    """Vue d'un fichier limitée à `length` octets à partir de la position courante.
+
+    Expose fileno() pour que gunicorn puisse utiliser os.sendfile() (la
+    longueur est bornée par Content-Length), et read() borné sinon. Un flux
+    cadencé par l'ordonnanceur de débit passe toujours par read().
+    """
+
+    def __init__(self, file, length, count_unread=True, stream=None):
+        self._file = file
+        self._remaining = length
+        self._length = length
+        self._count_unread = count_unread
+        self._stream = stream
+        transfer_stats.stream_opened()
+
+    def fileno(self):
+        if self._stream is not None and self._stream.paced:
+            raise OSError("flux cadencé : envoi par read()")  # gunicorn renonce alors à sendfile()
+        return self._file.fileno()
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        size = self._remaining if size is None or size < 0 else min(size, self._remaining)
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        transfer_stats.add_bytes(len(data))
+        if self._stream is not None:
+            self._stream.consume(len(data))
+        return data
+
+    def close(self):
+        if self._file.closed:
+            return
+        # Avec sendfile, read() n'est jamais appelé : on compte la plage envoyée par le noyau
+        if self._count_unread and self._remaining == self._length:
+            transfer_stats.add_bytes(self._length)
+            if self._stream is not None and not self._stream.paced:
+                self._stream.consume(self._length)
+        self._file.close()
+        transfer_stats.stream_closed()
+        if self._stream is not None:
+            self._stream.close()
+
+
+def _iter_multipart_ranges(full_path, ranges, size, content_type, boundary):
+    """Corps multipart/byteranges, lu par blocs de taille bornée."""
+    transfer_stats.stream_opened()
+    try:
+        with open(full_path, 'rb') as f:
+            for part_header, (start, stop) in zip(_multipart_headers(ranges, size, content_type, boundary), ranges):
+                yield part_header
+                f.seek(start)
+                remaining = stop - start
+                while remaining > 0:
+                    data = f.read(min(RANGE_CHUNK_SIZE, remaining))
+                    if not data:
+                        break
+                    remaining -= len(data)
+                    transfer_stats.add_bytes(len(data))
+                    yield data
+            yield f"\r\n--{boundary}--\r\n".encode('ascii')
+    finally:
+        transfer_stats.stream_closed()
+
+
+def _multipart_headers(ranges, size, content_type, boundary):
+    return [
+        (f"\r\n--{boundary}\r\nContent-Type: {content_type}\r\n"
+         f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n").encode('ascii')
+        for start, stop in ranges
+    ]
+
+
+def _resolve_ranges(range_header, size):
+    """Convertit l'en-tête Range en plages [start, stop) triées et fusionnées. None si non satisfaisable."""
+    ranges = []
+    for start, stop in range_header.ranges:
+        if start < 0:  # plage suffixe : les N derniers octets
+            start, stop = max(0, size + start), size
+        else:
+            stop = size if stop is None else min(stop, size)
+        if start < stop:
+            ranges.append([start, stop])
+    if not ranges:
+        return None
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, stop in ranges[1:]:
+        if start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+    return [tuple(r) for r in merged]
+
+
+def file_etag(stat):
+    """ETag fort construit à partir de l'inode, de la taille et du mtime."""
+    return f"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+def send_file_ranged(full_path, mime_type, as_attachment=False, download_name=None, content_encoding=None, source_stat=None,
+                     transfer_kind=None):
+    """Envoie un fichier en gérant Range (simple et multiple), If-Range, ETag et 304.
+
+    Pour une variante précompressée, full_path est le fichier compressé et
+    source_stat le stat de l'original, dont dérivent ETag et Last-Modified.
+    Avec transfer_kind ('download', 'view'), le corps est cadencé par l'ordonnanceur de débit.
+    """
+    stat = os.stat(full_path)
+    size = stat.st_size
+    etag = file_etag(source_stat or stat)
+    if content_encoding:
+        etag = f"{etag}-{content_encoding}"
+    last_modified = datetime.fromtimestamp(int((source_stat or stat).st_mtime), timezone.utc)
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{etag}"',
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": "private, no-cache",
+    }
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    if as_attachment:
+        headers.update(attachment_headers(download_name or os.path.basename(full_path)))
+
+    # Requête conditionnelle : le client a déjà la bonne version
+    if request.if_none_match:
+        # Comparaison faible (RFC 7232 §3.2) : un proxy peut avoir affaibli l'ETag (W/"...") ; If-Range reste forte
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = request.if_modified_since is not None and request.if_modified_since >= last_modified
+    if not_modified:
+        transfer_stats.count_request(not_modified=True)
+        return Response(status=304, headers=headers)
+
+    ranges = None
+    if request.range is not None and request.range.units == 'bytes':
+        # If-Range : la plage n'est valable que si le fichier n'a pas changé
+        if_range = request.if_range
+        # Comparaison forte : werkzeug retire le préfixe W/, un ETag faible ne valide jamais la plage
+        weak_if_range = request.headers.get('If-Range', '').lstrip().startswith('W/')
+        range_valid = (not if_range.etag and not if_range.date) \
+            or (if_range.etag is not None and not weak_if_range and if_range.etag == etag) \
+            or (if_range.date is not None and if_range.date == last_modified)
+        if range_valid:
+            ranges = _resolve_ranges(request.range, size)
+            if ranges is None:
+                transfer_stats.count_request(is_range=True)
+                headers["Content-Range"] = f"bytes */{size}"
+                return Response(status=416, headers=headers)
+
+    transfer_stats.count_request(is_range=ranges is not None)
+    scheduled = transfer_kind is not None and request.method != 'HEAD'
+
+    if ranges is not None and len(ranges) > 1:
+        boundary = os.urandom(12).hex()
+        part_headers = _multipart_headers(ranges, size, mime_type, boundary)
+        headers["Content-Length"] = str(
+            sum(len(h) for h in part_headers) + sum(stop - start for start, stop in ranges) + len(f"\r\n--{boundary}--\r\n")
+        )
+        body = _iter_multipart_ranges(full_path, ranges, size, mime_type, boundary)
+        return Response(
+            _ScheduledBody(body, transfer_scheduler.open(transfer_kind)) if scheduled else body,
+            status=206,
+            mimetype=f"multipart/byteranges; boundary={boundary}",
+            headers=headers,
+            direct_passthrough=True,
+        )
+
+    start, stop = ranges[0] if ranges else (0, size)
+    status = 206 if ranges else 200
+    if ranges:
+        headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+    headers["Content-Length"] = str(stop - start)
+
+    file = open(full_path, 'rb')
+    file.seek(start)
+    stream = transfer_scheduler.open(transfer_kind) if scheduled else None
+    body = wrap_file(request.environ, _BoundedFile(file, stop - start, count_unread=request.method != 'HEAD', stream=stream),
+                     buffer_size=RANGE_CHUNK_SIZE)
+    return Response(body, status=status, mimetype=mime_type, headers=headers, direct_passthrough=True)
+
+
+@app.route('/api/stats/folder', methods=['GET'])
+def api_folder_stats():
+    """Taille totale, nombre de fichiers/dossiers et dernière modification d'un dossier (récursifs)."""
+    relative_path = request.args.get('path', '/').strip('/')
+    target_dir = secure_path_join(BASE_DIR, relative_path)
+
+    if target_dir is None:
+        return jsonify({"error": "Chemin d'accès invalide ou non autorisé."}), 400
+
+    if not os.path.isdir(target_dir):
+        return jsonify({"error": "Le chemin spécifié n'est pas un répertoire."}), 404
+
+    if search_index is None:
+        return jsonify({"error": "L'index est désactivé : statistiques de dossiers indisponibles."}), 400
+
+    stats = search_index.stats_for(to_relative_path(target_dir)) if search_index.is_ready() else None
+    if stats is None:
+        return jsonify({"error": "Statistiques en cours de calcul, réessayez dans un instant."}), 503
+
+    total_bytes, file_count, folder_count, newest = stats
+    return jsonify({
+        "path": "/" + relative_path,
+        "size": total_bytes,
+        "file_count": file_count,
+        "folder_count": folder_count,
+        "newest_modified": datetime.fromtimestamp(newest).isoformat() if newest else None
+    })
+
+
+@app.route('/api/stats/transfers', methods=['GET'])
+def api_transfer_stats():
+    """Compteurs de débit du worker qui traite la requête."""
+    return jsonify(transfer_stats.snapshot())
+
+
+@app.route('/api/view', methods=['GET'])
+def api_view():
+    """Renvoie un fichier pour qu'il soit visualisé directement dans le navigateur."""
+    relative_path = request.args.get('path')
+
+    if not relative_path or relative_path.endswith('/'):
+        return jsonify({"error": "Requête de visualisation invalide (le chemin doit être un fichier)."}), 400
+
+    full_path_to_file = secure_path_join(BASE_DIR, relative_path)
+
+    if full_path_to_file is None:
+        return jsonify({"error": "Chemin de visualisation en dehors du répertoire géré."}), 400
+
+    if not os.path.exists(full_path_to_file) or os.path.isdir(full_path_to_file):
+        return jsonify({"error": "Fichier non trouvé."}), 404
+
+    try:
+        mime_type = mimetypes.guess_type(full_path_to_file)[0] or 'application/octet-stream'
+        
+        if is_text_file(relative_path):
+            mime_type = 'text/plain; charset=utf-8'
+        
+        return send_file_compressed(full_path_to_file, mime_type, transfer_kind='view')
+
+    except Exception as e:
+        print(f"Erreur lors de la visualisation: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+# --- COMPRESSION DES RÉPONSES ---
+
+try:
+    import brotli
+except ImportError:  # Module optionnel : pas d'encodage br
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Module optionnel : pas d'encodage zstd
+    zstandard = None
+
+COMPRESSION_ENABLED = os.environ.get('FLASK_COMPRESSION', '1') != '0'
+COMPRESSION_MIN_SIZE = int(os.environ.get('FLASK_COMPRESSION_MIN_BYTES', '1024'))  # En dessous, le gain ne vaut pas le calcul
+COMPRESSION_MAX_DYNAMIC_SIZE = 32 * 1024 * 1024  # Réponses générées compressées en mémoire au plus
+COMPRESSION_LEVELS = {'zstd': 3, 'br': 4, 'gzip': 6}  # Réponses générées : compression rapide
+COMPRESSION_CACHED_LEVELS = {'zstd': 12, 'br': 9, 'gzip': 9}  # Variantes sur disque : compressées une seule fois
+COMPRESSION_CACHE_DIR = os.path.join(STATE_DIR, 'compressed')
+COMPRESSION_CACHE_MAX_BYTES = int(os.environ.get('FLASK_COMPRESSION_CACHE_MB', '256')) * 1024 * 1024
+COMPRESSION_CACHE_MAX_FILE = 64 * 1024 * 1024  # Fichiers plus gros servis tels quels (Range reste possible)
+COMPRESSION_BUFFER_SIZE = 1024 * 1024
+COMPRESSION_CACHE_TOUCH_INTERVAL = 3600  # Précision de la date d'accès (ordre LRU) des variantes
+# Liste blanche : images, vidéos, sons et archives sont déjà compressés
+COMPRESSIBLE_MIME_TYPES = ('application/json', 'application/javascript', 'application/xml',
+                           'application/x-ndjson', 'image/svg+xml')
+
+# Ordre de préférence à qualité égale : zstd et br compressent mieux et plus vite que gzip
+COMPRESSION_ENCODINGS = tuple(encoding for encoding, available in
+                              (('zstd', zstandard is not None), ('br', brotli is not None), ('gzip', True))
+                              if available)
+
+
+def is_compressible(mime_type):
+    mime_type = (mime_type or '').split(';')[0].strip()
+    return mime_type.startswith('text/') or mime_type in COMPRESSIBLE_MIME_TYPES
+
+
+def negotiate_encoding():
+    """Encodage accepté par le client (Accept-Encoding) de plus haute qualité, ou None."""
+    if not COMPRESSION_ENABLED:
+        return None
+    best, best_quality = None, 0
+    for encoding in COMPRESSION_ENCODINGS:
+        quality = request.accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_bytes(data, encoding, level):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_stream(src, dst, encoding, level):
+    """Compresse un fichier ouvert dans un autre, par blocs (mémoire bornée)."""
+    if encoding == 'zstd':
+        zstandard.ZstdCompressor(level=level).copy_stream(src, dst, read_size=COMPRESSION_BUFFER_SIZE)
+    elif encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        while True:
+            chunk = src.read(COMPRESSION_BUFFER_SIZE)
+            if not chunk:
+                break
+            dst.write(compressor.process(chunk))
+        dst.write(compressor.finish())
+    else:
+        with gzip.GzipFile(fileobj=dst, mode='wb', compresslevel=level, mtime=0) as compressed:
+            shutil.copyfileobj(src, compressed, COMPRESSION_BUFFER_SIZE)
+
+
+class CompressedFileCache:
+    """Variantes compressées des fichiers texte, gardées sur disque et partagées entre workers.
+
+    Comme pour les miniatures, l'entrée est adressée par chemin + taille + date de
+    modification + encodage : un fichier modifié obtient une nouvelle variante et
+    l'ancienne finit évincée (LRU sur la date de modification des variantes).
+    """
+
+    def __init__(self, cache_dir, max_bytes, max_file_size):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self._lock = threading.Lock()
+        self._written_since_eviction = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def cache_path(self, full_path, stat, encoding):
+        key = f"{full_path}\0{stat.st_size}\0{stat.st_mtime_ns}\0{encoding}"
+        digest = hashlib.sha1(key.encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.{encoding}")
+
+    def get(self, full_path, stat, encoding):
+        """Chemin de la variante compressée, créée au besoin ; None si le fichier est trop gros."""
+        if stat.st_size > self.max_file_size:
+            return None
+        cached_path = self.cache_path(full_path, stat, encoding)
+        try:
+            cached = os.stat(cached_path)
+            if time.time() - cached.st_mtime > COMPRESSION_CACHE_TOUCH_INTERVAL:
+                os.utime(cached_path)
+            return cached_path
+        except FileNotFoundError:
+            pass
+
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        # Fichier temporaire puis renommage : un autre worker ne lit jamais une variante incomplète
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cached_path), suffix='.tmp')
+        try:
+            with open(full_path, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                compress_stream(src, dst, encoding, COMPRESSION_CACHED_LEVELS[encoding])
+                written = dst.tell()
+            metrics.count_bytes('read', 'compress', stat.st_size)
+            os.replace(temp_path, cached_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        with self._lock:
+            self._written_since_eviction += written
+            evict = self._written_since_eviction > self.max_bytes // 20
+            if evict:
+                self._written_since_eviction = 0
+        if evict:
+            threading.Thread(target=self.evict, daemon=True).start()
+        return cached_path
+
+    def evict(self):
+        """Supprime les variantes les moins récemment utilisées au-delà de la taille maximale."""
+        with open(os.path.join(self.cache_dir, '.evict.lock'), 'w') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return  # Un autre worker s'en charge déjà
+
+            variants = []
+            total = 0
+            for root, dirs, files in os.walk(self.cache_dir):
+                for name in files:
+                    if name.endswith('.tmp') or name.startswith('.'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    variants.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+
+            target = self.max_bytes * 9 // 10
+            variants.sort()
+            for mtime, size, path in variants:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+compressed_file_cache = CompressedFileCache(COMPRESSION_CACHE_DIR, COMPRESSION_CACHE_MAX_BYTES, COMPRESSION_CACHE_MAX_FILE)
+
+
+def send_file_compressed(full_path, mime_type, transfer_kind=None):
+    """send_file_ranged, en servant la variante compressée en cache quand le client l'accepte.
+
+    Une requête Range porte sur le fichier d'origine : elle est servie sans compression.
+    """
+    if not is_compressible(mime_type):
+        return send_file_ranged(full_path, mime_type, transfer_kind=transfer_kind)
+
+    stat = os.stat(full_path)
+    encoding = negotiate_encoding() if stat.st_size >= COMPRESSION_MIN_SIZE and request.range is None else None
+    cached_path = compressed_file_cache.get(full_path, stat, encoding) if encoding else None
+    if cached_path is None:
+        response = send_file_ranged(full_path, mime_type, transfer_kind=transfer_kind)
+    else:
+        response = send_file_ranged(cached_path, mime_type, content_encoding=encoding, source_stat=stat,
+                                    transfer_kind=transfer_kind)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def send_static_file(filename):
+    """Fichiers de /static (JS, CSS) : variantes compressées en cache, comme /api/view."""
+    full_path = safe_join(app.static_folder, filename)
+    if full_path is None or not os.path.isfile(full_path):
+        return app.send_static_file(filename)  # 404 standard
+    return send_file_compressed(full_path, mimetypes.guess_type(full_path)[0] or 'application/octet-stream')
+
+
+app.view_functions['static'] = send_static_file
+
+
+@app.after_request
+def compress_response(response):
+    """Compresse à la volée les réponses générées (JSON des listings et recherches, pages HTML).
+
+    Les fichiers (direct_passthrough) passent par send_file_compressed et les flux
+    (SSE, NDJSON) ne sont pas compressés : chaque événement doit partir aussitôt.
+    """
+    if (request.method == 'HEAD' or response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed or 'Content-Encoding' in response.headers
+            or response.cache_control.no_transform or not is_compressible(response.mimetype)):
+        return response
+
+    length = response.calculate_content_length()
+    if length is None or length < COMPRESSION_MIN_SIZE or length > COMPRESSION_MAX_DYNAMIC_SIZE:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    compressed = compress_bytes(data, encoding, COMPRESSION_LEVELS[encoding])
+    if len(compressed) >= len(data):
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    # Le corps compressé est une autre représentation : l'ETag ne peut plus être fort
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    metrics.inc('http_compression_bytes_total', len(data), encoding=encoding, stage='in')
+    metrics.inc('http_compression_bytes_total', len(compressed), encoding=encoding, stage='out')
+    return response
+
+
+# --- FICHIERS TEXTE (FENÊTRES DE LIGNES, SUIVI, MODIFICATIONS PARTIELLES) ---
+
+TEXT_LINE_INDEX_BLOCK = 256 * 1024  # Granularité de l'index des lignes (octets)
+TEXT_LINE_INDEX_CACHE_SIZE = 64  # Fichiers dont l'index des lignes est gardé en mémoire (par worker)
+TEXT_WINDOW_MAX_LINES = 10000
+TEXT_WINDOW_MAX_BYTES = 4 * 1024 * 1024
+TEXT_TAIL_POLL_INTERVAL = 0.5
+TEXT_TAIL_MAX_CHUNK = 256 * 1024  # Octets envoyés au plus par événement du suivi
+TEXT_PATCH_MAX_EDITS = 1000
+
+
+class TextPreconditionFailed(Exception):
+    """Le fichier a changé depuis sa lecture par le client (taille ou date de modification)."""
+
+
+class LineIndex:
+    """Nombre de lignes terminées avant chaque bloc de TEXT_LINE_INDEX_BLOCK octets d'un fichier texte.
+
+    Construit en un seul passage de bytes.count (vitesse du disque, même pour
+    des Go de journaux) ; une ligne se retrouve ensuite en relisant un seul bloc.
+    """
+
+    def __init__(self, full_path, stat):
+        self.version = (stat.st_size, stat.st_mtime_ns)
+        self.block_lines = []
+        lines = 0
+        last_byte = b''
+        with open(full_path, 'rb') as f:
+            while True:
+                block = f.read(TEXT_LINE_INDEX_BLOCK)
+                if not block:
+                    break
+                self.block_lines.append(lines)
+                lines += block.count(b'\n')
+                last_byte = block[-1:]
+        metrics.count_bytes('read', 'line_index', stat.st_size)
+        # Dernière ligne sans retour à la ligne final
+        self.total_lines = lines + (1 if last_byte and last_byte != b'\n' else 0)
+
+    def line_offset(self, f, line):
+        """Position en octets du début de la ligne `line` (numérotée à partir de 0)."""
+        if line == 0:
+            return 0
+        # Bloc contenant le retour à la ligne qui termine la ligne précédente
+        block = bisect.bisect_left(self.block_lines, line) - 1
+        f.seek(block * TEXT_LINE_INDEX_BLOCK)
+        data = f.read(TEXT_LINE_INDEX_BLOCK)
+        position = -1
+        for _ in range(line - self.block_lines[block]):
+            position = data.index(b'\n', position + 1)
+        return block * TEXT_LINE_INDEX_BLOCK + position + 1
+
+
+class LineIndexCache:
+    """Index des lignes des derniers fichiers ouverts, valides tant que taille et st_mtime_ns sont inchangés."""
+
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, full_path, stat):
+        version = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            index = self._items.get(full_path)
+            if index is not None and index.version == version:
+                self._items.move_to_end(full_path)
+                return index
+        index = LineIndex(full_path, stat)
+        with self._lock:
+            self._items[full_path] = index
+            self._items.move_to_end(full_path)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return index
+
+
+line_index_cache = LineIndexCache(TEXT_LINE_INDEX_CACHE_SIZE)
+
+
+def file_version(stat):
+    """Identifiant de version d'un fichier, renvoyé tel quel par le client comme précondition d'écriture."""
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def read_line_window(full_path, start, count):
+    """Lignes [start, start + count) : (lignes en octets, octet de début, octet de fin, index des lignes)."""
+    stat = os.stat(full_path)
+    index = line_index_cache.get(full_path, stat)
+    start = min(start, max(0, index.total_lines - 1))
+    with open(full_path, 'rb') as f:
+        byte_start = index.line_offset(f, start)
+        f.seek(byte_start)
+        lines = []
+        size = 0
+        while len(lines) < count and size < TEXT_WINDOW_MAX_BYTES:
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line)
+            size += len(line)
+        byte_end = f.tell()
+    metrics.count_bytes('read', 'text_window', byte_end - byte_start)
+    return stat, start, lines, byte_start, byte_end, index
+
+
+def _copy_range(src_fd, dst_fd, offset, count):
+    """Recopie `count` octets de src (à partir de `offset`) à la position courante de dst."""
+    while count > 0:
+        copied = 0
+        if hasattr(os, 'copy_file_range'):
+            try:
+                copied = os.copy_file_range(src_fd, dst_fd, min(count, COPY_KERNEL_CHUNK), offset)
+            except OSError as e:
+                if e.errno not in COPY_FALLBACK_ERRNOS:
+                    raise
+        if not copied:
+            block = os.pread(src_fd, min(count, COPY_BUFFER_SIZE), offset)
+            if not block:
+                raise OSError(errno.EIO, "Fichier tronqué pendant l'écriture")
+            copied = os.write(dst_fd, block)
+        offset += copied
+        count -= copied
+
+
+def apply_text_patch(full_path, expected_version, edits):
+    """Remplace des plages d'octets du fichier, de façon atomique.
+
+    Le nouveau contenu est écrit dans un fichier temporaire du même dossier
+    (parties inchangées recopiées côté noyau), synchronisé sur disque puis
+    renommé par-dessus l'original : un lecteur voit l'ancienne ou la nouvelle
+    version, jamais un mélange. `expected_version` (voir file_version) doit
+    correspondre au fichier actuel, sinon TextPreconditionFailed.
+    """
+    stat = os.stat(full_path)
+    if file_version(stat) != expected_version:
+        raise TextPreconditionFailed(file_version(stat))
+
+    position = 0
+    for start, end, _ in edits:
+        if start < position or end < start or end > stat.st_size:
+            raise ValueError("Plages de modification invalides (elles doivent être triées, disjointes et dans le fichier).")
+        position = end
+
+    directory, name = os.path.split(full_path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f'.{name}.', suffix='.patch')
+    written = 0
+    try:
+        with open(full_path, 'rb') as src:
+            position = 0
+            for start, end, data in edits:
+                _copy_range(src.fileno(), fd, position, start - position)
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                written += len(data)
+                position = end
+            _copy_range(src.fileno(), fd, position, stat.st_size - position)
+        os.fchmod(fd, stat_module.S_IMODE(stat.st_mode))
+        os.fsync(fd)
+        os.close(fd)
+        fd = None
+        # Dernière vérification juste avant le remplacement (modification concurrente pendant la copie)
+        current = os.stat(full_path)
+        if file_version(current) != expected_version:
+            raise TextPreconditionFailed(file_version(current))
+        os.replace(temp_path, full_path)
+    except BaseException:
+        if fd is not None:
+            os.close(fd)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    # Le renommage n'est durable qu'une fois le dossier lui-même synchronisé
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    metrics.count_bytes('written', 'text_patch', written)
+    return os.stat(full_path)
+
+
+def resolve_text_file(relative_path):
+    """Chemin absolu d'un fichier texte existant, ou (réponse d'erreur, statut)."""
+    if not relative_path:
+        return None, (jsonify({"error": "Chemin du fichier manquant."}), 400)
+    full_path = secure_path_join(BASE_DIR, relative_path)
+    if full_path is None:
+        return None, (jsonify({"error": "Chemin d'accès invalide ou non autorisé."}), 400)
+    if not os.path.isfile(full_path):
+        return None, (jsonify({"error": "Fichier non trouvé."}), 404)
+    return full_path, None
+
+
+@app.route('/api/text/window', methods=['GET'])
+def api_text_window():
+    """Lignes `start` à `start + count` d'un fichier texte, sans lire le fichier en entier.
+
+    Renvoie aussi les octets couverts (byte_start, byte_end) et la version du
+    fichier, à repasser à /api/text/patch pour enregistrer la fenêtre modifiée.
+    """
+    full_path, error = resolve_text_file(request.args.get('path', '').strip('/'))
+    if error:
+        return error
+
+    try:
+        start = max(0, int(request.args.get('start', 0)))
+        count = min(TEXT_WINDOW_MAX_LINES, max(1, int(request.args.get('count', 1000))))
+    except ValueError:
+        return jsonify({"error": "Les paramètres start et count doivent être des entiers."}), 400
+
+    try:
+        stat, start, lines, byte_start, byte_end, index = read_line_window(full_path, start, count)
+    except OSError as e:
+        print(f"Erreur lors de la lecture de {full_path}: {e}")
+        return jsonify({"error": f"Erreur de lecture: {e}"}), 500
+
+    data = b''.join(lines)
+    try:
+        text = data.decode('utf-8')
+        lossy = False
+    except UnicodeDecodeError:
+        # Contenu non UTF-8 : affichable, mais une réécriture le corromprait
+        text = data.decode('utf-8', errors='replace')
+        lossy = True
+
+    return jsonify({
+        "start": start,
+        "count": len(lines),
+        "total_lines": index.total_lines,
+        "text": text,
+        "byte_start": byte_start,
+        "byte_end": byte_end,
+        "size": stat.st_size,
+        "version": file_version(stat),
+        "complete": byte_start == 0 and byte_end == stat.st_size,
+        "lossy": lossy
+    })
+
+
+def iter_text_tail(full_path, offset):
+    """Flux SSE des octets ajoutés en fin de fichier à partir de `offset` (lignes complètes uniquement)."""
+    yield "retry: 2000\n\n"
+    started = last_activity = time.time()
+    while time.time() - started < EVENTS_MAX_DURATION:
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            yield f"event: gone\ndata: {json.dumps({'offset': offset})}\n\n"
+            return
+        if stat.st_size < offset:
+            # Fichier tronqué ou remplacé (rotation de journal) : le client recharge
+            offset = stat.st_size
+            yield f"id: {offset}\nevent: reset\ndata: {json.dumps({'offset': offset, 'version': file_version(stat)})}\n\n"
+            last_activity = time.time()
+        elif stat.st_size > offset:
+            with open(full_path, 'rb') as f:
+                data = os.pread(f.fileno(), min(stat.st_size - offset, TEXT_TAIL_MAX_CHUNK), offset)
+            # Ligne en cours d'écriture gardée pour l'événement suivant (sauf ligne démesurée)
+            cut = data.rfind(b'\n') + 1
+            if cut or len(data) == TEXT_TAIL_MAX_CHUNK:
+                data = data[:cut or len(data)]
+                offset += len(data)
+                metrics.count_bytes('read', 'text_tail', len(data))
+                payload = json.dumps({"text": data.decode('utf-8', errors='replace'), "offset": offset,
+                                      "version": file_version(stat) if offset == stat.st_size else None})
+                yield f"id: {offset}\nevent: append\ndata: {payload}\n\n"
+                last_activity = time.time()
+                continue  # Reste éventuel : envoyé sans attendre
+        if time.time() - last_activity >= EVENTS_HEARTBEAT:
+            yield ": ping\n\n"
+            last_activity = time.time()
+        yield from stream_idle(TEXT_TAIL_POLL_INTERVAL)
+
+
+@app.route('/api/text/tail', methods=['GET'])
+def api_text_tail():
+    """Suit un fichier texte (journal...) : flux SSE des lignes ajoutées après l'octet `offset`.
+
+    Sans `offset`, le suivi part de la fin actuelle du fichier. À la reconnexion,
+    le navigateur renvoie Last-Event-ID, qui est la position atteinte.
+    """
+    full_path, error = resolve_text_file(request.args.get('path', '').strip('/'))
+    if error:
+        return error
+
+    requested = request.headers.get('Last-Event-ID') or request.args.get('offset')
+    try:
+        offset = int(requested) if requested else os.path.getsize(full_path)
+    except ValueError:
+        return jsonify({"error": "Le paramètre offset doit être un entier."}), 400
+
+    return Response(
+        stream_with_context(iter_text_tail(full_path, max(0, offset))),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.route('/api/text/patch', methods=['POST'])
+def api_text_patch():
+    """Enregistre des modifications partielles d'un fichier texte.
+
+    Corps JSON : {path, version, edits: [{start, end, text}]} où start/end sont
+    des positions en octets dans la version lue. Répond 409 si le fichier a été
+    modifié entre-temps, avec sa version actuelle.
+    """
+    data = request.get_json(silent=True) or {}
+    full_path, error = resolve_text_file((data.get('path') or '').strip('/'))
+    if error:
+        return error
+
+    edits = data.get('edits')
+    if not isinstance(edits, list) or not edits or len(edits) > TEXT_PATCH_MAX_EDITS or not data.get('version'):
+        return jsonify({"error": f"Paramètres manquants : version et 1 à {TEXT_PATCH_MAX_EDITS} modification(s) attendues."}), 400
+
+    try:
+        parsed = [(int(edit['start']), int(edit['end']), str(edit.get('text', '')).encode('utf-8')) for edit in edits]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Chaque modification doit contenir start, end (entiers) et text."}), 400
+
+    try:
+        stat = apply_text_patch(full_path, str(data['version']), parsed)
+    except TextPreconditionFailed as e:
+        return jsonify({"error": "Le fichier a été modifié depuis son ouverture.", "version": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except OSError as e:
+        print(f"Erreur lors de l'enregistrement de {full_path}: {e}")
+        return jsonify({"error": f"Erreur d'écriture: {e}"}), 500
+
+    notify_fs_change('created', full_path)
+    return jsonify({"message": "Fichier enregistré.", "version": file_version(stat), "size": stat.st_size})
+
+
+# --- MINIATURES ---
+
+THUMBNAIL_CACHE_DIR = os.path.join(STATE_DIR, 'thumbnails')
+THUMBNAIL_CACHE_MAX_BYTES = int(os.environ.get('FLASK_THUMBNAIL_CACHE_MB', '1024')) * 1024 * 1024
+THUMBNAIL_WORKERS = int(os.environ.get('FLASK_THUMBNAIL_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+THUMBNAIL_SIZES = (64, 256, 1024)  # Tailles servies (côté le plus long, en pixels)
+THUMBNAIL_TIMEOUT = 60  # Attente max d'une génération pour une requête (s)
+THUMBNAIL_PREWARM_MAX = 2000  # Miniatures au plus pré-générées par dossier listé
+THUMBNAIL_TOUCH_INTERVAL = 3600  # Précision de la date d'accès (ordre LRU) des miniatures
+FFMPEG_PATH = os.environ.get('FLASK_FFMPEG') or shutil.which('ffmpeg')
+
+
+class ThumbnailUnavailable(Exception):
+    """Aucune miniature ne peut être produite pour ce fichier."""
+
+
+class ThumbnailService:
+    """Miniatures d'images et de vidéos, générées dans un pool de processus.
+
+    Le cache disque est adressé par le contenu (chemin + taille + date de
+    modification + dimension) : un fichier modifié obtient une nouvelle entrée et
+    l'ancienne finit évincée. L'éviction suit la date de modification des
+    miniatures, rafraîchie à la lecture (LRU), et partage un verrou entre workers.
+    """
+
+    def __init__(self, cache_dir, max_bytes, workers):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._failed = set()
+        self._prewarming = set()
+        self._written_since_eviction = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def available_kinds(self):
+        """Types de fichiers pour lesquels une miniature peut être produite."""
+        kinds = []
+        if thumbnailer.Image is not None:
+            kinds.append('image')
+        if FFMPEG_PATH:
+            kinds.append('video')
+        return kinds
+
+    def kind_for(self, full_path):
+        mime_type = mimetypes.guess_type(full_path)[0] or ''
+        if mime_type.startswith('image/') and mime_type != 'image/svg+xml' and thumbnailer.Image is not None:
+            return 'image'
+        if mime_type.startswith('video/') and FFMPEG_PATH:
+            return 'video'
+        return None
+
+    def cache_path(self, full_path, stat, size):
+        key = f"{to_relative_path(full_path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0{size}"
+        digest = hashlib.sha1(key.encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.jpg")
+
+    def _get_pool(self):
+        # Créé à la première utilisation, donc après le fork des workers gunicorn ; « spawn » :
+        # processus neufs, sans les threads ni les verrous du worker (voir start_background_services)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _submit(self, kind, full_path, thumb_path, size):
+        pool = self._get_pool()
+        with self._lock:
+            future = self._pending.get(thumb_path)
+            if future is None:
+                future = pool.submit(thumbnailer.generate, kind, full_path, thumb_path, size, FFMPEG_PATH)
+                self._pending[thumb_path] = future
+                future.add_done_callback(lambda done: self._on_generated(thumb_path, done))
+            return future
+
+    def _on_generated(self, thumb_path, future):
+        with self._lock:
+            self._pending.pop(thumb_path, None)
+            if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                # Processus fils tué (mémoire...) : le pool est recréé à la prochaine demande
+                self._pool = None
+                return
+            if future.cancelled() or future.exception() is not None:
+                if len(self._failed) > 10000:
+                    self._failed.clear()
+                self._failed.add(thumb_path)
+                return
+            self._written_since_eviction += future.result()
+            evict = self._written_since_eviction > self.max_bytes // 20
+            if evict:
+                self._written_since_eviction = 0
+        if evict:
+            threading.Thread(target=self.evict, daemon=True).start()
+
+    def get(self, full_path, size):
+        """Retourne le chemin de la miniature, en la générant si besoin (bloquant)."""
+        kind = self.kind_for(full_path)
+        if kind is None:
+            raise ThumbnailUnavailable("Aucun aperçu possible pour ce type de fichier.")
+        thumb_path = self.cache_path(full_path, os.stat(full_path), size)
+        try:
+            cached = os.stat(thumb_path)
+            if time.time() - cached.st_mtime > THUMBNAIL_TOUCH_INTERVAL:
+                os.utime(thumb_path)
+            return thumb_path
+        except FileNotFoundError:
+            pass
+        if thumb_path in self._failed:
+            raise ThumbnailUnavailable("La génération de l'aperçu a échoué.")
+        try:
+            self._submit(kind, full_path, thumb_path, size).result(timeout=THUMBNAIL_TIMEOUT)
+        except FutureTimeoutError:
+            raise
+        except Exception as e:
+            print(f"Erreur de génération de miniature pour {full_path}: {e}")
+            raise ThumbnailUnavailable("La génération de l'aperçu a échoué.")
+        return thumb_path
+
+    def prewarm_directory(self, target_dir, size):
+        """Génère en arrière-plan les miniatures manquantes d'un dossier."""
+        with self._lock:
+            if (target_dir, size) in self._prewarming:
+                return
+            self._prewarming.add((target_dir, size))
+        threading.Thread(target=self._prewarm, args=(target_dir, size), daemon=True).start()
+
+    def _prewarm(self, target_dir, size):
+        try:
+            submitted = 0
+            with os.scandir(target_dir) as entries:
+                for entry in entries:
+                    if submitted >= THUMBNAIL_PREWARM_MAX:
+                        break
+                    try:
+                        if not entry.is_file():
+                            continue
+                        kind = self.kind_for(entry.path)
+                        if kind is None:
+                            continue
+                        thumb_path = self.cache_path(entry.path, entry.stat(), size)
+                    except OSError:
+                        continue
+                    if thumb_path in self._failed or os.path.exists(thumb_path):
+                        continue
+                    self._submit(kind, entry.path, thumb_path, size)
+                    submitted += 1
+        except OSError as e:
+            print(f"Erreur lors du pré-calcul des miniatures de {target_dir}: {e}")
+        finally:
+            with self._lock:
+                self._prewarming.discard((target_dir, size))
+
+    def evict(self):
+        """Supprime les miniatures les moins récemment utilisées au-delà de la taille maximale."""
+        with open(os.path.join(self.cache_dir, '.evict.lock'), 'w') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return  # Un autre worker s'en charge déjà
+
+            thumbnails = []
+            total = 0
+            for root, dirs, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith('.jpg'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    thumbnails.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+
+            # Marge de 10 % pour ne pas relancer l'éviction à chaque écriture
+            target = self.max_bytes * 9 // 10
+            thumbnails.sort()
+            for mtime, size, path in thumbnails:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+thumbnail_service = ThumbnailService(THUMBNAIL_CACHE_DIR, THUMBNAIL_CACHE_MAX_BYTES, THUMBNAIL_WORKERS)
+
+
+def thumbnail_size(requested):
+    """Plus petite taille servie couvrant la taille demandée."""
+    for size in THUMBNAIL_SIZES:
+        if requested <= size:
+            return size
+    return THUMBNAIL_SIZES[-1]
+
+
+@app.route('/api/thumbnail', methods=['GET'])
+def api_thumbnail():
+    """Renvoie une miniature JPEG d'une image ou d'une vidéo.
+
+    Paramètres : path, size (côté le plus long, arrondi à une taille servie) et
+    v (version, ex. date de modification du fichier). Avec v, le navigateur garde
+    la miniature une semaine ; sans v, il la revalide à chaque affichage (304).
+    """
+    relative_path = request.args.get('path')
+    if not relative_path:
+        return jsonify({"error": "Chemin du fichier manquant."}), 400
+
+    try:
+        size = thumbnail_size(int(request.args.get('size', THUMBNAIL_SIZES[1])))
+    except ValueError:
+        return jsonify({"error": "Le paramètre size doit être un entier."}), 400
+
+    full_path = secure_path_join(BASE_DIR, relative_path)
+    if full_path is None:
+        return jsonify({"error": "Chemin en dehors du répertoire géré."}), 400
+
+    if not os.path.isfile(full_path):
+        return jsonify({"error": "Fichier non trouvé."}), 404
+
+    try:
+        thumb_path = thumbnail_service.get(full_path, size)
+    except ThumbnailUnavailable as e:
+        return jsonify({"error": str(e)}), 415
+    except FutureTimeoutError:
+        return jsonify({"error": "Génération de l'aperçu trop longue, réessayez plus tard."}), 503
+    except Exception as e:
+        print(f"Erreur lors de la génération de la miniature: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    response = send_file(thumb_path, mimetype='image/jpeg', conditional=True,
+                         max_age=7 * 24 * 3600 if request.args.get('v') else None)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if not request.args.get('v'):
+        response.cache_control.no_cache = True
+    return response
+
+
+# --- REMUX À LA VOLÉE (MP4 FRAGMENTÉ POUR LE LECTEUR) ---
+
+FFPROBE_PATH = os.environ.get('FLASK_FFPROBE') or shutil.which('ffprobe', path=os.path.dirname(FFMPEG_PATH) if FFMPEG_PATH else None) or shutil.which('ffprobe')
+REMUX_CACHE_DIR = os.path.join(STATE_DIR, 'remux')
+REMUX_CACHE_MAX_BYTES = int(os.environ.get('FLASK_REMUX_CACHE_MB', '4096')) * 1024 * 1024
+REMUX_MAX_PROCESSES = int(os.environ.get('FLASK_REMUX_PROCESSES', '2'))  # Processus ffmpeg simultanés, tous workers confondus
+REMUX_SEGMENT_DURATION = 10  # secondes
+REMUX_SEGMENT_OVERLAP = 0.5  # Chaque segment déborde sur le suivant : aucun trou entre deux segments
+# ffmpeg recule un peu la position demandée (images B) : viser juste après l'image clé la fait retenir
+REMUX_SEEK_MARGIN = 0.5
+REMUX_PREFETCH = 2  # Segments suivants préparés en arrière-plan
+REMUX_TIMEOUT = 120  # Production d'un segment (transcodage compris)
+REMUX_SLOT_WAIT = 0.1
+REMUX_TOUCH_INTERVAL = 3600
+REMUX_MODES = ('copy', 'transcode')
+# Formats que les navigateurs ne lisent pas : le lecteur passe par le remux
+REMUX_EXTENSIONS = ('mkv', 'avi', 'flv', 'wmv', 'mpg', 'mpeg', 'ts', 'm2ts', 'vob')
+
+H264_PROFILES = {'Baseline': '42E0', 'Constrained Baseline': '42E0', 'Main': '4D40', 'Extended': '58A0',
+                 'High': '6400', 'High 10': '6E00', 'High 4:2:2': '7A00', 'High 4:4:4 Predictive': 'F400'}
+REMUX_AUDIO_COPY = {'aac': 'mp4a.40.2', 'mp3': 'mp4a.69', 'opus': 'opus', 'flac': 'flac'}
+REMUX_VIDEO_TRANSCODE = (['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '23', '-profile:v', 'high',
+                          '-level:v', '4.1', '-pix_fmt', 'yuv420p'], 'avc1.640029')
+REMUX_AUDIO_TRANSCODE = (['-c:a', 'aac', '-b:a', '160k', '-ac', '2'], 'mp4a.40.2')
+
+
+class RemuxUnavailable(Exception):
+    """Fichier que le remux ne sait pas servir (ffmpeg absent, durée inconnue...)."""
+
+
+def remux_video_codec(stream):
+    """Chaîne codecs (RFC 6381) d'un flux vidéo recopiable tel quel en MP4, None sinon."""
+    level = stream.get('level')
+    if not isinstance(level, int) or level <= 0:
+        return None
+    if stream.get('codec_name') == 'h264' and stream.get('profile') in H264_PROFILES:
+        return f"avc1.{H264_PROFILES[stream['profile']]}{level:02X}"
+    if stream.get('codec_name') == 'hevc':
+        return f"{'hvc1.2.4' if stream.get('profile') == 'Main 10' else 'hvc1.1.6'}.L{level}.B0"
+    return None
+
+
+def remux_plan(probe, mode):
+    """Flux retenus et arguments ffmpeg : recopie quand le codec le permet, transcodage sinon."""
+    streams = probe.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'
+                  and not s.get('disposition', {}).get('attached_pic')), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    if video is None and audio is None:
+        raise RemuxUnavailable("Aucun flux audio ou vidéo lisible.")
+
+    args, codecs, plan = [], [], {"video": None, "audio": None}
+    if video is not None:
+        codec = remux_video_codec(video) if mode == 'copy' else None
+        if codec is not None:
+            args += ['-map', f"0:{video['index']}", '-c:v', 'copy']
+            if video['codec_name'] == 'hevc':
+                args += ['-tag:v', 'hvc1']  # Étiquette attendue par les navigateurs
+            plan["video"] = 'copy'
         else:
-            return jsonify({"error": "Aucun fichier n'a pu être téléversé.", "errors": errors}), 400
+            args += ['-map', f"0:{video['index']}"] + REMUX_VIDEO_TRANSCODE[0]
+            codec = REMUX_VIDEO_TRANSCODE[1]
+            plan["video"] = 'transcode'
+        codecs.append(codec)
+    if audio is not None:
+        codec = REMUX_AUDIO_COPY.get(audio.get('codec_name'))
+        if codec is not None:
+            args += ['-map', f"0:{audio['index']}", '-c:a', 'copy']
+            plan["audio"] = 'copy'
+        else:
+            args += ['-map', f"0:{audio['index']}"] + REMUX_AUDIO_TRANSCODE[0]
+            codec = REMUX_AUDIO_TRANSCODE[1]
+            plan["audio"] = 'transcode'
+        codecs.append(codec)
 
-    except Exception as e:
-        print(f"Erreur lors du téléversement: {e}")
-        return jsonify({"error": str(e)}), 500
+    plan.update(
+        args=args,
+        video_index=video['index'] if video is not None else None,
+        mime=f"{'video' if video is not None else 'audio'}/mp4; codecs=\"{','.join(codecs)}\""
+    )
+    return plan
 
-@app.route('/api/delete', methods=['DELETE'])
-def api_delete():
-    """Supprime un fichier ou un dossier."""
-    data = request.json
-    relative_path = data.get('path')
 
-    if not relative_path:
-        return jsonify({"error": "Chemin de suppression manquant."}), 400
+class RemuxService:
+    """Segments MP4 fragmentés produits par ffmpeg à la demande, autour de la position de lecture.
 
-    full_path_to_delete = secure_path_join(BASE_DIR, relative_path)
+    Chaque segment est un fichier MP4 autonome (en-tête + fragments) couvrant
+    REMUX_SEGMENT_DURATION secondes depuis l'image clé qui précède son début ;
+    le lecteur le place sur la ligne de temps (Media Source Extensions) grâce à
+    cet instant de départ. Le cache disque est partagé entre workers et adressé
+    comme celui des miniatures (chemin + taille + date de modification) ; les
+    processus ffmpeg simultanés sont plafonnés par des verrous de STATE_DIR.
+    """
 
-    if full_path_to_delete is None:
-        return jsonify({"error": "Chemin de suppression en dehors du répertoire géré."}), 400
+    def __init__(self, cache_dir, max_bytes, max_processes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_processes = max_processes
+        self._executor = ThreadPoolExecutor(max_workers=max_processes, thread_name_prefix='remux')
+        self._semaphore = threading.BoundedSemaphore(max_processes)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._written_since_eviction = 0
+        os.makedirs(cache_dir, exist_ok=True)
 
-    try:
-        if not os.path.exists(full_path_to_delete):
-            return jsonify({"error": "Fichier ou dossier non trouvé."}), 404
+    def available(self):
+        return bool(FFMPEG_PATH and FFPROBE_PATH)
 
-        if os.path.isdir(full_path_to_delete):
-            shutil.rmtree(full_path_to_delete)
-            item_type = "Dossier"
-        else:
-            os.remove(full_path_to_delete)
-            item_type = "Fichier"
-            
-        return jsonify({"message": f"{item_type} '{relative_path}' supprimé avec succès."}), 200
-    except OSError as e:
-        print(f"Erreur d'OS lors de la suppression: {e}")
-        return jsonify({"error": f"Erreur de permission ou de système: {e}"}), 500
-    except Exception as e:
-        print(f"Erreur lors de la suppression: {e}")
-        return jsonify({"error": str(e)}), 500
+    def entry_dir(self, full_path, stat):
+        key = f"{to_relative_path(full_path)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        digest = hashlib.sha1(key.encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest)
 
-@app.route('/api/rename', methods=['POST'])
-def api_rename():
-    """Renomme un fichier ou un dossier."""
-    data = request.json
-    old_path = data.get('old_path')
-    new_name = data.get('new_name')
+    def probe(self, full_path, entry_dir):
+        """Flux et durée du fichier (ffprobe ne lit que l'en-tête), gardés dans le cache."""
+        probe_path = os.path.join(entry_dir, 'probe.json')
+        try:
+            with open(probe_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+        result = subprocess.run(
+            [FFPROBE_PATH, '-v', 'error', '-of', 'json', '-show_entries',
+             'format=duration:stream=index,codec_type,codec_name,profile,level:stream_disposition=attached_pic', full_path],
+            stdin=subprocess.DEVNULL, capture_output=True, timeout=30
+        )
+        if result.returncode != 0:
+            raise RemuxUnavailable(f"Fichier illisible par ffprobe: {result.stderr.decode(errors='replace').strip()}")
+        probe = json.loads(result.stdout)
+        os.makedirs(entry_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=entry_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(probe, f)
+        os.replace(temp_path, probe_path)
+        return probe
 
-    if not old_path or not new_name:
-        return jsonify({"error": "Chemin ou nouveau nom manquant."}), 400
+    def info(self, full_path, mode):
+        if not self.available():
+            raise RemuxUnavailable("ffmpeg et ffprobe sont nécessaires à la lecture de ce format.")
+        stat = os.stat(full_path)
+        entry_dir = self.entry_dir(full_path, stat)
+        probe = self.probe(full_path, entry_dir)
+        try:
+            duration = float(probe['format']['duration'])
+        except (KeyError, ValueError):
+            raise RemuxUnavailable("Durée du média inconnue.")
+        plan = remux_plan(probe, mode)
+        plan.update(entry_dir=entry_dir, duration=duration,
+                    segment_count=max(1, int(-(-duration // REMUX_SEGMENT_DURATION))))
+        return plan
 
-    new_name = secure_filename(new_name)
-    if not new_name:
-        return jsonify({"error": "Nouveau nom invalide."}), 400
+    def segment_path(self, entry_dir, mode, index):
+        return os.path.join(entry_dir, f"{mode}-{index}.mp4")
 
-    full_old_path = secure_path_join(BASE_DIR, old_path)
-    
-    if full_old_path is None:
-        return jsonify({"error": "Chemin source en dehors du répertoire géré."}), 400
+    def segment(self, full_path, mode, index):
+        """Chemin et instant de départ (s) du segment `index`, produit au besoin (bloquant).
 
-    parent_dir = os.path.dirname(full_old_path)
-    full_new_path = os.path.join(parent_dir, new_name)
+        Les segments suivants sont lancés en arrière-plan ; ceux anticipés pour une
+        ancienne position de lecture et pas encore commencés sont abandonnés.
+        """
+        info = self.info(full_path, mode)
+        if not 0 <= index < info['segment_count']:
+            raise IndexError(index)
+        wanted = range(index, min(info['segment_count'], index + 1 + REMUX_PREFETCH))
+        with self._lock:
+            for future, entry_dir, pending_mode, pending_index, prefetch in list(self._pending.values()):
+                if prefetch and entry_dir == info['entry_dir'] and pending_mode == mode and pending_index not in wanted:
+                    future.cancel()
+        futures = [self._submit(full_path, info, mode, i, prefetch=i != index) for i in wanted]
 
-    if not full_new_path.startswith(os.path.normpath(BASE_DIR)):
-        return jsonify({"error": "Nouveau chemin en dehors du répertoire géré."}), 400
+        segment_path = self.segment_path(info['entry_dir'], mode, index)
+        source = 'cache'
+        if futures[0] is not None:
+            futures[0].result(timeout=REMUX_TIMEOUT)
+            source = 'ffmpeg'
+        else:
+            try:
+                if time.time() - os.stat(segment_path).st_mtime > REMUX_TOUCH_INTERVAL:
+                    os.utime(segment_path)
+            except FileNotFoundError:
+                pass
+        metrics.inc('remux_segments_total', mode=mode, source=source)
+        with open(f"{segment_path[:-4]}.json") as f:
+            return segment_path, json.load(f)['start']
 
-    try:
-        if not os.path.exists(full_old_path):
-            return jsonify({"error": "Fichier ou dossier non trouvé."}), 404
+    def _submit(self, full_path, info, mode, index, prefetch):
+        segment_path = self.segment_path(info['entry_dir'], mode, index)
+        with self._lock:
+            pending = self._pending.get(segment_path)
+            if pending is not None and not pending[0].cancelled():
+                # Un segment attendu par une requête n'est plus abandonnable
+                pending[4] = pending[4] and prefetch
+                return pending[0]
+            if os.path.exists(segment_path):
+                return None
+            future = self._executor.submit(self._produce, full_path, info, mode, index)
+            self._pending[segment_path] = [future, info['entry_dir'], mode, index, prefetch]
+        future.add_done_callback(lambda done: self._on_produced(segment_path, done))
+        return future
 
-        if os.path.exists(full_new_path):
-            return jsonify({"error": f"Un fichier ou dossier nommé '{new_name}' existe déjà."}), 409
+    def _on_produced(self, segment_path, future):
+        with self._lock:
+            if self._pending.get(segment_path, (None,))[0] is future:
+                del self._pending[segment_path]
+            if future.cancelled() or future.exception() is not None:
+                return
+            self._written_since_eviction += future.result()
+            evict = self._written_since_eviction > self.max_bytes // 20
+            if evict:
+                self._written_since_eviction = 0
+        if evict:
+            threading.Thread(target=self.evict, daemon=True).start()
 
-        os.rename(full_old_path, full_new_path)
-        
-        item_type = "Dossier" if os.path.isdir(full_new_path) else "Fichier"
-        return jsonify({"message": f"{item_type} renommé en '{new_name}' avec succès."}), 200
-        
-    except OSError as e:
-        print(f"Erreur d'OS lors du renommage: {e}")
-        return jsonify({"error": f"Erreur de permission ou de système: {e}"}), 500
-    except Exception as e:
-        print(f"Erreur lors du renommage: {e}")
-        return jsonify({"error": str(e)}), 500
+    @contextmanager
+    def _process_slot(self):
+        """Une des REMUX_MAX_PROCESSES places partagées entre workers (verrous flock)."""
+        if fcntl is None:
+            with self._semaphore:
+                yield
+            return
+        while True:
+            for slot in range(self.max_processes):
+                lock_file = open(os.path.join(self.cache_dir, f'.slot-{slot}.lock'), 'w')
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    lock_file.close()
+                    continue
+                try:
+                    yield
+                finally:
+                    lock_file.close()
+                return
+            time.sleep(REMUX_SLOT_WAIT)
 
-@app.route('/api/download', methods=['GET'])
-def api_download():
-    """Sert un fichier pour téléchargement."""
-    relative_path = request.args.get('path')
+    def _keyframe_before(self, full_path, video_index, position):
+        """Instant de l'image clé où reprend la lecture du fichier pour `position`."""
+        result = subprocess.run(
+            [FFPROBE_PATH, '-v', 'error', '-read_intervals', f'{position:.3f}%+#1', '-select_streams', str(video_index),
+             '-show_entries', 'packet=pts_time', '-of', 'csv=p=0', full_path],
+            stdin=subprocess.DEVNULL, capture_output=True, timeout=30
+        )
+        try:
+            return min(float(result.stdout.split()[0]), position)
+        except (IndexError, ValueError):
+            return position
 
-    if not relative_path or relative_path.endswith('/'):
-        return jsonify({"error": "Requête de téléchargement invalide (le chemin doit être un fichier)."}), 400
+    def _produce(self, full_path, info, mode, index):
+        segment_path = self.segment_path(info['entry_dir'], mode, index)
+        start = index * REMUX_SEGMENT_DURATION
+        end = min(info['duration'], start + REMUX_SEGMENT_DURATION + REMUX_SEGMENT_OVERLAP)
+        command = [FFMPEG_PATH, '-v', 'error', '-nostdin', '-y']
 
-    directory = os.path.dirname(relative_path)
-    filename = os.path.basename(relative_path)
+        with self._process_slot():
+            if os.path.exists(segment_path):  # Produit par un autre worker pendant l'attente
+                return 0
+            if index > 0:
+                if info['video_index'] is not None:
+                    start = self._keyframe_before(full_path, info['video_index'], start)
+                # Sans -accurate_seek, tous les flux démarrent à l'image clé, même transcodés
+                seek = start + REMUX_SEEK_MARGIN if info['video_index'] is not None else start
+                command += ['-noaccurate_seek', '-ss', f'{seek:.3f}', '-i', full_path, '-t', f'{end - seek:.3f}']
+            else:
+                command += ['-i', full_path, '-t', f'{end:.3f}']
+            command += info['args'] + ['-sn', '-dn', '-map_metadata', '-1', '-f', 'mp4',
+                                       '-movflags', 'frag_keyframe+empty_moov+default_base_moof']
 
-    full_directory = secure_path_join(BASE_DIR, directory)
+            fd, temp_path = tempfile.mkstemp(dir=info['entry_dir'], suffix='.tmp')
+            os.close(fd)
+            try:
+                result = subprocess.run(command + [temp_path], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.PIPE, timeout=REMUX_TIMEOUT)
+                if result.returncode != 0 or os.path.getsize(temp_path) == 0:
+                    raise RuntimeError(f"ffmpeg a échoué: {result.stderr.decode(errors='replace').strip()[-500:]}")
+                # L'instant de départ d'abord : un segment présent a toujours le sien
+                with open(f"{segment_path[:-4]}.json", 'w') as f:
+                    json.dump({"start": start}, f)
+                size = os.path.getsize(temp_path)
+                metrics.count_bytes('written', 'remux', size)
+                os.replace(temp_path, segment_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        return size
 
-    if full_directory is None:
-        return jsonify({"error": "Chemin de téléchargement en dehors du répertoire géré."}), 400
+    def evict(self):
+        """Supprime les segments les moins récemment lus au-delà de la taille maximale."""
+        with open(os.path.join(self.cache_dir, '.evict.lock'), 'w') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return  # Un autre worker s'en charge déjà
 
-    try:
-        return send_from_directory(full_directory, filename, as_attachment=True)
-    except FileNotFoundError:
-        return jsonify({"error": "Fichier non trouvé."}), 404
-    except Exception as e:
-        print(f"Erreur lors du téléchargement: {e}")
-        return jsonify({"error": str(e)}), 500
+            segments = []
+            total = 0
+            for root, dirs, files in os.walk(self.cache_dir):
+                for name in files:
+                    if not name.endswith('.mp4'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    segments.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
 
-@app.route('/api/view', methods=['GET'])
-def api_view():
-    """Renvoie un fichier pour qu'il soit visualisé directement dans le navigateur."""
-    relative_path = request.args.get('path')
+            target = self.max_bytes * 9 // 10
+            segments.sort()
+            for mtime, size, path in segments:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
 
-    if not relative_path or relative_path.endswith('/'):
-        return jsonify({"error": "Requête de visualisation invalide (le chemin doit être un fichier)."}), 400
 
-    full_path_to_file = secure_path_join(BASE_DIR, relative_path)
+remux_service = RemuxService(REMUX_CACHE_DIR, REMUX_CACHE_MAX_BYTES, REMUX_MAX_PROCESSES)
 
-    if full_path_to_file is None:
-        return jsonify({"error": "Chemin de visualisation en dehors du répertoire géré."}), 400
 
-    if not os.path.exists(full_path_to_file) or os.path.isdir(full_path_to_file):
-        return jsonify({"error": "Fichier non trouvé."}), 404
+def resolve_remux_request():
+    """Fichier et mode d'une requête /api/remux/* : (chemin complet, mode) ou réponse d'erreur."""
+    relative_path = request.args.get('path')
+    if not relative_path:
+        return None, (jsonify({"error": "Chemin du fichier manquant."}), 400)
+    mode = request.args.get('mode', 'copy')
+    if mode not in REMUX_MODES:
+        return None, (jsonify({"error": f"Mode invalide (valeurs possibles : {', '.join(REMUX_MODES)})."}), 400)
+    full_path = secure_path_join(BASE_DIR, relative_path)
+    if full_path is None:
+        return None, (jsonify({"error": "Chemin en dehors du répertoire géré."}), 400)
+    if not os.path.isfile(full_path):
+        return None, (jsonify({"error": "Fichier non trouvé."}), 404)
+    return (full_path, mode), None
+
 
+@app.route('/api/remux/info', methods=['GET'])
+def api_remux_info():
+    """Durée, découpage en segments et type MIME (codecs) du flux remuxé.
+
+    mode=copy (défaut) recopie les flux dont le codec le permet ; mode=transcode
+    réencode toujours la vidéo en H.264, quand le navigateur ne sait pas décoder l'original.
+    """
+    target, error = resolve_remux_request()
+    if error:
+        return error
+    full_path, mode = target
     try:
-        mime_type = mimetypes.guess_type(full_path_to_file)[0] or 'application/octet-stream'
-        
-        if mime_type.startswith('text/') or mime_type == 'application/json' or relative_path.endswith(('.py', '.js', '.html', '.css', '.log', '.xml', '.md', '.yml', '.yaml', '.sh', '.bat')):
-            mime_type = 'text/plain; charset=utf-8'
-        
-        return send_file(full_path_to_file, mimetype=mime_type, as_attachment=False)
+        info = remux_service.info(full_path, mode)
+    except RemuxUnavailable as e:
+        return jsonify({"error": str(e)}), 415
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        print(f"Erreur lors de l'analyse du média {full_path}: {e}")
+        return jsonify({"error": str(e)}), 500
+    return jsonify({
+        "mode": mode,
+        "duration": info['duration'],
+        "segment_duration": REMUX_SEGMENT_DURATION,
+        "segment_count": info['segment_count'],
+        "mime": info['mime'],
+        "video": info['video'],
+        "audio": info['audio']
+    })
+
 
+@app.route('/api/remux/segment', methods=['GET'])
+def api_remux_segment():
+    """Segment MP4 fragmenté n° index ; l'en-tête X-Segment-Start donne sa position (s)."""
+    target, error = resolve_remux_request()
+    if error:
+        return error
+    full_path, mode = target
+    try:
+        index = int(request.args.get('index', 0))
+        segment_path, start = remux_service.segment(full_path, mode, index)
+    except (ValueError, IndexError):
+        return jsonify({"error": "Numéro de segment invalide."}), 400
+    except RemuxUnavailable as e:
+        return jsonify({"error": str(e)}), 415
+    except FutureTimeoutError:
+        return jsonify({"error": "Préparation du segment trop longue, réessayez plus tard."}), 503
     except Exception as e:
-        print(f"Erreur lors de la visualisation: {e}")
+        print(f"Erreur lors du remux de {full_path} (segment {request.args.get('index')}): {e}")
         return jsonify({"error": str(e)}), 500
-        
+
+    response = send_file_ranged(segment_path, 'video/mp4', transfer_kind='view')
+    response.headers['X-Segment-Start'] = f'{start:.3f}'
+    return response
+
 
 @app.route('/api/move', methods=['POST'])
 def api_move():
-    """Déplace un fichier ou un dossier vers un nouveau dossier."""
+    """Déplace un fichier ou un dossier vers un nouveau dossier.
+
+    Avec "async": true, le déplacement est confié à une tâche de fond et la
+    réponse (202) contient son `job_id`.
+    """
     data = request.json
     source_path = data.get('source_path')
     destination_folder = data.get('destination_folder')
@@ -427,8 +5176,14 @@ def api_move():
     if os.path.exists(full_destination_path):
         return jsonify({"error": f"Un élément nommé '{item_name}' existe déjà dans le dossier de destination."}), 409
 
+    if data.get('async'):
+        job_id = job_manager.submit('move', f"Déplacement de '{source_path}' vers '{destination_folder or '/'}'",
+                                    run_move_job, full_source_path, full_destination_path)
+        return jsonify({"message": "Déplacement lancé.", "job_id": job_id}), 202
+
     try:
         shutil.move(full_source_path, full_destination_path)
+        notify_fs_change('moved', full_source_path, full_destination_path)
         
         item_type = "Dossier" if os.path.isdir(full_destination_path) else "Fichier"
         return jsonify({"message": f"{item_type} déplacé avec succès."}), 200
@@ -439,10 +5194,432 @@ def api_move():
     except Exception as e:
         print(f"Erreur lors du déplacement: {e}")
         return jsonify({"error": str(e)}), 500
-        
+
+
+def copy_destination_name(folder, item_name):
+    """Nom libre pour une copie dans le dossier de la source : 'nom (copie).ext', 'nom (copie 2).ext'..."""
+    stem, ext = os.path.splitext(item_name)
+    if ext == item_name or not stem:
+        stem, ext = item_name, ''
+    candidate = f"{stem} (copie){ext}"
+    counter = 2
+    while os.path.lexists(os.path.join(folder, candidate)):
+        candidate = f"{stem} (copie {counter}){ext}"
+        counter += 1
+    return candidate
+
+
+@app.route('/api/copy', methods=['POST'])
+def api_copy():
+    """Copie un fichier ou un dossier dans un dossier, entièrement côté serveur.
+
+    Copier dans le dossier de la source crée 'nom (copie)'. Avec "async": true,
+    la copie est confiée à une tâche de fond et la réponse (202) contient son `job_id`.
+    """
+    data = request.json
+    source_path = data.get('source_path')
+    destination_folder = data.get('destination_folder')
+
+    if not source_path or destination_folder is None:
+        return jsonify({"error": "Chemin source ou dossier de destination manquant."}), 400
+
+    full_source_path = secure_path_join(BASE_DIR, source_path)
+    full_destination_folder = secure_path_join(BASE_DIR, destination_folder.strip('/'))
+
+    if full_source_path is None or full_destination_folder is None:
+        return jsonify({"error": "Chemin source ou destination en dehors du répertoire géré."}), 400
+
+    if full_source_path == BASE_DIR or not os.path.exists(full_source_path):
+        return jsonify({"error": "Fichier ou dossier source non trouvé."}), 404
+
+    if not os.path.isdir(full_destination_folder):
+        return jsonify({"error": "La destination doit être un dossier existant."}), 400
+
+    # Vérifier qu'on ne copie pas un dossier dans lui-même (copie sans fin)
+    if os.path.isdir(full_source_path) and (full_destination_folder == full_source_path or
+                                            full_destination_folder.startswith(full_source_path + os.sep)):
+        return jsonify({"error": "Impossible de copier un dossier dans lui-même."}), 400
+
+    item_name = os.path.basename(full_source_path)
+    if os.path.dirname(full_source_path) == full_destination_folder:
+        item_name = copy_destination_name(full_destination_folder, item_name)
+    full_destination_path = os.path.join(full_destination_folder, item_name)
+
+    if os.path.lexists(full_destination_path):
+        return jsonify({"error": f"Un élément nommé '{item_name}' existe déjà dans le dossier de destination."}), 409
+
+    if data.get('async'):
+        job_id = job_manager.submit('copy', f"Copie de '{source_path}' vers '{destination_folder or '/'}'",
+                                    run_copy_job, full_source_path, full_destination_path)
+        return jsonify({"message": "Copie lancée.", "job_id": job_id, "name": item_name}), 202
+
+    try:
+        if os.path.isdir(full_source_path) and not os.path.islink(full_source_path):
+            shutil.copytree(full_source_path, full_destination_path, symlinks=True, copy_function=fast_copy_file)
+            item_type = "Dossier"
+        else:
+            if os.path.islink(full_source_path):
+                os.symlink(os.readlink(full_source_path), full_destination_path)
+            else:
+                fast_copy_file(full_source_path, full_destination_path)
+            item_type = "Fichier"
+    except OSError as e:
+        remove_partial_copy(full_destination_path)
+        print(f"Erreur d'OS lors de la copie: {e}")
+        return jsonify({"error": f"Erreur de permission ou de système: {e}"}), 500
+    except Exception as e:
+        remove_partial_copy(full_destination_path)
+        print(f"Erreur lors de la copie: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    notify_fs_change('created', full_destination_path)
+    return jsonify({"message": f"{item_type} copié avec succès.", "name": item_name}), 200
+
+# --- OPÉRATIONS GROUPÉES (SÉLECTION MULTIPLE) ---
+
+BATCH_MAX_OPERATIONS = 2000
+BATCH_OPERATIONS = ('move', 'rename', 'delete')
+# Préfixe des éléments mis de côté par une suppression transactionnelle (masqués des listings)
+BATCH_TRASH_PREFIX = '.batch-trash-'
+
+
+class BatchOperationError(Exception):
+    """Opération d'un lot refusée ; le message est destiné au client."""
+
+
+class _BatchView:
+    """État du disque tel qu'il sera après les opérations déjà validées du lot (rien n'est modifié)."""
+
+    def __init__(self):
+        self._moves = []  # [(ancien chemin, nouveau chemin ou None si supprimé)]
+
+    def _resolve(self, path):
+        """Chemin actuel de l'élément qui se trouvera à `path`, ou None s'il aura disparu."""
+        for old, new in reversed(self._moves):
+            if new is not None and (path == new or path.startswith(new + os.sep)):
+                path = old + path[len(new):]
+            elif path == old or path.startswith(old + os.sep):
+                return None
+        return path
+
+    def exists(self, path):
+        current = self._resolve(path)
+        return current is not None and os.path.lexists(current)
+
+    def isdir(self, path):
+        current = self._resolve(path)
+        return current is not None and os.path.isdir(current)
+
+    def record(self, old, new=None):
+        self._moves.append((old, new))
+
+
+def plan_batch_operation(operation, view):
+    """Valide une opération du lot (après celles déjà enregistrées dans `view`) et retourne (type, source, cible)."""
+    if not isinstance(operation, dict):
+        raise BatchOperationError("Opération invalide.")
+    kind = operation.get('op')
+
+    if kind == 'delete':
+        relative_path = operation.get('path')
+        if not relative_path:
+            raise BatchOperationError("Chemin de suppression manquant.")
+        full_source = secure_path_join(BASE_DIR, relative_path.strip('/'))
+        if full_source is None:
+            raise BatchOperationError("Chemin de suppression en dehors du répertoire géré.")
+        full_target = None
+    elif kind == 'move':
+        source_path = operation.get('source_path')
+        destination_folder = operation.get('destination_folder')
+        if not source_path or destination_folder is None:
+            raise BatchOperationError("Chemin source ou dossier de destination manquant.")
+        full_source = secure_path_join(BASE_DIR, source_path.strip('/'))
+        full_folder = secure_path_join(BASE_DIR, destination_folder.strip('/'))
+        if full_source is None or full_folder is None:
+            raise BatchOperationError("Chemin source ou destination en dehors du répertoire géré.")
+        if not view.isdir(full_folder):
+            raise BatchOperationError("La destination doit être un dossier existant.")
+        if os.path.dirname(full_source) == full_folder:
+            raise BatchOperationError("L'élément est déjà dans ce dossier.")
+        if full_folder == full_source or full_folder.startswith(full_source + os.sep):
+            raise BatchOperationError("Impossible de déplacer un dossier dans lui-même.")
+        full_target = os.path.join(full_folder, os.path.basename(full_source))
+    elif kind == 'rename':
+        old_path = operation.get('old_path')
+        new_name = secure_filename(operation.get('new_name') or '')
+        if not old_path or not new_name:
+            raise BatchOperationError("Chemin ou nouveau nom manquant ou invalide.")
+        full_source = secure_path_join(BASE_DIR, old_path.strip('/'))
+        if full_source is None:
+            raise BatchOperationError("Chemin source en dehors du répertoire géré.")
+        full_target = os.path.join(os.path.dirname(full_source), new_name)
+    else:
+        raise BatchOperationError(f"Opération inconnue (valeurs possibles : {', '.join(BATCH_OPERATIONS)}).")
+
+    if full_source == os.path.normpath(BASE_DIR):
+        raise BatchOperationError("Impossible de modifier la racine.")
+    if not view.exists(full_source):
+        raise BatchOperationError("Fichier ou dossier non trouvé.")
+    if full_target is not None and view.exists(full_target):
+        raise BatchOperationError(f"Un élément nommé '{os.path.basename(full_target)}' existe déjà dans le dossier de destination.")
+
+    view.record(full_source, full_target)
+    return kind, full_source, full_target
+
+
+def _batch_rename(source, target):
+    """Renommage, ou déplacement par copie si la cible est sur un autre système de fichiers."""
+    try:
+        os.rename(source, target)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(source, target)
+
+
+def _remove_path(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def run_batch(plan, results, transactional, job=None):
+    """Exécute dans l'ordre les opérations validées [(index, type, source, cible)] et complète `results`.
+
+    En mode transactionnel, une suppression commence par mettre l'élément de
+    côté (renommage dans son dossier) : au premier échec, les opérations déjà
+    faites sont défaites dans l'ordre inverse et rien n'est supprimé.
+    Retourne True si le lot a été annulé par ce retour arrière.
+    """
+    undo = []     # [(chemin actuel, chemin d'origine)] des opérations faites
+    trash = []    # [(élément mis de côté, chemin d'origine)]
+    changes = []  # modifications à répercuter sur les index et caches
+    failed = False
+    try:
+        for index, kind, source, target in plan:
+            if job is not None:
+                job.check_cancelled()
+            try:
+                if kind == 'delete' and transactional:
+                    staged = os.path.join(os.path.dirname(source), f"{BATCH_TRASH_PREFIX}{uuid.uuid4().hex[:12]}")
+                    os.rename(source, staged)
+                    undo.append((staged, source))
+                    trash.append((staged, source))
+                elif kind == 'delete':
+                    _remove_path(source)
+                    changes.append(('deleted', source, None))
+                else:
+                    _batch_rename(source, target)
+                    undo.append((target, source))
+                    changes.append(('moved', source, target))
+                results[index]['status'] = 'ok'
+            except OSError as e:
+                print(f"Erreur lors de l'opération groupée ({kind} {source}): {e}")
+                results[index].update(status='error', error=f"Erreur de permission ou de système: {e}")
+                if transactional:
+                    failed = True
+                    break
+            if job is not None:
+                job.advance(files=1)
+    except JobCancelled:
+        failed = transactional
+        raise
+    finally:
+        if failed:
+            _rollback_batch(undo, results)
+            changes = []
+        else:
+            for staged, source in trash:
+                try:
+                    _remove_path(staged)
+                except OSError as e:
+                    print(f"Erreur lors de la suppression de {staged}: {e}")
+                changes.append(('deleted', source, None))
+        for result in results:
+            if result['status'] == 'pending':
+                result['status'] = 'skipped'
+        notify_fs_changes(changes)
+    return failed
+
+
+def _rollback_batch(undo, results):
+    """Défait les opérations d'un lot transactionnel, de la dernière à la première."""
+    for current, original in reversed(undo):
+        try:
+            _batch_rename(current, original)
+        except OSError as e:
+            # Élément laissé à sa nouvelle place : index et caches doivent le voir
+            print(f"Erreur lors de l'annulation ({current} -> {original}): {e}")
+            notify_fs_change('moved', original, current)
+    for result in results:
+        if result['status'] == 'ok':
+            result['status'] = 'rolled_back'
+
+
+def batch_summary(results, rolled_back):
+    succeeded = sum(1 for result in results if result['status'] == 'ok')
+    failed = sum(1 for result in results if result['status'] == 'error')
+    if rolled_back:
+        return f"Échec d'une opération : les {len(results)} opération(s) du lot ont été annulées."
+    message = f"{succeeded} opération(s) effectuée(s) avec succès"
+    return message + (f" ({failed} erreur(s))" if failed else "")
+
+
+def run_batch_job(job, plan, results, transactional):
+    job.set_totals(len(plan), None)
+    try:
+        rolled_back = run_batch(plan, results, transactional, job)
+    finally:
+        job.set_result(results)
+    if rolled_back:
+        raise RuntimeError(batch_summary(results, rolled_back))
+    return batch_summary(results, rolled_back)
+
+
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    """Applique une liste d'opérations sur plusieurs éléments en une seule requête.
+
+    Corps : {"operations": [{"op": "move", "source_path", "destination_folder"},
+    {"op": "rename", "old_path", "new_name"}, {"op": "delete", "path"}],
+    "transactional": false, "async": false}. Toutes les opérations sont
+    validées avant la première modification, chacune en tenant compte des
+    précédentes ; `results` donne le statut de chacune (ok, error, skipped,
+    rolled_back). En mode transactionnel, une opération invalide ou en échec
+    annule tout le lot. Avec "async": true, la réponse (202) contient le
+    `job_id` d'une tâche de fond dont le `result` reprend `results`.
+    """
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "Liste d'opérations manquante."}), 400
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return jsonify({"error": f"Trop d'opérations dans un même lot (maximum {BATCH_MAX_OPERATIONS})."}), 400
+
+    transactional = bool(data.get('transactional'))
+    view = _BatchView()
+    plan = []
+    results = []
+    for index, operation in enumerate(operations):
+        kind = operation.get('op') if isinstance(operation, dict) else None
+        try:
+            kind, full_source, full_target = plan_batch_operation(operation, view)
+        except BatchOperationError as e:
+            path = (operation.get('path') or operation.get('source_path') or operation.get('old_path')) if isinstance(operation, dict) else None
+            results.append({"index": index, "op": kind, "path": path, "status": "error", "error": str(e)})
+            continue
+        plan.append((index, kind, full_source, full_target))
+        results.append({"index": index, "op": kind, "path": to_relative_path(full_source), "status": "pending"})
+
+    invalid = len(operations) - len(plan)
+    if invalid and (transactional or not plan):
+        for result in results:
+            if result['status'] == 'pending':
+                result['status'] = 'skipped'
+        return jsonify({"error": f"{invalid} opération(s) invalide(s) : aucune modification effectuée.", "results": results}), 400
+
+    if data.get('async'):
+        job_id = job_manager.submit('batch', f"Lot de {len(plan)} opération(s)", run_batch_job, plan, results, transactional)
+        return jsonify({"message": "Opérations lancées.", "job_id": job_id}), 202
+
+    rolled_back = run_batch(plan, results, transactional)
+    summary = batch_summary(results, rolled_back)
+    if rolled_back or not any(result['status'] == 'ok' for result in results):
+        return jsonify({"error": summary, "results": results, "rolled_back": rolled_back}), 500
+    return jsonify({"message": summary, "results": results, "rolled_back": False}), 200
+
+
+# --- ARCHIVES ZIP EN FLUX ---
+
+# Formats déjà compressés : stockés tels quels (recompresser ne gagne rien et coûte du CPU)
+ZIP_STORED_EXTENSIONS = {
+    '.mp4', '.mkv', '.avi', '.mov', '.webm', '.m4v', '.flv', '.wmv',
+    '.mp3', '.flac', '.ogg', '.opus', '.m4a', '.aac',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic',
+    '.zip', '.gz', '.bz2', '.xz', '.zst', '.7z', '.rar',
+}
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+
+class _ZipStreamBuffer:
+    """Sortie non « seekable » pour zipfile : les octets écrits sont récupérés par le générateur."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip_stream(folder_path):
+    """Génère une archive ZIP d'un dossier au fil de l'eau.
+
+    La sortie n'étant pas « seekable », zipfile écrit des data descriptors
+    (et des en-têtes ZIP64 pour les gros fichiers) : aucun fichier temporaire,
+    mémoire constante, premier octet envoyé immédiatement.
+    """
+    buffer = _ZipStreamBuffer()
+    arc_root = os.path.dirname(folder_path)
+
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zipf:
+        for root, dirs, files in os.walk(folder_path):
+            metrics.count_fs('walk_entries', len(dirs) + len(files))
+            for file in files:
+                file_path = os.path.join(root, file)
+                arcname = os.path.relpath(file_path, arc_root)
+                try:
+                    zinfo = zipfile.ZipInfo.from_file(file_path, arcname, strict_timestamps=False)
+                    if os.path.splitext(file)[1].lower() in ZIP_STORED_EXTENSIONS:
+                        zinfo.compress_type = zipfile.ZIP_STORED
+                    else:
+                        zinfo.compress_type = zipfile.ZIP_DEFLATED
+                    with open(file_path, 'rb') as src, zipf.open(zinfo, 'w') as dest:
+                        while True:
+                            chunk = src.read(ZIP_CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            metrics.count_bytes('read', 'zip', len(chunk))
+                            dest.write(chunk)
+                            yield buffer.take()
+                except OSError as e:
+                    # Les en-têtes HTTP sont déjà partis : on ignore le fichier illisible
+                    print(f"Fichier ignoré dans l'archive {arcname}: {e}")
+                    continue
+                yield buffer.take()
+
+    # Répertoire central
+    yield buffer.take()
+
+
+def attachment_headers(filename):
+    """En-tête Content-Disposition pour un téléchargement, construit comme send_file de werkzeug.
+
+    Guillemets et barres obliques inverses sont échappés ; un nom non ASCII est
+    envoyé dans filename* avec une approximation ASCII dans filename.
+    """
+    try:
+        filename.encode('ascii')
+        names = {"filename": filename}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        names = {"filename": simple, "filename*": f"UTF-8''{quote(filename, safe='!#$&+^`|')}"}
+    return {"Content-Disposition": dump_options_header('attachment', names)}
+
+
 @app.route('/api/download_folder', methods=['GET'])
 def api_download_folder():
-    """Crée une archive ZIP d'un dossier et l'envoie en téléchargement."""
+    """Envoie une archive ZIP d'un dossier, générée à la volée pendant le téléchargement."""
     relative_path = request.args.get('path')
 
     if not relative_path:
@@ -459,43 +5636,23 @@ def api_download_folder():
     if not os.path.isdir(full_path):
         return jsonify({"error": "Le chemin spécifié n'est pas un dossier."}), 400
 
+    # Opération lourde : attend une place libre, puis son débit est réparti comme les autres transferts
+    try:
+        stream = transfer_scheduler.open('archive')
+    except TransferBusy as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": str(TRANSFER_HEAVY_WAIT)}
+
     try:
-        import tempfile
-        import zipfile
-        
-        # Créer un fichier temporaire pour l'archive
-        temp_zip = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
-        temp_zip.close()
-        
         folder_name = os.path.basename(full_path) or 'root'
-        
-        # Créer l'archive ZIP
-        with zipfile.ZipFile(temp_zip.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(full_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, os.path.dirname(full_path))
-                    zipf.write(file_path, arcname)
-        
-        # Envoyer le fichier et le supprimer après
-        response = send_file(
-            temp_zip.name,
+
+        return Response(
+            _ScheduledBody(stream_with_context(iter_zip_stream(full_path)), stream),
             mimetype='application/zip',
-            as_attachment=True,
-            download_name=f'{folder_name}.zip'
+            headers=attachment_headers(f'{folder_name}.zip')
         )
         
-        # Supprimer le fichier temporaire après l'envoi
-        @response.call_on_close
-        def cleanup():
-            try:
-                os.unlink(temp_zip.name)
-            except Exception as e:
-                print(f"Erreur lors de la suppression du fichier temporaire: {e}")
-        
-        return response
-        
     except Exception as e:
+        stream.close()
         print(f"Erreur lors de la création de l'archive: {e}")
         return jsonify({"error": f"Erreur lors de la création de l'archive: {str(e)}"}), 500
         
@@ -533,11 +5690,18 @@ def media_player():
     }
     
     actual_mime = mime_map.get(extension, mime_type)
-    media_url = f"/api/view?path={relative_path}"
+    # Chemins encodés dans les URL (&, #, ?...), puis échappés pour les attributs HTML
+    media_url = html.escape(f"/api/view?path={quote(relative_path)}")
+    download_url = html.escape(f"/api/download?path={quote(relative_path)}")
+    title = html.escape(filename)
+    # Formats non lus par les navigateurs : remux à la volée si ffmpeg est disponible
+    remux_available = remux_service.available()
+    use_remux = remux_available and extension in REMUX_EXTENSIONS
+    source_tag = "" if use_remux else f'<source src="{media_url}" type="{actual_mime}">'
+    script_path = json.dumps(relative_path).replace('<', '\\u003c')  # Littéral JS, sans fermer la balise <script>
     
     warning_message = ""
-    unsupported_formats = ['mkv', 'avi', 'flv', 'wmv']
-    if extension in unsupported_formats:
+    if extension in REMUX_EXTENSIONS and not remux_available:
         warning_message = f"""
         <div class="bg-yellow-900/50 border border-yellow-600 text-yellow-200 px-4 py-3 rounded-lg mb-4 max-w-4xl">
             <div class="flex items-start">
@@ -559,18 +5723,17 @@ def media_player():
     <head>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Lecteur Média: {filename}</title>
-        <script src="https://cdn.tailwindcss.com"></script>
-        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.2/css/all.min.css" crossorigin="anonymous" referrerpolicy="no-referrer" />
+        <title>Lecteur Média: {title}</title>
+        {vendor_stylesheets()}
     </head>
     <body class="bg-gray-900 min-h-screen flex flex-col items-center justify-center p-4">
         <div class="w-full max-w-4xl">
-            <h1 class="text-xl font-bold text-white mb-4 text-center break-words">{filename}</h1>
+            <h1 class="text-xl font-bold text-white mb-4 text-center break-words">{title}</h1>
             
             {warning_message}
             
             <{tag} controls class="w-full shadow-2xl rounded-lg overflow-hidden bg-black" {"autoplay" if tag == 'video' else ""} preload="metadata">
-                <source src="{media_url}" type="{actual_mime}">
+                {source_tag}
                 <p class="text-white p-4">
                     Votre navigateur ne supporte pas la lecture de ce format.
                     <br>Veuillez télécharger le fichier ci-dessous.
@@ -578,7 +5741,7 @@ def media_player():
             </{tag}>
             
             <div class="flex justify-center gap-4 mt-6">
-                <a href="/api/download?path={relative_path}" 
+                <a href="{download_url}" 
                    class="flex items-center gap-2 px-6 py-3 bg-blue-600 text-white rounded-lg hover:bg-blue-700 transition duration-150 font-semibold shadow-lg">
                     <i class="fas fa-download"></i>
                     <span>Télécharger le fichier</span>
@@ -598,34 +5761,79 @@ def media_player():
             </div>
         </div>
         
+        <script src="{url_for('static', filename='js/remuxPlayer.js')}"></script>
         <script>
             const mediaElement = document.querySelector('{tag}');
+            const mediaPath = {script_path};
+            let remuxStarted = false;
+            
+            // Lecture par segments remuxés (formats non natifs, ou repli si le navigateur échoue)
+            function startRemux() {{
+                remuxStarted = true;
+                remuxPlayer.attach(mediaElement, mediaPath)
+                    .then(() => {{ if (mediaElement.autoplay) mediaElement.play().catch(() => {{}}); }})
+                    .catch(error => showError(error.message));
+            }}
+            
             if (mediaElement) {{
+                mediaElement.addEventListener('remuxerror', (e) => showError(e.detail.message));
+                if ({'true' if use_remux else 'false'}) {{
+                    startRemux();
+                }}
                 mediaElement.addEventListener('error', function(e) {{
+                    if (!remuxStarted && {'true' if remux_available else 'false'} && window.MediaSource) {{
+                        startRemux();
+                        return;
+                    }}
                     console.error('Erreur de lecture média:', e);
-                    const errorDiv = document.createElement('div');
-                    errorDiv.className = 'bg-red-900/50 border border-red-600 text-red-200 px-4 py-3 rounded-lg mt-4';
-                    errorDiv.innerHTML = `
-                        <div class="flex items-start">
-                            <i class="fas fa-times-circle text-red-400 mr-3 mt-1"></i>
-                            <div>
-                                <p class="font-bold">Impossible de lire ce fichier</p>
-                                <p class="text-sm mt-1">
-                                    Le navigateur ne peut pas décoder ce format vidéo.
-                                    <br>Utilisez le bouton "Télécharger" et ouvrez le fichier avec VLC ou un autre lecteur.
-                                </p>
-                            </div>
-                        </div>
-                    `;
-                    mediaElement.parentElement.insertBefore(errorDiv, mediaElement.nextSibling);
+                    showError();
                 }});
             }}
+            
+            function showError(detail) {{
+                const errorDiv = document.createElement('div');
+                errorDiv.className = 'bg-red-900/50 border border-red-600 text-red-200 px-4 py-3 rounded-lg mt-4';
+                errorDiv.innerHTML = `
+                    <div class="flex items-start">
+                        <i class="fas fa-times-circle text-red-400 mr-3 mt-1"></i>
+                        <div>
+                            <p class="font-bold">Impossible de lire ce fichier</p>
+                            <p class="text-sm mt-1">
+                                Le navigateur ne peut pas décoder ce format vidéo.
+                                <br>Utilisez le bouton "Télécharger" et ouvrez le fichier avec VLC ou un autre lecteur.
+                            </p>
+                            <p class="text-xs mt-1 opacity-75"></p>
+                        </div>
+                    </div>
+                `;
+                if (detail) errorDiv.querySelector('p.text-xs').textContent = detail;
+                mediaElement.parentElement.insertBefore(errorDiv, mediaElement.nextSibling);
+            }}
         </script>
     </body>
     </html>
     """
     return html_content
 
+def start_background_services():
+    """Démarre les threads d'arrière-plan du processus qui sert les requêtes."""
+    metrics.start()
+    # La synchronisation alimente le journal des modifications et le cache des listings
+    if search_index is not None:
+        search_index.start_background_sync(SEARCH_INDEX_RESYNC_INTERVAL)
+    if fs_watcher is not None:
+        fs_watcher.start()
+    if content_index is not None and content_index.available:
+        content_index.start_background_worker()
+    transfer_scheduler.start()
+
+
+# Lancé par `python server.py`, ce fichier est aussi le module principal : les processus « spawn »
+# des pools (miniatures, empreintes) le réimportent sous le nom « __mp_main__ » avant d'exécuter
+# leur tâche. Ils n'ont besoin que de thumbnailer.py / hasher.py, pas des services du serveur.
+if __name__ != '__mp_main__':
+    start_background_services()
+
 if __name__ == '__main__':
     print("\n" + "="*60)
     print("        SERVEUR DE GESTION DE FICHIERS")
@@ -46,6 +46,7 @@ const app = {
         const params = new URLSearchParams(window.location.search);
         const initialPath = params.get('path') || ROOT_PATH;
         navigation.navigateToFolder(initialPath);
+        liveUpdates.init();
         
         // Gestion du bouton retour Android
         window.history.pushState(null, '', window.location.href);
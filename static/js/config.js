@@ -4,6 +4,17 @@
 
 const API_BASE = '/api';
 const ROOT_PATH = '/';
+const LIST_PAGE_SIZE = 500; // Nombre d'éléments chargés par page dans la liste
+const UPLOAD_CHUNKED_THRESHOLD = 8 * 1024 * 1024; // Au-delà, téléversement par morceaux
+const UPLOAD_MAX_RETRIES = 5; // Tentatives par morceau avant abandon
+const UPLOAD_PARALLEL_REQUESTS = 4; // Requêtes de téléversement simultanées
+const UPLOAD_BATCH_MAX_FILES = 50; // Petits fichiers par requête multipart
+const UPLOAD_BATCH_MAX_BYTES = 32 * 1024 * 1024;
+const UPLOAD_FAILED_NAMES_SHOWN = 5; // Fichiers en échec nommés dans la notification
+const THUMBNAIL_LIST_SIZE = 64; // Miniatures de la liste (affichées en 32px, écrans haute densité)
+const THUMBNAIL_PREVIEW_SIZE = 1024; // Aperçu dans la visionneuse flottante
+const SEARCH_STREAM_LIMIT = 2000; // Résultats au plus pour une recherche par nom (affichés au fil de l'eau)
+const TEXT_WINDOW_LINES = 5000; // Lignes chargées à la fois dans l'éditeur de texte
 
 // État global de l'application
 const state = {
@@ -14,6 +25,10 @@ const state = {
     sortDirection: 'asc',
     isSearchMode: false,
     lastSearchQuery: '',
+    searchInContent: false, // Recherche dans le contenu des fichiers texte plutôt que dans les noms
+    listNextOffset: null,
+    listTotal: 0,
+    thumbnailKinds: [], // Types de miniatures que le serveur sait produire ('image', 'video')
     navigationHistory: [ROOT_PATH],
     historyIndex: 0
 };
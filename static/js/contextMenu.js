@@ -65,6 +65,14 @@ const contextMenu = {
             `;
         }
         // -------------------------------------------------------------
+
+        // Sélection multiple (équivalent du Ctrl/Cmd + clic, utile sur mobile)
+        const isSelected = selection.has(file.path);
+        const selectButtonHtml = `
+            <button onclick="selection.toggle('${safeName}', '${safePath}', ${file.isFolder})" class="flex items-center w-full px-3 py-2 text-sm text-slate-700 hover:bg-blue-50 transition duration-150">
+                <i class="fas ${isSelected ? 'fa-minus-square' : 'fa-check-square'} mr-2 w-4"></i> ${isSelected ? 'Retirer de la sélection' : 'Sélectionner'}
+            </button>
+        `;
         
         if (file.isFolder) {
             html += `
@@ -80,6 +88,13 @@ const contextMenu = {
                 <button onclick="moveActions.openMoveModal('${safeName}', '${safePath}', true)" class="flex items-center w-full px-3 py-2 text-sm text-slate-700 hover:bg-blue-50 transition duration-150">
                     <i class="fas fa-arrows-alt mr-2 w-4"></i> Déplacer
                 </button>
+                <button onclick="moveActions.openCopyModal('${safeName}', '${safePath}', true)" class="flex items-center w-full px-3 py-2 text-sm text-slate-700 hover:bg-blue-50 transition duration-150">
+                    <i class="fas fa-copy mr-2 w-4"></i> Copier
+                </button>
+                <button onclick="duplicates.find('${safePath}')" class="flex items-center w-full px-3 py-2 text-sm text-slate-700 hover:bg-blue-50 transition duration-150">
+                    <i class="fas fa-clone mr-2 w-4"></i> Rechercher les doublons
+                </button>
+                ${selectButtonHtml}
                 
                 ${parentButtonHtml}
                 
@@ -134,6 +149,10 @@ const contextMenu = {
                 <button onclick="moveActions.openMoveModal('${safeName}', '${safePath}', false)" class="flex items-center w-full px-3 py-2 text-sm text-slate-700 hover:bg-blue-50 transition duration-150">
                     <i class="fas fa-arrows-alt mr-2 w-4"></i> Déplacer
                 </button>
+                <button onclick="moveActions.openCopyModal('${safeName}', '${safePath}', false)" class="flex items-center w-full px-3 py-2 text-sm text-slate-700 hover:bg-blue-50 transition duration-150">
+                    <i class="fas fa-copy mr-2 w-4"></i> Copier
+                </button>
+                ${selectButtonHtml}
                 
                 ${parentButtonHtml}
                 
@@ -0,0 +1,97 @@
+// ============================================
+// duplicates.js - Recherche et suppression des fichiers en double
+// ============================================
+
+const duplicates = {
+    async find(path) {
+        contextMenu.hide();
+        try {
+            const response = await fetch(API_BASE + '/duplicates', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ path })
+            });
+
+            const result = await response.json();
+
+            if (!response.ok) {
+                throw new Error(result.error || 'Erreur inconnue lors de la recherche de doublons.');
+            }
+
+            const job = await jobs.track(result.job_id, `Doublons dans ${path === '/' ? 'Racine' : path.split('/').pop()}`);
+
+            if (job.status === 'done') {
+                duplicates.showResults(job.result, job.message);
+            } else if (job.status === 'cancelled') {
+                notifications.show(job.message, 'info');
+            } else {
+                throw new Error(job.error || 'Erreur inconnue lors de la recherche de doublons.');
+            }
+        } catch (error) {
+            console.error('Erreur lors de la recherche de doublons:', error);
+            notifications.show(`Échec de la recherche de doublons: ${error.message}`, 'error');
+        }
+    },
+
+    // Chaque groupe garde son premier fichier (le plus ancien) ; les copies sont cochées pour suppression
+    showResults(result, message) {
+        if (!result.groups.length) {
+            notifications.show(message, 'info');
+            return;
+        }
+
+        const groupsHtml = result.groups.map(group => {
+            const inodes = new Set();
+            const rows = group.files.map(file => {
+                // Un lien physique vers un inode déjà listé ne libère aucune place
+                const isCopy = inodes.size > 0 && !inodes.has(file.inode);
+                inodes.add(file.inode);
+                return `
+                    <label class="flex items-center gap-2 py-0.5 text-xs text-slate-700 hover:bg-slate-50 rounded">
+                        <input type="checkbox" class="duplicate-checkbox" value="${file.path.replace(/"/g, '&quot;')}" ${isCopy ? 'checked' : ''}>
+                        <span class="font-mono truncate" title="${file.path.replace(/"/g, '&quot;')}">${file.path}</span>
+                        <span class="text-slate-400 flex-shrink-0 ml-auto">${new Date(file.modified).toLocaleDateString()}</span>
+                    </label>
+                `;
+            }).join('');
+            return `
+                <div class="border border-slate-200 rounded-lg p-2">
+                    <p class="text-xs font-semibold text-slate-500 mb-1">
+                        ${group.files.length} × ${utils.formatBytes(group.size)} — ${utils.formatBytes(group.wasted)} récupérables
+                    </p>
+                    ${rows}
+                </div>
+            `;
+        }).join('');
+
+        const truncated = result.group_count > result.groups.length
+            ? `<p class="text-xs text-slate-500">Seuls les ${result.groups.length} groupes les plus volumineux sont affichés.</p>`
+            : '';
+
+        const content = `
+            <div class="space-y-3">
+                <p class="text-sm text-slate-700">${message}</p>
+                ${truncated}
+                <div class="space-y-2 max-h-96 overflow-y-auto">${groupsHtml}</div>
+                <div class="flex justify-end space-x-3 pt-2">
+                    <button type="button" onclick="modal.close()" class="px-4 py-2 text-sm text-slate-700 border border-slate-300 rounded-lg hover:bg-slate-100 transition">Fermer</button>
+                    <button type="button" onclick="duplicates.deleteChecked()" class="px-4 py-2 text-sm bg-red-600 text-white rounded-lg font-semibold hover:bg-red-700 transition">Supprimer les éléments cochés</button>
+                </div>
+            </div>
+        `;
+        modal.open('Fichiers en double', content);
+    },
+
+    async deleteChecked() {
+        const paths = [...document.querySelectorAll('.duplicate-checkbox:checked')].map(input => input.value);
+        if (paths.length === 0) {
+            notifications.show('Aucun fichier coché.', 'warning');
+            return;
+        }
+        modal.close();
+        const operations = paths.map(path => ({ op: 'delete', path }));
+        await selection.run(operations, `Suppression de ${operations.length} doublon(s)`, 'de la suppression');
+    }
+};
@@ -134,17 +134,26 @@ const fileActions = {
                 headers: {
                     'Content-Type': 'application/json'
                 },
-                body: JSON.stringify({ path: path })
+                body: JSON.stringify({ path: path, async: true })
             });
 
             const result = await response.json();
 
-            if (response.ok) {
-                notifications.show(result.message, 'success');
-                navigation.navigateToFolder(state.currentPath);
-            } else {
+            if (!response.ok) {
                 throw new Error(result.error || "Erreur inconnue lors de la suppression.");
             }
+
+            // La suppression s'exécute en tâche de fond : on suit sa progression
+            const job = await jobs.track(result.job_id, `Suppression de ${path.split('/').pop()}`);
+            navigation.refreshAfterChange();
+
+            if (job.status === 'done') {
+                notifications.show(job.message, 'success');
+            } else if (job.status === 'cancelled') {
+                notifications.show(job.message, 'info');
+            } else {
+                throw new Error(job.error || "Erreur inconnue lors de la suppression.");
+            }
         } catch (error) {
             console.error("Erreur de suppression:", error);
             notifications.show(`Échec de la suppression: ${error.message}`, 'error');
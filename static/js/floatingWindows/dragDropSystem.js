@@ -10,7 +10,7 @@ export const dragDropSystem = {
         const content = viewer.querySelector('.viewer-content');
         
         try {
-            const response = await fetch(`${API_BASE}/list?path=${encodeURIComponent(folderPath)}`);
+            const response = await fetch(`${API_BASE}/list?path=${encodeURIComponent(folderPath)}&thumbnails=${THUMBNAIL_LIST_SIZE}`);
             const data = await response.json();
             
             console.log('API Response:', data);
@@ -79,7 +79,13 @@ export const dragDropSystem = {
                 
                 const mimeType = file.mime_type || file.mimeType || file.type || '';
                 const fileSize = file.size || 0;
-                const icon = this.getFileIconForViewer(fileName);
+                const fileIcon = this.getFileIconForViewer(fileName);
+                // Miniature si le serveur sait la produire, l'icône reprend sa place en cas d'échec
+                const icon = utils.hasThumbnail(mimeType, data.thumbnail_kinds || [])
+                    ? '<img src="' + utils.getThumbnailUrl(fullPath, THUMBNAIL_LIST_SIZE, file.modified) + '" alt="" loading="lazy" ' +
+                      'style="width: 20px; height: 20px; object-fit: cover; border-radius: 3px;" ' +
+                      'data-icon="' + fileIcon.replace(/"/g, '&quot;') + '" onerror="this.outerHTML = this.dataset.icon">'
+                    : fileIcon;
                 
                 html += '<div class="folder-item" ';
                 html += 'draggable="true" ';
@@ -387,7 +393,7 @@ export const dragDropSystem = {
                 
                 if (typeof navigation !== 'undefined' && typeof state !== 'undefined') {
                     if (state.currentPath === itemParentPath || state.currentPath === targetFolderPath) {
-                        navigation.navigateToFolder(state.currentPath);
+                        navigation.refreshAfterChange();
                     }
                 }
                 
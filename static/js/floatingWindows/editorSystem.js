@@ -57,19 +57,16 @@ export const editorSystem = {
         const textarea = document.getElementById(editorId + '-textarea');
         
         try {
-            const response = await fetch(utils.buildApiUrl('view', filePath));
-            
-            if (!response.ok) {
-                throw new Error('Impossible de charger le fichier');
-            }
-            
-            const content = await response.text();
-            windowData.originalContent = content;
-            textarea.value = content;
+            // Gros fichier : seule la première fenêtre de lignes est chargée (voir textEditor pour la navigation)
+            const data = await textFiles.loadWindow(filePath);
+            textFiles.applyWindow(windowData, data);
+            textarea.value = data.text;
             textarea.placeholder = '';
+            textarea.readOnly = data.lossy;
             
             this.updateEditorStats(editorId);
-            this.updateEditorStatus(editorId, 'Prêt', 'success');
+            const label = textFiles.describeWindow(windowData);
+            this.updateEditorStatus(editorId, data.lossy ? 'Lecture seule (encodage non UTF-8)' : (label || 'Prêt'), data.lossy ? 'warning' : 'success');
             textarea.focus();
             
         } catch (error) {
@@ -201,43 +198,19 @@ export const editorSystem = {
             saveBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i>';
             this.updateEditorStatus(editorId, 'Enregistrement en cours...', 'info');
             
-            const blob = new Blob([textarea.value], { type: 'text/plain' });
-            const file = new File([blob], windowData.filename, { type: 'text/plain' });
-            
-            const formData = new FormData();
-            formData.append('files', file);
-            
-            const pathParts = windowData.filePath.split('/');
-            pathParts.pop();
-            const parentPath = '/' + pathParts.join('/');
-            
-            formData.append('path', parentPath);
-            
-            const response = await fetch(API_BASE + '/upload', {
-                method: 'POST',
-                body: formData
-            });
+            await textFiles.save(windowData, textarea.value);
+            this.updateEditorSaveButton(editorId);
+            this.updateEditorStatus(editorId, 'Enregistré', 'success');
             
-            const result = await response.json();
+            if (typeof notifications !== 'undefined') {
+                notifications.show('✅ Fichier enregistré avec succès', 'success');
+            }
             
-            if (response.ok) {
-                windowData.originalContent = textarea.value;
-                windowData.isModified = false;
-                this.updateEditorSaveButton(editorId);
-                this.updateEditorStatus(editorId, 'Enregistré', 'success');
-                
-                if (typeof notifications !== 'undefined') {
-                    notifications.show('✅ Fichier enregistré avec succès', 'success');
-                }
-                
-                if (typeof navigation !== 'undefined' && typeof state !== 'undefined') {
-                    const currentDir = windowData.filePath.substring(0, windowData.filePath.lastIndexOf('/')) || '/';
-                    if (state.currentPath === currentDir) {
-                        navigation.navigateToFolder(state.currentPath);
-                    }
+            if (typeof navigation !== 'undefined' && typeof state !== 'undefined') {
+                const currentDir = windowData.filePath.substring(0, windowData.filePath.lastIndexOf('/')) || '/';
+                if (state.currentPath === currentDir) {
+                    navigation.refreshAfterChange();
                 }
-            } else {
-                throw new Error(result.error || 'Erreur lors de l\'enregistrement');
             }
             
         } catch (error) {
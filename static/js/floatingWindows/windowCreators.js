@@ -133,6 +133,17 @@ export const windowCreators = {
         return viewerId;
     },
     
+    // Aperçu réduit servi par le serveur ; l'original n'est chargé qu'au zoom.
+    // Les GIF gardent l'original (animation), les SVG n'ont pas de miniature.
+    _imagePreviewUrl(filename, imageUrl) {
+        const extension = filename.split('.').pop().toLowerCase();
+        if (!imageUrl.includes('/view?') || ['gif', 'svg'].includes(extension)) return imageUrl;
+        const url = new URL(imageUrl, window.location.origin);
+        url.pathname = url.pathname.replace(/\/view$/, '/thumbnail');
+        url.searchParams.append('size', THUMBNAIL_PREVIEW_SIZE);
+        return url.toString();
+    },
+    
     // Templates HTML
     _buildImageViewerHTML(viewerId, filename, imageUrl) {
         return `
@@ -160,7 +171,9 @@ export const windowCreators = {
                 </div>
             </div>
             <div class="viewer-content viewer-content-image">
-                <img src="${imageUrl}" alt="${filename}" onclick="floatingViewer.toggleImageZoom(this)">
+                <img src="${this._imagePreviewUrl(filename, imageUrl)}" data-full-src="${imageUrl}" alt="${filename}"
+                     onerror="if (this.src !== this.dataset.fullSrc) this.src = this.dataset.fullSrc"
+                     onclick="floatingViewer.toggleImageZoom(this)">
             </div>
             <div class="viewer-footer">
                 <button onclick="event.stopPropagation(); floatingViewer.downloadFromViewer('${imageUrl}', '${filename}')" class="download-btn">
@@ -127,6 +127,10 @@ export const windowManagement = {
         
         if (img.style.maxWidth === '100%' || !img.dataset.zoomed) {
             img.dataset.zoomed = 'true';
+            // Zoom : on remplace l'aperçu par l'image originale
+            if (img.dataset.fullSrc && img.src !== img.dataset.fullSrc) {
+                img.src = img.dataset.fullSrc;
+            }
             img.style.maxWidth = 'none';
             img.style.maxHeight = 'none';
             img.style.width = 'auto';
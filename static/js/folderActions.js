@@ -50,7 +50,7 @@ const folderActions = {
 
             if (response.ok) {
                 notifications.show(result.message, 'success');
-                navigation.navigateToFolder(state.currentPath);
+                navigation.refreshAfterChange();
             } else {
                 throw new Error(result.error || "Erreur inconnue lors de la création du dossier.");
             }
@@ -138,7 +138,7 @@ const folderActions = {
 
             if (response.ok) {
                 notifications.show(result.message, 'success');
-                navigation.navigateToFolder(state.currentPath);
+                navigation.refreshAfterChange();
             } else {
                 throw new Error(result.error || "Erreur inconnue lors du renommage.");
             }
@@ -0,0 +1,86 @@
+// ============================================
+// jobs.js - Suivi des tâches de fond (déplacement, suppression, copie)
+// ============================================
+
+const jobs = {
+    pollInterval: 700,
+
+    // Suit une tâche jusqu'à sa fin en affichant une notification de progression.
+    // Retourne l'état final de la tâche.
+    async track(jobId, label) {
+        const toast = jobs.createProgressToast(jobId, label);
+
+        try {
+            while (true) {
+                const response = await fetch(`${API_BASE}/jobs/${jobId}`);
+                const job = await response.json();
+
+                if (!response.ok) {
+                    throw new Error(job.error || `Erreur HTTP: ${response.status}`);
+                }
+
+                jobs.updateProgressToast(toast, job);
+
+                if (!['queued', 'running'].includes(job.status)) {
+                    return job;
+                }
+
+                await new Promise(resolve => setTimeout(resolve, jobs.pollInterval));
+            }
+        } finally {
+            toast.classList.add('opacity-0');
+            setTimeout(() => toast.remove(), 300);
+        }
+    },
+
+    async cancel(jobId) {
+        try {
+            const response = await fetch(`${API_BASE}/jobs/${jobId}/cancel`, { method: 'POST' });
+            const result = await response.json();
+            if (!response.ok) throw new Error(result.error || "Impossible d'annuler la tâche.");
+            notifications.show(result.message, 'info');
+        } catch (error) {
+            notifications.show(error.message, 'warning');
+        }
+    },
+
+    createProgressToast(jobId, label) {
+        const toast = document.createElement('div');
+        toast.className = 'p-4 rounded-lg shadow-xl border bg-blue-100 border-blue-400 transition-opacity duration-300 max-w-md w-80';
+        toast.innerHTML = `
+            <div class="flex items-center justify-between gap-3">
+                <span class="text-sm font-medium text-slate-700 truncate">
+                    <i class="fas fa-spinner fa-spin text-blue-500 mr-2"></i>${label}
+                </span>
+                <button type="button" class="text-xs text-red-600 hover:text-red-700 font-medium flex-shrink-0"
+                        onclick="jobs.cancel('${jobId}')">
+                    <i class="fas fa-times mr-1"></i>Annuler
+                </button>
+            </div>
+            <div class="w-full h-2 bg-slate-200 rounded-full overflow-hidden mt-2">
+                <div class="job-progress-bar h-full bg-blue-600 rounded-full transition-all duration-300" style="width: 0%"></div>
+            </div>
+            <p class="job-progress-text text-xs text-slate-500 mt-1">En attente...</p>
+        `;
+        dom.notificationContainer.appendChild(toast);
+        return toast;
+    },
+
+    updateProgressToast(toast, job) {
+        const bar = toast.querySelector('.job-progress-bar');
+        const text = toast.querySelector('.job-progress-text');
+
+        let percent = 0;
+        if (job.bytes_total) {
+            percent = Math.round((job.bytes_done / job.bytes_total) * 100);
+        } else if (job.files_total) {
+            percent = Math.round((job.files_done / job.files_total) * 100);
+        }
+        bar.style.width = `${Math.min(100, percent)}%`;
+
+        const counts = job.files_total
+            ? ` ${job.files_done}/${job.files_total} fichier(s), ${utils.formatBytes(job.bytes_done)} / ${utils.formatBytes(job.bytes_total)}`
+            : '';
+        text.textContent = `${job.status === 'queued' ? 'En attente...' : (job.message || 'En cours...')}${counts}`;
+    }
+};
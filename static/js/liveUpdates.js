@@ -0,0 +1,52 @@
+// ============================================
+// liveUpdates.js - Mises à jour en direct (Server-Sent Events)
+// ============================================
+
+const liveUpdates = {
+    source: null,
+    connected: false,
+    pendingDirs: new Set(),
+    pendingRescan: false,
+    refreshTimer: null,
+    refreshDelay: 300, // Regroupe les rafales d'événements (copie de nombreux fichiers...)
+
+    init() {
+        if (typeof EventSource === 'undefined') return;
+
+        // EventSource se reconnecte seul (fin de flux, coupure réseau) en renvoyant Last-Event-ID
+        liveUpdates.source = new EventSource(`${API_BASE}/events`);
+        liveUpdates.source.onopen = () => { liveUpdates.connected = true; };
+        liveUpdates.source.onerror = () => { liveUpdates.connected = false; };
+        liveUpdates.source.addEventListener('change', (event) => {
+            const data = JSON.parse(event.data);
+            data.dirs.forEach(dir => liveUpdates.pendingDirs.add(dir));
+            liveUpdates.pendingRescan = liveUpdates.pendingRescan || data.rescan;
+            clearTimeout(liveUpdates.refreshTimer);
+            liveUpdates.refreshTimer = setTimeout(liveUpdates.applyPending, liveUpdates.refreshDelay);
+        });
+    },
+
+    normalize(path) {
+        return '/' + (path || '').replace(/^\/+|\/+$/g, '');
+    },
+
+    // Rafraîchit uniquement les vues dont le dossier a changé
+    applyPending() {
+        const dirs = liveUpdates.pendingDirs;
+        const rescan = liveUpdates.pendingRescan;
+        liveUpdates.pendingDirs = new Set();
+        liveUpdates.pendingRescan = false;
+
+        const isAffected = (path) => rescan || dirs.has(liveUpdates.normalize(path));
+
+        if (!state.isSearchMode && isAffected(state.currentPath)) {
+            navigation.refresh();
+        }
+
+        if (window.floatingViewer) {
+            floatingViewer.activeWindows
+                .filter(w => w.type === 'folder' && isAffected(w.folderPath))
+                .forEach(w => floatingViewer.loadFolderContent(w.id, w.folderPath));
+        }
+    }
+};
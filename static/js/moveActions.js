@@ -1,21 +1,34 @@
 // ============================================
-// moveActions.js - Actions de déplacement (VERSION OPTIMISÉE)
+// moveActions.js - Actions de déplacement et de copie (VERSION OPTIMISÉE)
 // ============================================
 
 const moveActions = {
     currentSourcePath: null,
+    currentSourcePaths: null, // Sélection multiple : déplacée en une seule requête groupée
+    currentMode: 'move',
+    TREE_DEPTH: 2,
+    treeCache: new Map(), // chemin -> sous-dossiers déjà reçus (vidé à chaque ouverture)
     
-    async openMoveModal(name, path, isFolder) {
+    // La copie réutilise la même fenêtre de choix du dossier de destination
+    openCopyModal(name, path, isFolder) {
+        return moveActions.openMoveModal(name, path, isFolder, 'copy');
+    },
+
+    async openMoveModal(name, path, isFolder, mode = 'move', paths = null) {
         contextMenu.hide();
-        const title = `Déplacer ${isFolder ? 'le dossier' : 'le fichier'}`;
+        const verb = mode === 'copy' ? 'Copier' : 'Déplacer';
+        const title = paths ? `${verb} la sélection` : `${verb} ${isFolder ? 'le dossier' : 'le fichier'}`;
         
         moveActions.currentSourcePath = path;
+        moveActions.currentSourcePaths = paths ? paths.map(p => '/' + p.replace(/^\/+/, '')) : null;
+        moveActions.currentMode = mode;
+        moveActions.treeCache.clear();
         
         const content = `
             <form id="move-form" class="space-y-4">
                 <div>
                     <p class="text-sm text-slate-700 mb-2">
-                        <strong>Élément à déplacer :</strong> ${name}
+                        <strong>Élément à ${mode === 'copy' ? 'copier' : 'déplacer'} :</strong> ${name}
                     </p>
                     <label for="destination-folder" class="block text-sm font-medium text-slate-700 mb-2">
                         Sélectionner le dossier de destination :
@@ -45,7 +58,7 @@ const moveActions = {
                 <input type="hidden" id="move-is-folder" value="${isFolder}">
                 <div class="flex justify-end space-x-3 pt-2">
                     <button type="button" onclick="modal.close()" class="px-4 py-2 text-sm text-slate-700 border border-slate-300 rounded-lg hover:bg-slate-100 transition">Annuler</button>
-                    <button type="submit" class="px-4 py-2 text-sm bg-blue-600 text-white rounded-lg font-semibold hover:bg-blue-700 transition">Déplacer</button>
+                    <button type="submit" class="px-4 py-2 text-sm bg-blue-600 text-white rounded-lg font-semibold hover:bg-blue-700 transition">${verb}</button>
                 </div>
             </form>
         `;
@@ -62,15 +75,7 @@ const moveActions = {
         if (!container) return;
         
         try {
-            const url = utils.buildApiUrl('list', path);
-            const response = await fetch(url);
-            
-            if (!response.ok) {
-                throw new Error(`Erreur HTTP: ${response.status}`);
-            }
-            
-            const data = await response.json();
-            const folders = data.files.filter(f => f.is_folder);
+            const folders = await moveActions.fetchFolders(path);
             
             // Si c'est le premier chargement (racine)
             if (depth === 0) {
@@ -78,18 +83,7 @@ const moveActions = {
                 moveActions.renderFolderItem(container, '/', 'Racine', folders.length > 0, 0, true);
             }
             
-            // Ajouter les sous-dossiers
-            folders.forEach(folder => {
-                const folderPath = '/' + folder.full_relative_path;
-                
-                // Ne pas afficher le dossier source (on ne peut pas déplacer dans soi-même)
-                if (folderPath === moveActions.currentSourcePath) return;
-                
-                // Ne pas afficher les sous-dossiers du dossier source
-                if (folderPath.startsWith(moveActions.currentSourcePath + '/')) return;
-                
-                moveActions.renderFolderItem(container, folderPath, folder.name, true, depth + 1);
-            });
+            moveActions.renderFolders(container, folders, depth);
             
         } catch (error) {
             console.error("Erreur lors du chargement des dossiers:", error);
@@ -102,6 +96,48 @@ const moveActions = {
         }
     },
 
+    // Sous-dossiers d'un chemin : l'API /tree renvoie deux niveaux d'un coup,
+    // le second est gardé en cache pour que le dépliage suivant soit immédiat
+    async fetchFolders(path) {
+        const cached = moveActions.treeCache.get(path);
+        if (cached) return cached;
+        
+        const url = new URL(utils.buildApiUrl('tree', path));
+        url.searchParams.append('depth', moveActions.TREE_DEPTH);
+        const response = await fetch(url);
+        
+        if (!response.ok) {
+            throw new Error(`Erreur HTTP: ${response.status}`);
+        }
+        
+        const data = await response.json();
+        moveActions.cacheFolders(path, data.folders);
+        return data.folders;
+    },
+
+    cacheFolders(path, folders) {
+        moveActions.treeCache.set(path, folders);
+        folders.forEach(folder => {
+            if (folder.children) moveActions.cacheFolders('/' + folder.path, folder.children);
+        });
+    },
+
+    renderFolders(container, folders, depth) {
+        folders.forEach(folder => {
+            const folderPath = '/' + folder.path;
+            
+            // Ne pas afficher le dossier source ni ses sous-dossiers (on ne peut pas déplacer dans soi-même)
+            if (moveActions.isExcluded(folderPath)) return;
+            
+            moveActions.renderFolderItem(container, folderPath, folder.name, folder.has_children, depth + 1);
+        });
+    },
+
+    isExcluded(folderPath) {
+        const sources = moveActions.currentSourcePaths || [moveActions.currentSourcePath];
+        return sources.some(source => folderPath === source || folderPath.startsWith(source + '/'));
+    },
+
     renderFolderItem(container, path, name, hasChildren, depth, isRoot = false) {
         const indent = depth * 20;
         const folderId = `folder-${path.replace(/\//g, '-')}`;
@@ -149,13 +185,7 @@ const moveActions = {
                 `;
                 
                 try {
-                    const url = utils.buildApiUrl('list', path);
-                    const response = await fetch(url);
-                    
-                    if (!response.ok) throw new Error(`Erreur HTTP: ${response.status}`);
-                    
-                    const data = await response.json();
-                    const folders = data.files.filter(f => f.is_folder);
+                    const folders = await moveActions.fetchFolders(path);
                     
                     childrenContainer.innerHTML = '';
                     
@@ -166,17 +196,7 @@ const moveActions = {
                             </div>
                         `;
                     } else {
-                        folders.forEach(folder => {
-                            const folderPath = '/' + folder.full_relative_path;
-                            
-                            // Ne pas afficher le dossier source
-                            if (folderPath === moveActions.currentSourcePath) return;
-                            
-                            // Ne pas afficher les sous-dossiers du dossier source
-                            if (folderPath.startsWith(moveActions.currentSourcePath + '/')) return;
-                            
-                            moveActions.renderFolderItem(childrenContainer, folderPath, folder.name, true, depth + 1);
-                        });
+                        moveActions.renderFolders(childrenContainer, folders, depth);
                     }
                 } catch (error) {
                     console.error("Erreur:", error);
@@ -220,29 +240,49 @@ const moveActions = {
             return;
         }
 
+        // Sélection multiple : une seule requête pour tous les éléments
+        if (moveActions.currentSourcePaths) {
+            await selection.moveTo(destinationFolder);
+            return;
+        }
+
+        const isCopy = moveActions.currentMode === 'copy';
+        const action = isCopy ? 'de la copie' : 'du déplacement';
+
         try {
-            const response = await fetch(API_BASE + '/move', {
+            const response = await fetch(API_BASE + (isCopy ? '/copy' : '/move'), {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
                 },
                 body: JSON.stringify({
                     source_path: sourcePath,
-                    destination_folder: destinationFolder
+                    destination_folder: destinationFolder,
+                    async: true
                 })
             });
 
             const result = await response.json();
 
-            if (response.ok) {
-                notifications.show(result.message, 'success');
-                navigation.navigateToFolder(state.currentPath);
+            if (!response.ok) {
+                throw new Error(result.error || `Erreur inconnue lors ${action}.`);
+            }
+
+            // L'opération s'exécute en tâche de fond : on suit sa progression
+            const label = `${isCopy ? 'Copie' : 'Déplacement'} de ${sourcePath.split('/').pop()}`;
+            const job = await jobs.track(result.job_id, label);
+            navigation.refreshAfterChange();
+
+            if (job.status === 'done') {
+                notifications.show(job.message, 'success');
+            } else if (job.status === 'cancelled') {
+                notifications.show(job.message, 'info');
             } else {
-                throw new Error(result.error || "Erreur inconnue lors du déplacement.");
+                throw new Error(job.error || `Erreur inconnue lors ${action}.`);
             }
         } catch (error) {
-            console.error("Erreur de déplacement:", error);
-            notifications.show(`Échec du déplacement: ${error.message}`, 'error');
+            console.error(`Erreur ${action}:`, error);
+            notifications.show(`Échec ${action}: ${error.message}`, 'error');
         }
     }
 };
\ No newline at end of file
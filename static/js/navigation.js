@@ -7,6 +7,11 @@
 const navigation = {
   
   async navigateToFolder(newPath, isSearchResult = false, addToHistory = true) {
+        // La sélection ne survit pas au changement de dossier
+        selection.clear();
+        // Une recherche encore en cours ne doit pas remplacer le dossier affiché
+        search.cancel();
+        
         if (!isSearchResult) {
             state.currentPath = newPath;
             state.isSearchMode = false;
@@ -30,15 +35,10 @@ const navigation = {
         }, 2000); // Après 2 secondes
         
         try {
-            const url = utils.buildApiUrl('list', newPath);
-            const response = await fetch(url);
-            
-            if (!response.ok) {
-                throw new Error(`Erreur HTTP: ${response.status}`);
-            }
-            
-            const data = await response.json();
+            const data = await navigation.fetchListPage(newPath, 0);
             clearTimeout(slowLoadTimeout);
+            state.listNextOffset = data.next_offset;
+            state.listTotal = data.total;
             ui.renderFileList(data.files, data.current_path, data.is_search_result);
             
         } catch (error) {
@@ -53,6 +53,71 @@ const navigation = {
         }
     },
 	
+    // Recharge le dossier courant sans toucher à l'historique ni à la position de défilement
+    async refresh() {
+        if (state.isSearchMode) return;
+
+        const path = state.currentPath;
+        const loadedCount = state.listNextOffset ?? state.listTotal;
+        const scrollY = window.scrollY;
+
+        try {
+            const data = await navigation.fetchListPage(path, 0, Math.max(LIST_PAGE_SIZE, loadedCount));
+            if (state.currentPath !== path || state.isSearchMode) return;
+            state.listNextOffset = data.next_offset;
+            state.listTotal = data.total;
+            ui.renderFileListContent(data.files, data.current_path, false);
+            setTimeout(() => window.scrollTo(0, scrollY), 50);
+        } catch (error) {
+            console.error("Erreur lors du rafraîchissement du dossier:", error);
+        }
+    },
+
+    // Après une action de l'utilisateur : inutile si le serveur pousse déjà les modifications
+    refreshAfterChange() {
+        if (!liveUpdates.connected) {
+            navigation.refresh();
+        }
+    },
+
+    // Récupère une page du listing, triée côté serveur
+    async fetchListPage(path, offset, limit = LIST_PAGE_SIZE) {
+        const url = new URL(utils.buildApiUrl('list', path));
+        url.searchParams.append('sort', state.sortColumn);
+        url.searchParams.append('order', state.sortDirection);
+        url.searchParams.append('offset', offset);
+        url.searchParams.append('limit', limit);
+        // Le serveur prépare les miniatures du dossier pendant l'affichage
+        url.searchParams.append('thumbnails', THUMBNAIL_LIST_SIZE);
+        // Colonnes plutôt qu'objets : chemins et dates ne sont pas répétés à chaque entrée
+        url.searchParams.append('format', 'compact');
+
+        const response = await fetch(url);
+        
+        if (!response.ok) {
+            throw new Error(`Erreur HTTP: ${response.status}`);
+        }
+        
+        const data = await response.json();
+        data.files = utils.expandListing(data.listing);
+        state.thumbnailKinds = data.thumbnail_kinds || [];
+        return data;
+    },
+
+    async loadMore() {
+        if (state.listNextOffset === null) return;
+
+        try {
+            const data = await navigation.fetchListPage(state.currentPath, state.listNextOffset);
+            state.listNextOffset = data.next_offset;
+            state.listTotal = data.total;
+            ui.appendFileRows(data.files);
+        } catch (error) {
+            console.error("Erreur lors du chargement de la suite du dossier:", error);
+            notifications.show(`Erreur lors du chargement: ${error.message}`, 'error');
+        }
+    },
+	
 	navigateUp() {
         if (state.currentPath === ROOT_PATH) {
             notifications.show("Vous êtes déjà à la racine", 'info');
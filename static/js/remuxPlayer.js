@@ -0,0 +1,132 @@
+// ============================================
+// remuxPlayer.js - Lecture des formats non pris en charge (mkv, avi...) via le remux du serveur
+// ============================================
+//
+// Page du lecteur (/api/player) : les segments MP4 fragmentés de /api/remux/segment
+// sont ajoutés à un MediaSource autour de la position de lecture, chacun à
+// l'instant de départ que donne son en-tête X-Segment-Start.
+
+const remuxPlayer = {
+    BUFFER_AHEAD: 30, // Secondes préparées en avance
+    BUFFER_BEHIND: 60, // Secondes gardées derrière la position (mémoire du navigateur)
+    GAP_TOLERANCE: 0.3, // Écart entre deux plages tamponnées considéré comme continu
+
+    async fetchInfo(path, mode) {
+        const url = new URL('/api/remux/info', window.location.origin);
+        url.searchParams.append('path', path);
+        url.searchParams.append('mode', mode);
+        const response = await fetch(url);
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || 'Analyse du média impossible');
+        }
+        return data;
+    },
+
+    // Recopie des flux si le navigateur sait décoder le codec d'origine, vidéo réencodée sinon
+    async chooseStream(path) {
+        const copy = await remuxPlayer.fetchInfo(path, 'copy');
+        if (MediaSource.isTypeSupported(copy.mime) || copy.video !== 'copy') return copy;
+        const transcode = await remuxPlayer.fetchInfo(path, 'transcode');
+        if (MediaSource.isTypeSupported(transcode.mime)) return transcode;
+        throw new Error(`Format non décodable par ce navigateur (${copy.mime})`);
+    },
+
+    async attach(media, path) {
+        if (!window.MediaSource) {
+            throw new Error('Ce navigateur ne prend pas en charge Media Source Extensions');
+        }
+        const info = await remuxPlayer.chooseStream(path);
+
+        const mediaSource = new MediaSource();
+        media.src = URL.createObjectURL(mediaSource);
+        await new Promise(resolve => mediaSource.addEventListener('sourceopen', resolve, { once: true }));
+        mediaSource.duration = info.duration;
+        const sourceBuffer = mediaSource.addSourceBuffer(info.mime);
+        sourceBuffer.mode = 'segments';
+
+        const appended = new Set(); // Segments présents dans le tampon
+        let loading = false;
+
+        const waitForUpdate = () => new Promise((resolve, reject) => {
+            sourceBuffer.addEventListener('updateend', resolve, { once: true });
+            sourceBuffer.addEventListener('error', reject, { once: true });
+        });
+
+        // Fin de la plage tamponnée continue qui contient `time` (time lui-même si rien)
+        const bufferedEnd = (time) => {
+            let end = time;
+            for (let i = 0; i < sourceBuffer.buffered.length; i++) {
+                if (sourceBuffer.buffered.start(i) <= end + remuxPlayer.GAP_TOLERANCE && sourceBuffer.buffered.end(i) > end) {
+                    end = sourceBuffer.buffered.end(i);
+                }
+            }
+            return end;
+        };
+
+        const fetchSegment = async (index) => {
+            const url = new URL('/api/remux/segment', window.location.origin);
+            url.searchParams.append('path', path);
+            url.searchParams.append('mode', info.mode);
+            url.searchParams.append('index', index);
+            const response = await fetch(url);
+            if (!response.ok) {
+                const data = await response.json().catch(() => ({}));
+                throw new Error(data.error || `Erreur HTTP: ${response.status}`);
+            }
+            return {
+                start: parseFloat(response.headers.get('X-Segment-Start')),
+                data: await response.arrayBuffer()
+            };
+        };
+
+        // Libère ce qui est loin derrière la position de lecture
+        const trimBehind = async (time) => {
+            const limit = time - remuxPlayer.BUFFER_BEHIND;
+            if (limit <= 0 || sourceBuffer.buffered.length === 0 || sourceBuffer.buffered.start(0) >= limit) return;
+            sourceBuffer.remove(0, limit);
+            await waitForUpdate();
+            appended.forEach(index => {
+                if ((index + 1) * info.segment_duration <= limit) appended.delete(index);
+            });
+        };
+
+        const fill = async () => {
+            if (loading) return;
+            loading = true;
+            try {
+                while (true) {
+                    const time = media.currentTime;
+                    const end = bufferedEnd(time);
+                    if (end - time >= remuxPlayer.BUFFER_AHEAD) break;
+
+                    let index = Math.floor(end / info.segment_duration);
+                    while (appended.has(index)) index++;
+                    if (index >= info.segment_count) {
+                        if (mediaSource.readyState === 'open' && appended.has(info.segment_count - 1)) {
+                            mediaSource.endOfStream();
+                        }
+                        break;
+                    }
+
+                    const segment = await fetchSegment(index);
+                    await trimBehind(media.currentTime);
+                    sourceBuffer.timestampOffset = segment.start;
+                    sourceBuffer.appendBuffer(segment.data);
+                    await waitForUpdate();
+                    appended.add(index);
+                }
+            } catch (error) {
+                console.error('Erreur de lecture remuxée:', error);
+                media.dispatchEvent(new CustomEvent('remuxerror', { detail: error }));
+            } finally {
+                loading = false;
+            }
+        };
+
+        media.addEventListener('timeupdate', fill);
+        media.addEventListener('seeking', fill);
+        await fill();
+        return info;
+    }
+};
@@ -24,22 +24,32 @@ const search = {
         }
     },
 
+    controller: null, // Recherche en flux en cours (annulée par une nouvelle recherche ou la navigation)
+
     async perform(query) {
+        search.cancel();
         ui.showLoading();
         state.lastSearchQuery = query;
         
+        if (!state.searchInContent) {
+            return search.performStream(query);
+        }
+        
         try {
-            const url = new URL(`${API_BASE}/search`, window.location.origin);
+            const url = new URL(`${API_BASE}/search/content`, window.location.origin);
             url.searchParams.append('query', query);
             
             const response = await fetch(url);
+            const data = await response.json();
             
             if (!response.ok) {
-                throw new Error(`Erreur HTTP: ${response.status}`);
+                throw new Error(data.error || `Erreur HTTP: ${response.status}`);
             }
             
-            const data = await response.json();
             ui.renderFileList(data.files, data.current_path, data.is_search_result);
+            if (data.indexing) {
+                notifications.show("Indexation du contenu en cours : les résultats peuvent être incomplets.", 'info');
+            }
             
         } catch (error) {
             console.error("Erreur lors de la recherche:", error);
@@ -49,7 +59,84 @@ const search = {
         }
     },
 
+    // Recherche par nom : les résultats s'affichent au fil du parcours (NDJSON), sans attendre la fin
+    async performStream(query) {
+        const controller = new AbortController();
+        search.controller = controller;
+        const title = `Recherche: '${query}'`;
+        let count = 0;
+        
+        try {
+            const url = new URL(`${API_BASE}/search/stream`, window.location.origin);
+            url.searchParams.append('query', query);
+            url.searchParams.append('limit', SEARCH_STREAM_LIMIT);
+            
+            const response = await fetch(url, { signal: controller.signal });
+            
+            if (!response.ok) {
+                const data = await response.json();
+                throw new Error(data.error || `Erreur HTTP: ${response.status}`);
+            }
+            
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                
+                for (const line of lines) {
+                    if (!line.trim()) continue;
+                    const message = JSON.parse(line);
+                    
+                    if (message.type === 'results') {
+                        // Premier paquet : la liste remplace l'affichage précédent, les suivants s'y ajoutent
+                        if (count === 0) {
+                            ui.renderFileList(message.files, title, true);
+                        } else {
+                            ui.appendSearchRows(message.files, message.count);
+                        }
+                        count = message.count;
+                    } else if (message.type === 'end') {
+                        if (count === 0) ui.renderFileList([], title, true);
+                        if (message.reason === 'limit') {
+                            notifications.show(`Seuls les ${message.count} premiers résultats sont affichés : précisez la recherche.`, 'info');
+                        } else if (message.reason === 'time') {
+                            notifications.show('Recherche interrompue (durée maximale atteinte) : résultats partiels.', 'warning');
+                        }
+                    }
+                }
+            }
+        } catch (error) {
+            if (error.name === 'AbortError') return;
+            console.error("Erreur lors de la recherche:", error);
+            notifications.show(`Erreur lors de la recherche: ${error.message}`, 'error');
+        } finally {
+            if (search.controller === controller) search.controller = null;
+            ui.hideLoading();
+        }
+    },
+
+    // Ferme le flux en cours : le serveur arrête alors son parcours du disque
+    cancel() {
+        if (search.controller) {
+            search.controller.abort();
+            search.controller = null;
+        }
+    },
+
+    // Bascule entre recherche dans les noms et dans le contenu, en relançant la même requête
+    toggleContent() {
+        state.searchInContent = !state.searchInContent;
+        search.perform(state.lastSearchQuery);
+    },
+
     exitSearchMode() {
+        search.cancel();
         state.isSearchMode = false;
         state.lastSearchQuery = '';
         navigation.navigateToFolder(state.currentPath);
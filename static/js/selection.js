@@ -0,0 +1,132 @@
+// ============================================
+// selection.js - Sélection multiple et opérations groupées
+// ============================================
+
+const selection = {
+    items: new Map(), // chemin relatif -> { name, isFolder }
+
+    has(path) {
+        return selection.items.has(path);
+    },
+
+    // Ctrl/Cmd + clic sur une ligne (ou « Sélectionner » dans le menu contextuel)
+    toggle(name, path, isFolder) {
+        contextMenu.hide();
+        if (selection.items.has(path)) {
+            selection.items.delete(path);
+        } else {
+            selection.items.set(path, { name, isFolder });
+        }
+        const row = document.querySelector(`tr[data-selection-path="${CSS.escape(path)}"]`);
+        if (row) row.classList.toggle('selected-row', selection.items.has(path));
+        selection.renderBar();
+    },
+
+    clear() {
+        selection.items.clear();
+        document.querySelectorAll('tr.selected-row').forEach(row => row.classList.remove('selected-row'));
+        selection.renderBar();
+    },
+
+    renderBar() {
+        let bar = document.getElementById('selection-bar');
+        if (selection.items.size === 0) {
+            if (bar) bar.remove();
+            return;
+        }
+
+        if (!bar) {
+            bar = document.createElement('div');
+            bar.id = 'selection-bar';
+            bar.className = 'fixed bottom-20 sm:bottom-6 left-1/2 -translate-x-1/2 transform z-40 bg-white rounded-xl shadow-2xl border border-slate-200 px-4 py-2 flex items-center gap-3';
+            document.body.appendChild(bar);
+        }
+        const count = selection.items.size;
+        bar.innerHTML = `
+            <span class="text-sm font-medium text-slate-700">${count} élément${count > 1 ? 's' : ''} sélectionné${count > 1 ? 's' : ''}</span>
+            <button type="button" onclick="selection.openMoveModal()" class="px-3 py-1.5 text-sm bg-blue-600 text-white rounded-lg font-semibold hover:bg-blue-700 transition">
+                <i class="fas fa-arrows-alt mr-1"></i> Déplacer
+            </button>
+            <button type="button" onclick="selection.confirmDelete()" class="px-3 py-1.5 text-sm bg-red-600 text-white rounded-lg font-semibold hover:bg-red-700 transition">
+                <i class="fas fa-trash-alt mr-1"></i> Supprimer
+            </button>
+            <button type="button" onclick="selection.clear()" class="text-slate-400 hover:text-slate-600 p-2 rounded-full hover:bg-slate-100 transition" title="Tout désélectionner">
+                <i class="fas fa-times"></i>
+            </button>
+        `;
+    },
+
+    openMoveModal() {
+        const entries = [...selection.items.entries()];
+        const label = `${entries.length} élément(s)`;
+        moveActions.openMoveModal(label, null, entries.some(([, item]) => item.isFolder), 'move', entries.map(([path]) => path));
+    },
+
+    async moveTo(destinationFolder) {
+        const operations = [...selection.items.keys()].map(path => ({
+            op: 'move',
+            source_path: path,
+            destination_folder: destinationFolder
+        }));
+        await selection.run(operations, `Déplacement de ${operations.length} élément(s)`, 'du déplacement');
+    },
+
+    confirmDelete() {
+        const count = selection.items.size;
+        const names = [...selection.items.values()].slice(0, 5).map(item => item.name).join(', ');
+        const content = `
+            <p class="text-slate-700">Êtes-vous sûr de vouloir supprimer définitivement ${count} élément(s) :</p>
+            <p class="font-semibold text-red-600 mt-2 truncate">${names}${count > 5 ? '...' : ''}</p>
+            <p class="text-sm text-slate-500 mt-2">Cette action est irréversible.</p>
+            <div class="flex justify-end space-x-3 pt-4">
+                <button type="button" onclick="modal.close()" class="px-4 py-2 text-sm text-slate-700 border border-slate-300 rounded-lg hover:bg-slate-100 transition">Annuler</button>
+                <button type="button" onclick="selection.handleDelete()" class="px-4 py-2 text-sm bg-red-600 text-white rounded-lg font-semibold hover:bg-red-700 transition">Supprimer</button>
+            </div>
+        `;
+        modal.open('Supprimer la sélection ?', content);
+    },
+
+    async handleDelete() {
+        modal.close();
+        const operations = [...selection.items.keys()].map(path => ({ op: 'delete', path }));
+        await selection.run(operations, `Suppression de ${operations.length} élément(s)`, 'de la suppression');
+    },
+
+    // Envoie toutes les opérations en une requête, suit la tâche, puis un seul rafraîchissement
+    async run(operations, label, action) {
+        try {
+            const response = await fetch(API_BASE + '/batch', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ operations, async: true })
+            });
+
+            const result = await response.json();
+
+            if (!response.ok) {
+                const firstError = (result.results || []).find(item => item.status === 'error');
+                throw new Error(firstError ? `${result.error} (${firstError.error})` : (result.error || `Erreur inconnue lors ${action}.`));
+            }
+
+            const job = await jobs.track(result.job_id, label);
+            selection.clear();
+            navigation.refreshAfterChange();
+
+            const failures = (job.result || []).filter(item => item.status === 'error');
+            if (job.status === 'done' && failures.length === 0) {
+                notifications.show(job.message, 'success');
+            } else if (job.status === 'done') {
+                notifications.show(`${job.message} : ${failures.slice(0, 3).map(item => `${item.path} (${item.error})`).join(', ')}`, 'warning');
+            } else if (job.status === 'cancelled') {
+                notifications.show(job.message, 'info');
+            } else {
+                throw new Error(job.error || `Erreur inconnue lors ${action}.`);
+            }
+        } catch (error) {
+            console.error(`Erreur ${action}:`, error);
+            notifications.show(`Échec ${action}: ${error.message}`, 'error');
+        }
+    }
+};
@@ -70,6 +70,21 @@ const textEditor = {
                     <option value="18">18px</option>
                     <option value="20">20px</option>
                 </select>
+                <div id="${editorId}-window-nav" style="display: none; align-items: center; gap: 4px;">
+                    <button onclick="event.stopPropagation(); textEditor.moveWindow('${editorId}', -1)" 
+                            class="toolbar-btn" title="Lignes précédentes">
+                        <i class="fas fa-chevron-up"></i>
+                    </button>
+                    <span id="${editorId}-window" style="font-size: 12px; color: #64748b;"></span>
+                    <button onclick="event.stopPropagation(); textEditor.moveWindow('${editorId}', 1)" 
+                            class="toolbar-btn" title="Lignes suivantes">
+                        <i class="fas fa-chevron-down"></i>
+                    </button>
+                </div>
+                <button onclick="event.stopPropagation(); textEditor.toggleFollow('${editorId}')" 
+                        id="${editorId}-follow-btn" class="toolbar-btn" title="Suivre la fin du fichier (journaux)">
+                    <i class="fas fa-stream"></i>
+                </button>
                 <div style="flex: 1;"></div>
                 <span id="${editorId}-status" style="font-size: 12px; color: #64748b;">Chargement...</span>
             </div>
@@ -117,7 +132,8 @@ const textEditor = {
             filePath: filePath,
             filename: filename,
             originalContent: null,
-            isModified: false
+            isModified: false,
+            tail: null // Flux de suivi de la fin du fichier
         };
         
         // Ajouter aux fenêtres actives de floatingViewer ET de textEditor
@@ -135,26 +151,26 @@ const textEditor = {
         return editorId;
     },
 
-    async loadContent(editorId, filePath) {
+    // Seule une fenêtre de lignes est chargée : un journal de plusieurs Go s'ouvre instantanément
+    async loadContent(editorId, filePath, start = 0) {
         const windowData = this.activeEditors.find(w => w.id === editorId);
         if (!windowData) return;
         
         const textarea = document.getElementById(editorId + '-textarea');
         
         try {
-            const response = await fetch(utils.buildApiUrl('view', filePath));
-            
-            if (!response.ok) {
-                throw new Error('Impossible de charger le fichier');
-            }
-            
-            const content = await response.text();
-            windowData.originalContent = content;
-            textarea.value = content;
+            const data = await textFiles.loadWindow(filePath, start);
+            textFiles.applyWindow(windowData, data);
+            textarea.value = data.text;
             textarea.placeholder = '';
+            textarea.scrollTop = 0;
+            // Contenu non UTF-8 : l'enregistrer le corromprait
+            textarea.readOnly = data.lossy || windowData.tail !== null;
             
             this.updateStats(editorId);
-            this.updateStatus(editorId, 'Prêt', 'success');
+            this.updateWindowInfo(editorId);
+            this.updateSaveButton(editorId);
+            this.updateStatus(editorId, data.lossy ? 'Lecture seule (encodage non UTF-8)' : 'Prêt', data.lossy ? 'warning' : 'success');
             textarea.focus();
             
         } catch (error) {
@@ -166,6 +182,72 @@ const textEditor = {
         }
     },
 
+    updateWindowInfo(editorId) {
+        const windowData = this.activeEditors.find(w => w.id === editorId);
+        const nav = document.getElementById(editorId + '-window-nav');
+        const label = document.getElementById(editorId + '-window');
+        if (!windowData || !nav || !label) return;
+        
+        nav.style.display = windowData.complete ? 'none' : 'flex';
+        label.textContent = textFiles.describeWindow(windowData);
+    },
+
+    // Fenêtre précédente (-1) ou suivante (1) d'un gros fichier
+    async moveWindow(editorId, direction) {
+        const windowData = this.activeEditors.find(w => w.id === editorId);
+        if (!windowData || windowData.tail) return;
+        
+        const start = Math.max(0, windowData.windowStart + direction * TEXT_WINDOW_LINES);
+        if (start === windowData.windowStart || start >= windowData.totalLines) return;
+        
+        if (windowData.isModified && !confirm('Les modifications de ces lignes ne sont pas enregistrées. Continuer ?')) {
+            return;
+        }
+        await this.loadContent(editorId, windowData.filePath, start);
+    },
+
+    // Mode suivi : dernières lignes affichées, puis ajouts reçus en direct (lecture seule)
+    async toggleFollow(editorId) {
+        const windowData = this.activeEditors.find(w => w.id === editorId);
+        if (!windowData) return;
+        
+        const textarea = document.getElementById(editorId + '-textarea');
+        const followBtn = document.getElementById(editorId + '-follow-btn');
+        
+        if (windowData.tail) {
+            windowData.tail.close();
+            windowData.tail = null;
+            followBtn.style.background = '';
+            await this.loadContent(editorId, windowData.filePath, windowData.windowStart);
+            return;
+        }
+        
+        if (windowData.isModified) {
+            notifications.show('Enregistrez vos modifications avant de suivre le fichier.', 'warning');
+            return;
+        }
+        
+        windowData.tail = { close() {} }; // Lecture seule dès le chargement de la dernière fenêtre
+        await this.loadContent(editorId, windowData.filePath, Math.max(0, windowData.totalLines - TEXT_WINDOW_LINES));
+        textarea.scrollTop = textarea.scrollHeight;
+        followBtn.style.background = '#dbeafe';
+        this.updateStatus(editorId, 'Suivi en direct', 'info');
+        
+        windowData.tail = textFiles.follow(windowData, (text) => {
+            // Ne défile que si l'utilisateur est déjà en bas
+            const atBottom = textarea.scrollTop + textarea.clientHeight >= textarea.scrollHeight - 20;
+            textarea.value += text;
+            if (atBottom) textarea.scrollTop = textarea.scrollHeight;
+            this.updateStats(editorId);
+            this.updateWindowInfo(editorId);
+        }, () => {
+            // Fichier tronqué ou remplacé (rotation) : on repart de sa nouvelle fin
+            windowData.tail.close();
+            windowData.tail = null;
+            this.toggleFollow(editorId);
+        });
+    },
+
     setupEventListeners(editorId) {
         const windowData = this.activeEditors.find(w => w.id === editorId);
         if (!windowData) return;
@@ -300,46 +382,22 @@ const textEditor = {
             saveBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i>';
             this.updateStatus(editorId, 'Enregistrement en cours...', 'info');
             
-            // Créer un FormData avec le fichier
-            const blob = new Blob([textarea.value], { type: 'text/plain' });
-            const file = new File([blob], windowData.filename, { type: 'text/plain' });
-            
-            const formData = new FormData();
-            formData.append('files', file);
-            
-            // Déterminer le dossier parent
-            const pathParts = windowData.filePath.split('/');
-            pathParts.pop();
-            const parentPath = '/' + pathParts.join('/');
-            
-            formData.append('path', parentPath);
-            
-            const response = await fetch(API_BASE + '/upload', {
-                method: 'POST',
-                body: formData
-            });
+            // Seules les lignes modifiées de la fenêtre sont envoyées (écriture atomique côté serveur)
+            await textFiles.save(windowData, textarea.value);
+            this.updateSaveButton(editorId);
+            this.updateWindowInfo(editorId);
+            this.updateStatus(editorId, 'Enregistré', 'success');
             
-            const result = await response.json();
+            if (typeof notifications !== 'undefined') {
+                notifications.show('✅ Fichier enregistré avec succès', 'success');
+            }
             
-            if (response.ok) {
-                windowData.originalContent = textarea.value;
-                windowData.isModified = false;
-                this.updateSaveButton(editorId);
-                this.updateStatus(editorId, 'Enregistré', 'success');
-                
-                if (typeof notifications !== 'undefined') {
-                    notifications.show('✅ Fichier enregistré avec succès', 'success');
-                }
-                
-                // Rafraîchir la vue principale si nécessaire
-                if (typeof navigation !== 'undefined' && typeof state !== 'undefined') {
-                    const currentDir = windowData.filePath.substring(0, windowData.filePath.lastIndexOf('/')) || '/';
-                    if (state.currentPath === currentDir) {
-                        navigation.navigateToFolder(state.currentPath);
-                    }
+            // Rafraîchir la vue principale si nécessaire
+            if (typeof navigation !== 'undefined' && typeof state !== 'undefined') {
+                const currentDir = windowData.filePath.substring(0, windowData.filePath.lastIndexOf('/')) || '/';
+                if (state.currentPath === currentDir) {
+                    navigation.refreshAfterChange();
                 }
-            } else {
-                throw new Error(result.error || 'Erreur lors de l\'enregistrement');
             }
             
         } catch (error) {
@@ -364,6 +422,8 @@ const textEditor = {
             }
         }
         
+        if (windowData.tail) windowData.tail.close();
+        
         // Utiliser la fonction de fermeture de floatingViewer
         floatingViewer.closeWindow(editorId);
         
@@ -0,0 +1,124 @@
+// ============================================
+// textFiles.js - Lecture par fenêtres, suivi et enregistrement partiel des fichiers texte
+// ============================================
+
+const textFiles = {
+    // Fenêtre de lignes ; `complete` indique que tout le fichier tient dans la fenêtre
+    async loadWindow(path, start = 0, count = TEXT_WINDOW_LINES) {
+        const url = new URL(utils.buildApiUrl('text/window', path));
+        url.searchParams.append('start', start);
+        url.searchParams.append('count', count);
+
+        const response = await fetch(url);
+        const data = await response.json();
+
+        if (!response.ok) {
+            throw new Error(data.error || 'Impossible de charger le fichier');
+        }
+        return data;
+    },
+
+    // Copie dans l'état de la fenêtre d'éditeur les informations nécessaires à l'enregistrement
+    applyWindow(windowData, data) {
+        Object.assign(windowData, {
+            originalContent: data.text,
+            windowStart: data.start,
+            windowCount: data.count,
+            totalLines: data.total_lines,
+            byteStart: data.byte_start,
+            byteEnd: data.byte_end,
+            size: data.size,
+            version: data.version,
+            complete: data.complete,
+            lossy: data.lossy,
+            isModified: false
+        });
+    },
+
+    describeWindow(windowData) {
+        if (windowData.complete) return '';
+        const last = windowData.windowStart + windowData.windowCount;
+        return `Lignes ${windowData.windowStart + 1}–${last} sur ${windowData.totalLines}`;
+    },
+
+    // Plus petite modification transformant `original` en `current` (préfixe et suffixe communs retirés),
+    // en positions d'octets UTF-8 à partir de `byteOffset`
+    diff(original, current, byteOffset) {
+        const max = Math.min(original.length, current.length);
+        let prefix = 0;
+        while (prefix < max && original.charCodeAt(prefix) === current.charCodeAt(prefix)) prefix++;
+        let suffix = 0;
+        while (suffix < max - prefix &&
+               original.charCodeAt(original.length - 1 - suffix) === current.charCodeAt(current.length - 1 - suffix)) suffix++;
+
+        // Ne pas couper un caractère hors BMP (paire de substitution) en deux
+        const isHighSurrogate = code => code >= 0xD800 && code <= 0xDBFF;
+        const isLowSurrogate = code => code >= 0xDC00 && code <= 0xDFFF;
+        if (prefix > 0 && isHighSurrogate(original.charCodeAt(prefix - 1))) prefix--;
+        if (suffix > 0 && isLowSurrogate(original.charCodeAt(original.length - suffix))) suffix--;
+
+        const encoder = new TextEncoder();
+        const start = byteOffset + encoder.encode(original.slice(0, prefix)).length;
+        const end = start + encoder.encode(original.slice(prefix, original.length - suffix)).length;
+        return { start, end, text: current.slice(prefix, current.length - suffix) };
+    },
+
+    // Envoie uniquement la partie modifiée ; le serveur refuse (409) si le fichier a changé entre-temps
+    async save(windowData, current) {
+        const edit = textFiles.diff(windowData.originalContent, current, windowData.byteStart);
+
+        const response = await fetch(API_BASE + '/text/patch', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                path: windowData.filePath,
+                version: windowData.version,
+                edits: [edit]
+            })
+        });
+
+        const result = await response.json();
+
+        if (response.status === 409) {
+            throw new Error('le fichier a été modifié par ailleurs depuis son ouverture, rechargez-le');
+        }
+        if (!response.ok) {
+            throw new Error(result.error || 'Erreur lors de l\'enregistrement');
+        }
+
+        const byteLength = new TextEncoder().encode(current).length;
+        windowData.originalContent = current;
+        windowData.byteEnd = windowData.byteStart + byteLength;
+        windowData.size = result.size;
+        windowData.version = result.version;
+        windowData.isModified = false;
+        return result;
+    },
+
+    // Suivi des ajouts en fin de fichier (journaux) ; retourne l'EventSource à fermer
+    follow(windowData, onAppend, onReset) {
+        const url = new URL(utils.buildApiUrl('text/tail', windowData.filePath));
+        url.searchParams.append('offset', windowData.size);
+        const source = new EventSource(url);
+
+        source.addEventListener('append', (event) => {
+            const data = JSON.parse(event.data);
+            windowData.originalContent += data.text;
+            windowData.byteEnd = data.offset;
+            windowData.size = data.offset;
+            windowData.version = data.version;
+            const newLines = (data.text.match(/\n/g) || []).length;
+            windowData.totalLines += newLines;
+            windowData.windowCount += newLines;
+            onAppend(data.text);
+        });
+        source.addEventListener('reset', onReset);
+        source.addEventListener('gone', () => {
+            source.close();
+            onReset();
+        });
+        return source;
+    }
+};
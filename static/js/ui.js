@@ -72,8 +72,13 @@ const ui = {
                         <i class="fas fa-search text-blue-600 flex-shrink-0"></i>
                         <span class="text-slate-600 flex-shrink-0">Résultats pour :</span> 
                         <span class="font-bold text-blue-700 truncate" title="${searchTerm}">${searchTerm}</span>
-                        <span class="text-slate-500 text-sm flex-shrink-0">(${files.length} résultat${files.length > 1 ? 's' : ''})</span>
+                        <span id="search-result-count" class="text-slate-500 text-sm flex-shrink-0">(${files.length} résultat${files.length > 1 ? 's' : ''})</span>
                     </div>
+                    <button onclick="search.toggleContent()" title="${state.searchInContent ? 'Rechercher dans les noms' : 'Rechercher dans le contenu des fichiers texte'}"
+                            class="flex items-center gap-2 px-3 py-1.5 ${state.searchInContent ? 'bg-blue-100 text-blue-700' : 'bg-slate-100 text-slate-700'} hover:bg-slate-200 rounded-lg transition duration-150 text-sm font-medium flex-shrink-0">
+                        <i class="fas fa-file-alt"></i>
+                        <span>Contenu</span>
+                    </button>
                     <button onclick="search.exitSearchMode()" 
                             class="flex items-center gap-2 px-3 py-1.5 bg-slate-100 hover:bg-slate-200 text-slate-700 rounded-lg transition duration-150 text-sm font-medium flex-shrink-0">
                         <i class="fas fa-times"></i>
@@ -115,6 +120,12 @@ const ui = {
                 }
             });
             
+            dom.pathDisplay.innerHTML += `
+                <button onclick="duplicates.find(state.currentPath)" class="text-slate-400 hover:text-blue-700 ml-3 transition duration-150" title="Rechercher les doublons dans ce dossier">
+                    <i class="fas fa-clone"></i>
+                </button>
+            `;
+
             // Logique de défilement pour le chemin (breadcrumbs)
             setTimeout(() => {
                 if (dom.pathDisplay) {
@@ -123,10 +134,7 @@ const ui = {
             }, 50); 
         }
 
-        // Tri des fichiers
-        if (!isSearchResult) {
-            files.sort(sorting.compareFiles);
-        }
+        // Le tri est fait côté serveur (voir navigation.fetchListPage)
         
         // Liste des fichiers
         if (files.length === 0) {
@@ -194,72 +202,7 @@ const ui = {
             const fragment = document.createDocumentFragment();
             
             for (let i = currentIndex; i < endIndex; i++) {
-                const file = files[i];
-                const tr = document.createElement('tr');
-                
-                const icon = file.is_folder ? 
-                    '<i class="fas fa-folder text-yellow-500 w-5 text-center mr-3 flex-shrink-0"></i>' : 
-                    utils.getFileIcon(file.name);
-                
-                const nameClass = file.is_folder ? 'font-medium text-blue-600' : 'text-slate-800';
-                const rowClass = file.is_folder ? 'cursor-pointer hover:bg-yellow-50' : 'cursor-pointer hover:bg-blue-50';
-
-                // Amélioration de l'affichage avec title pour tooltip
-                let displayName;
-                if (isSearchResult) {
-                    const parentPath = file.full_relative_path.split('/').slice(0, -1).join('/') || '/';
-                    displayName = `
-                        <span class="text-xs text-slate-500 block mb-0.5 truncate" title="${parentPath}">${parentPath}</span>
-                        <div class="truncate" title="${file.name}">${file.name}</div>
-                    `;
-                } else {
-                    displayName = `<div class="truncate" title="${file.name}">${file.name}</div>`;
-                }
-
-                tr.className = `${rowClass} transition duration-150 group`;
-                
-                // Événements via propriétés au lieu d'attributs inline
-                tr.onclick = () => {
-                    if (file.is_folder) {
-                        navigation.navigateToFolder('/' + file.full_relative_path);
-                    } else {
-                        fileActions.handleFileClick(file.name, file.full_relative_path, file.mime_type, file.size);
-                    }
-                };
-                
-                tr.oncontextmenu = (e) => {
-                    contextMenu.show(e, file.name, file.full_relative_path, file.mime_type, file.size, file.is_folder);
-                };
-
-                tr.innerHTML = `
-                    <td class="px-4 py-3 whitespace-nowrap text-sm">
-                        <div class="flex items-center ${nameClass} text-sm min-w-0">
-                            ${icon}
-                            <div class="min-w-0 flex-1">${displayName}</div>
-                        </div>
-                    </td>
-                    <td class="px-4 py-3 whitespace-nowrap text-sm text-slate-500 hidden sm:table-cell">
-                        ${file.is_folder ? '-' : utils.formatBytes(file.size)}
-                    </td>
-                    <td class="px-4 py-3 whitespace-nowrap text-sm text-slate-500 hidden md:table-cell" title="${new Date(file.modified).toLocaleString('fr-FR')}">
-                        ${new Date(file.modified).toLocaleString('fr-FR')}
-                    </td>
-                    <td class="px-4 py-3 text-right whitespace-nowrap text-sm font-medium">
-                        <button class="text-slate-400 hover:text-blue-600 p-2 rounded-full opacity-0 group-hover:opacity-100 transition-opacity duration-150 flex-shrink-0" 
-                                title="Plus d'options">
-                            <i class="fas fa-ellipsis-v"></i>
-                        </button>
-                    </td>
-                `;
-                
-                // Ajouter événement au bouton menu
-                const menuBtn = tr.querySelector('button');
-                menuBtn.onclick = (e) => {
-                    e.stopPropagation();
-                    contextMenu.show(e, file.name, file.full_relative_path, file.mime_type, file.size, file.is_folder);
-                };
-                
-                fragment.appendChild(tr);
+                fragment.appendChild(ui.createFileRow(files[i], isSearchResult));
             }
             
             dom.fileListBody.appendChild(fragment);
@@ -273,12 +216,151 @@ const ui = {
                 const loadingInfo = document.getElementById('loading-info');
                 if (loadingInfo) loadingInfo.remove();
                 
+                if (!isSearchResult) ui.renderLoadMoreRow();
                 sorting.updateIndicators();
             }
         };
 
         // Démarrer le rendu
         setTimeout(renderChunk, 0);
+    },
+
+    createFileRow(file, isSearchResult) {
+        const tr = document.createElement('tr');
+        
+        const hasThumbnail = !file.is_folder && utils.hasThumbnail(file.mime_type);
+        const icon = file.is_folder ? 
+            '<i class="fas fa-folder text-yellow-500 w-5 text-center mr-3 flex-shrink-0"></i>' : 
+            hasThumbnail ?
+            `<img src="${utils.getThumbnailUrl(file.full_relative_path, THUMBNAIL_LIST_SIZE, file.modified)}" alt="" loading="lazy" decoding="async"
+                  class="file-thumbnail w-8 h-8 object-cover rounded mr-3 flex-shrink-0 bg-slate-100">` :
+            utils.getFileIcon(file.name);
+        
+        const nameClass = file.is_folder ? 'font-medium text-blue-600' : 'text-slate-800';
+        const rowClass = file.is_folder ? 'cursor-pointer hover:bg-yellow-50' : 'cursor-pointer hover:bg-blue-50';
+
+        // Amélioration de l'affichage avec title pour tooltip
+        let displayName;
+        if (isSearchResult) {
+            const parentPath = file.full_relative_path.split('/').slice(0, -1).join('/') || '/';
+            displayName = `
+                <span class="text-xs text-slate-500 block mb-0.5 truncate" title="${parentPath}">${parentPath}</span>
+                <div class="truncate" title="${file.name}">${file.name}</div>
+            `;
+            // Recherche dans le contenu : lignes trouvées sous le nom
+            (file.matches || []).forEach(match => {
+                displayName += `<div class="text-xs text-slate-600 font-mono truncate mt-0.5">${utils.formatMatch(match)}</div>`;
+            });
+        } else {
+            displayName = `<div class="truncate" title="${file.name}">${file.name}</div>`;
+        }
+
+        // Taille récursive des dossiers, calculée par l'index du serveur (absente tant qu'il n'est pas prêt)
+        const folderStats = file.is_folder && file.file_count !== undefined
+            ? `${file.file_count} fichier(s), ${file.folder_count} dossier(s)`
+            : '';
+
+        tr.className = `${rowClass} transition duration-150 group`;
+        tr.dataset.selectionPath = file.full_relative_path;
+        if (selection.has(file.full_relative_path)) tr.classList.add('selected-row');
+        
+        // Événements via propriétés au lieu d'attributs inline
+        tr.onclick = (e) => {
+            // Ctrl/Cmd + clic : sélection multiple au lieu de l'ouverture
+            if (e.ctrlKey || e.metaKey) {
+                selection.toggle(file.name, file.full_relative_path, file.is_folder);
+                return;
+            }
+            if (file.is_folder) {
+                navigation.navigateToFolder('/' + file.full_relative_path);
+            } else {
+                fileActions.handleFileClick(file.name, file.full_relative_path, file.mime_type, file.size);
+            }
+        };
+        
+        tr.oncontextmenu = (e) => {
+            contextMenu.show(e, file.name, file.full_relative_path, file.mime_type, file.size, file.is_folder);
+        };
+
+        tr.innerHTML = `
+            <td class="px-4 py-3 whitespace-nowrap text-sm">
+                <div class="flex items-center ${nameClass} text-sm min-w-0">
+                    ${icon}
+                    <div class="min-w-0 flex-1">${displayName}</div>
+                </div>
+            </td>
+            <td class="px-4 py-3 whitespace-nowrap text-sm text-slate-500 hidden sm:table-cell" title="${folderStats}">
+                ${file.is_folder && file.file_count === undefined ? '-' : utils.formatBytes(file.size)}
+            </td>
+            <td class="px-4 py-3 whitespace-nowrap text-sm text-slate-500 hidden md:table-cell" title="${new Date(file.modified).toLocaleString('fr-FR')}">
+                ${new Date(file.modified).toLocaleString('fr-FR')}
+            </td>
+            <td class="px-4 py-3 text-right whitespace-nowrap text-sm font-medium">
+                <button class="text-slate-400 hover:text-blue-600 p-2 rounded-full opacity-0 group-hover:opacity-100 transition-opacity duration-150 flex-shrink-0" 
+                        title="Plus d'options">
+                    <i class="fas fa-ellipsis-v"></i>
+                </button>
+            </td>
+        `;
+        
+        // Aperçu impossible (fichier illisible...) : retour à l'icône
+        if (hasThumbnail) {
+            const thumbnail = tr.querySelector('.file-thumbnail');
+            thumbnail.onerror = () => { thumbnail.outerHTML = utils.getFileIcon(file.name); };
+        }
+        
+        // Ajouter événement au bouton menu
+        const menuBtn = tr.querySelector('button');
+        menuBtn.onclick = (e) => {
+            e.stopPropagation();
+            contextMenu.show(e, file.name, file.full_relative_path, file.mime_type, file.size, file.is_folder);
+        };
+
+        return tr;
+    },
+
+    // Résultats supplémentaires d'une recherche en flux
+    appendSearchRows(files, total) {
+        const fragment = document.createDocumentFragment();
+        files.forEach(file => fragment.appendChild(ui.createFileRow(file, true)));
+        dom.fileListBody.appendChild(fragment);
+        
+        const counter = document.getElementById('search-result-count');
+        if (counter) counter.textContent = `(${total} résultat${total > 1 ? 's' : ''})`;
+    },
+
+    // Ajoute une page supplémentaire du dossier courant à la fin de la liste
+    appendFileRows(files) {
+        const fragment = document.createDocumentFragment();
+        files.forEach(file => fragment.appendChild(ui.createFileRow(file, false)));
+        
+        const loadMoreRow = document.getElementById('load-more-row');
+        if (loadMoreRow) loadMoreRow.remove();
+        
+        dom.fileListBody.appendChild(fragment);
+        ui.renderLoadMoreRow();
+    },
+
+    renderLoadMoreRow() {
+        if (state.listNextOffset === null || state.listNextOffset === undefined) return;
+        
+        const remainingCount = state.listTotal - state.listNextOffset;
+        const remaining = ` (${remainingCount} restant${remainingCount > 1 ? 's' : ''})`;
+        const row = document.createElement('tr');
+        row.id = 'load-more-row';
+        row.className = 'hover:bg-blue-50 transition duration-150 cursor-pointer';
+        row.onclick = () => {
+            row.onclick = null;
+            row.querySelector('td').innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i> Chargement...';
+            navigation.loadMore();
+        };
+        row.innerHTML = `
+            <td colspan="4" class="py-3 text-center text-blue-600 text-sm font-medium">
+                <i class="fas fa-chevron-down mr-2"></i>
+                Afficher les éléments suivants${remaining}
+            </td>
+        `;
+        dom.fileListBody.appendChild(row);
     }
 };
 
@@ -229,6 +229,95 @@ handleFileSelect(event) {
         uploadBtn.disabled = true;
         fileListDiv.classList.add('hidden');
 
+        // Les gros fichiers passent par des sessions par morceaux (reprenables),
+        // les petits sont regroupés en lots multipart ; lots et fichiers partent en parallèle
+        const allFiles = Array.from(files);
+        const largeFiles = allFiles.filter(f => f.size >= UPLOAD_CHUNKED_THRESHOLD);
+        const batches = upload.makeBatches(allFiles.filter(f => f.size < UPLOAD_CHUNKED_THRESHOLD));
+        const totalBytes = allFiles.reduce((sum, f) => sum + f.size, 0) || 1;
+
+        const tasks = [
+            ...batches.map(batch => (onProgress) => upload.sendMultipart(batch, onProgress)),
+            ...largeFiles.map(file => (onProgress) => upload.sendChunked(file, onProgress))
+        ];
+        const loadedByTask = new Array(tasks.length).fill(0);
+
+        const setProgress = (index, loaded) => {
+            loadedByTask[index] = loaded;
+            const loadedTotal = loadedByTask.reduce((sum, value) => sum + value, 0);
+            const percentComplete = Math.min(100, Math.round((loadedTotal / totalBytes) * 100));
+            progressBar.style.width = percentComplete + '%';
+            progressText.textContent = percentComplete + '%';
+        };
+
+        try {
+            const results = await upload.runPool(tasks, UPLOAD_PARALLEL_REQUESTS, setProgress);
+
+            const failed = results
+                .flatMap(result => (result && result.results) || [])
+                .filter(item => item.status !== 'ok');
+            const uploadedCount = allFiles.length - failed.length;
+            let message = `${uploadedCount} fichier(s) téléversé(s) avec succès`;
+            if (failed.length > 0) {
+                // Noms affichés dans la notification (innerHTML) : échappés, et limités pour rester lisibles
+                const names = failed.slice(0, UPLOAD_FAILED_NAMES_SHOWN).map(item => utils.escapeHtml(item.path));
+                if (failed.length > names.length) {
+                    names.push(`et ${failed.length - names.length} autre(s)`);
+                }
+                message += ` (${failed.length} erreur(s) : ${names.join(', ')})`;
+            }
+
+            notifications.show(message, failed.length === 0 ? 'success' : (uploadedCount > 0 ? 'warning' : 'error'));
+            modal.close();
+            navigation.refreshAfterChange();
+
+        } catch (error) {
+            console.error("Erreur de téléversement:", error);
+            notifications.show(`Échec du téléversement: ${error.message}`, 'error');
+            progressDiv.classList.add('hidden');
+            uploadBtn.disabled = false;
+            fileListDiv.classList.remove('hidden');
+        }
+    },
+
+    // Découpe les petits fichiers en lots limités en nombre et en taille
+    makeBatches(files) {
+        const batches = [];
+        let current = [];
+        let currentBytes = 0;
+
+        files.forEach(file => {
+            if (current.length >= UPLOAD_BATCH_MAX_FILES || currentBytes + file.size > UPLOAD_BATCH_MAX_BYTES) {
+                if (current.length > 0) batches.push(current);
+                current = [];
+                currentBytes = 0;
+            }
+            current.push(file);
+            currentBytes += file.size;
+        });
+        if (current.length > 0) batches.push(current);
+
+        return batches;
+    },
+
+    // Exécute les tâches avec au plus `limit` requêtes simultanées
+    async runPool(tasks, limit, onProgress) {
+        const results = new Array(tasks.length);
+        let next = 0;
+
+        const worker = async () => {
+            while (next < tasks.length) {
+                const index = next++;
+                results[index] = await tasks[index](loaded => onProgress(index, loaded));
+            }
+        };
+
+        await Promise.all(Array.from({ length: Math.min(limit, tasks.length) }, worker));
+        return results;
+    },
+
+    // Envoi groupé en une requête multipart (petits fichiers)
+    sendMultipart(files, onProgress) {
         const formData = new FormData();
         formData.append('path', state.currentPath);
 
@@ -239,42 +328,92 @@ handleFileSelect(event) {
             }
         }
 
-        try {
+        return new Promise((resolve, reject) => {
             const xhr = new XMLHttpRequest();
 
             xhr.upload.addEventListener('progress', (e) => {
                 if (e.lengthComputable) {
-                    const percentComplete = Math.round((e.loaded / e.total) * 100);
-                    progressBar.style.width = percentComplete + '%';
-                    progressText.textContent = percentComplete + '%';
+                    onProgress(e.loaded * files.reduce((sum, f) => sum + f.size, 0) / e.total);
                 }
             });
 
             xhr.addEventListener('load', () => {
+                let result = {};
+                try {
+                    result = JSON.parse(xhr.responseText);
+                } catch (e) {
+                    // Réponse non JSON (proxy, timeout...)
+                }
                 if (xhr.status === 201) {
-                    const result = JSON.parse(xhr.responseText);
-                    notifications.show(result.message, 'success');
-                    modal.close();
-                    navigation.navigateToFolder(state.currentPath);
+                    resolve(result);
                 } else {
-                    const result = JSON.parse(xhr.responseText);
-                    throw new Error(result.error || "Erreur lors du téléversement.");
+                    reject(new Error(result.error || "Erreur lors du téléversement."));
                 }
             });
 
             xhr.addEventListener('error', () => {
-                throw new Error("Erreur réseau lors du téléversement.");
+                reject(new Error("Erreur réseau lors du téléversement."));
             });
 
             xhr.open('POST', API_BASE + '/upload');
             xhr.send(formData);
+        });
+    },
 
-        } catch (error) {
-            console.error("Erreur de téléversement:", error);
-            notifications.show(`Échec du téléversement: ${error.message}`, 'error');
-            progressDiv.classList.add('hidden');
-            uploadBtn.disabled = false;
-            fileListDiv.classList.remove('hidden');
+    // Envoi d'un gros fichier par morceaux : une coupure ne coûte qu'un morceau
+    async sendChunked(file, onProgress) {
+        const relativePath = file.webkitRelativePath || file.name;
+        const resumeKey = `upload:${state.currentPath}:${relativePath}:${file.size}:${file.lastModified}`;
+
+        // Reprise d'une session interrompue (rechargement de page, coupure)
+        let session = null;
+        const previousId = localStorage.getItem(resumeKey);
+        if (previousId) {
+            const response = await fetch(`${API_BASE}/upload/session/${previousId}`);
+            if (response.ok) session = await response.json();
+        }
+
+        if (!session) {
+            const response = await fetch(API_BASE + '/upload/session', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ path: state.currentPath, relative_path: relativePath, size: file.size })
+            });
+            session = await response.json();
+            if (!response.ok) throw new Error(session.error || "Impossible de démarrer le téléversement.");
+            localStorage.setItem(resumeKey, session.upload_id);
         }
+
+        const sessionUrl = `${API_BASE}/upload/session/${session.upload_id}`;
+        let offset = session.offset;
+        let attempts = 0;
+        onProgress(offset);
+
+        while (offset < file.size) {
+            const chunk = file.slice(offset, Math.min(offset + session.chunk_size, file.size));
+            try {
+                const response = await fetch(`${sessionUrl}?offset=${offset}`, { method: 'PUT', body: chunk });
+                const result = await response.json();
+                // 409 : le serveur indique l'offset réellement confirmé
+                if (!response.ok && response.status !== 409) {
+                    throw new Error(result.error || `Erreur HTTP: ${response.status}`);
+                }
+                offset = result.offset;
+                attempts = 0;
+                onProgress(offset);
+            } catch (error) {
+                attempts++;
+                if (attempts > UPLOAD_MAX_RETRIES) throw error;
+                await new Promise(resolve => setTimeout(resolve, 1000 * attempts));
+                const status = await fetch(sessionUrl).catch(() => null);
+                if (status && status.ok) offset = (await status.json()).offset;
+            }
+        }
+
+        const response = await fetch(`${sessionUrl}/finalize`, { method: 'POST' });
+        const result = await response.json();
+        if (!response.ok) throw new Error(result.error || "Erreur lors de la finalisation.");
+        localStorage.removeItem(resumeKey);
+        return result;
     }
 };
\ No newline at end of file
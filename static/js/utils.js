@@ -12,6 +12,64 @@ const utils = {
         return url.toString();
     },
 
+    // Miniature servie par le serveur ; `modified` permet au navigateur de la garder en cache
+    getThumbnailUrl(path, size, modified) {
+        const url = new URL(utils.buildApiUrl('thumbnail', path));
+        url.searchParams.append('size', size);
+        if (modified) url.searchParams.append('v', modified);
+        return url.toString();
+    },
+
+    hasThumbnail(mimeType, kinds = state.thumbnailKinds) {
+        if (!mimeType) return false;
+        if (mimeType.startsWith('image/') && mimeType !== 'image/svg+xml') return kinds.includes('image');
+        if (mimeType.startsWith('video/')) return kinds.includes('video');
+        return false;
+    },
+
+    escapeHtml(text) {
+        return String(text).replace(/[&<>"']/g, char => ({
+            '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+        })[char]);
+    },
+
+    // Ligne trouvée par la recherche dans le contenu, occurrences surlignées
+    formatMatch(match) {
+        let html = '';
+        let position = 0;
+        match.ranges.forEach(([start, end]) => {
+            html += utils.escapeHtml(match.text.slice(position, start));
+            html += `<mark class="bg-yellow-200 rounded-sm">${utils.escapeHtml(match.text.slice(start, end))}</mark>`;
+            position = end;
+        });
+        html += utils.escapeHtml(match.text.slice(position));
+        return `<span class="text-slate-400">${match.line}:</span> ${html}`;
+    },
+
+    // Listing au format compact (colonnes) : reconstruit la liste d'objets habituelle
+    expandListing(listing) {
+        const columns = listing.columns;
+        const toIso = seconds => seconds === null ? null : new Date(seconds * 1000).toISOString();
+        const files = [];
+        for (let i = 0; i < listing.count; i++) {
+            const file = {
+                name: columns.name[i],
+                is_folder: columns.is_folder[i] === 1,
+                size: columns.size[i],
+                modified: toIso(columns.modified[i]),
+                mime_type: listing.mime_types[columns.mime_type[i]],
+                full_relative_path: listing.prefix + columns.name[i]
+            };
+            if (columns.file_count && columns.file_count[i] !== null) {
+                file.file_count = columns.file_count[i];
+                file.folder_count = columns.folder_count[i];
+                file.newest_modified = toIso(columns.newest_modified[i]);
+            }
+            files.push(file);
+        }
+        return files;
+    },
+
     getParentPath(path) {
         if (path === ROOT_PATH) return ROOT_PATH;
         const segments = path.split('/').filter(s => s.length > 0);
@@ -0,0 +1,76 @@
+# ============================================
+# thumbnailer.py - Génération des miniatures (exécutée dans des processus séparés)
+# ============================================
+#
+# Module volontairement indépendant de Flask : server.py l'appelle via un pool
+# de processus (contexte « spawn ») qui n'exécutent que ce fichier ; lancé par
+# `python server.py`, le serveur y est réimporté mais sans ses services.
+# Le décodage d'une photo de 24 Mpx occupe un cœur pendant des centaines de ms,
+# hors du GIL des workers qui servent les requêtes.
+
+import os
+import subprocess
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow absent : pas de miniatures d'images
+    Image = None
+
+THUMBNAIL_QUALITY = 80
+FFMPEG_TIMEOUT = 60
+# Position de l'image extraite d'une vidéo (secondes), évite les écrans noirs du début
+VIDEO_POSTER_OFFSETS = ('3', '0')
+
+
+def render_image(src, dst, size):
+    with Image.open(src) as original:
+        # Décodage JPEG directement à l'échelle 1/2, 1/4 ou 1/8 : bien plus rapide
+        original.draft('RGB', (size, size))
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((size, size), Image.LANCZOS, reducing_gap=2.0)
+
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # Le JPEG n'a pas de transparence : on compose sur un fond blanc
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        image.save(dst, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+
+
+def render_video(src, dst, size, ffmpeg):
+    scale = f"scale={size}:{size}:force_original_aspect_ratio=decrease"
+    for offset in VIDEO_POSTER_OFFSETS:
+        subprocess.run(
+            [ffmpeg, '-v', 'error', '-y', '-ss', offset, '-i', src, '-frames:v', '1',
+             '-vf', scale, '-f', 'image2', '-c:v', 'mjpeg', '-q:v', '4', dst],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            timeout=FFMPEG_TIMEOUT, check=False
+        )
+        # Vidéo plus courte que l'offset : ffmpeg réussit sans rien écrire
+        if os.path.exists(dst) and os.path.getsize(dst) > 0:
+            return
+    raise RuntimeError(f"ffmpeg n'a pas pu extraire d'image de '{os.path.basename(src)}'.")
+
+
+def generate(kind, src, dst, size, ffmpeg=None):
+    """Écrit la miniature de `src` dans `dst` (JPEG) et retourne sa taille en octets.
+
+    L'écriture passe par un fichier temporaire : un lecteur concurrent ne voit
+    jamais de miniature partielle.
+    """
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    temp_path = f"{dst}.{os.getpid()}.tmp"
+    try:
+        if kind == 'video':
+            render_video(src, temp_path, size, ffmpeg)
+        else:
+            render_image(src, temp_path, size)
+        os.replace(temp_path, dst)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return os.path.getsize(dst)